@@ -3,9 +3,11 @@
 Author: Faisal Chaudhry
 
 Agent Router (Agent A Poller):
-- Polls GitHub for new commits under doo/configs*/task-*
+- Watches the branch for new commits under doo/configs*/task-* (shared/git_change_feed:
+  `git ls-remote` or an ETag-conditional GitHub API check; fetches only when the head moved)
 - Clones or updates the repo securely with token-based authentication
-- Detects new file-level changes in the latest commit (diff changes only in last commit)
+- Detects file-level changes over the whole range since the last processed commit
+  (one `git diff --name-only last..new`, so commits pushed between polls are not skipped)
 - Uses Agent A + OpenAI LLM to summarize configuration intent
 - Posts JSON summary to Slack with config/task context
 
@@ -14,14 +16,17 @@ DEBUG logging is controlled by the DEBUG env var.
 
 import os
 import time
-import requests
 import openai
 import re
 from slack_sdk import WebClient
-from git import Repo, GitCommandError
 
 from agent_a import summarize_changes        
-from shared.llm_api import call_llm 
+from shared.llm_api import call_llm, llm_priority, BACKGROUND
+
+try:
+    from shared.git_change_feed import GitChangeFeed
+except ImportError:
+    from git_change_feed import GitChangeFeed
 
 # --- Configuration (via .env) ---
 GITHUB_TOKEN   = os.getenv("GITHUB_TOKEN", "").strip()
@@ -29,6 +34,9 @@ GITHUB_OWNER   = os.getenv("GITHUB_OWNER", "").strip()
 GITHUB_REPO    = os.getenv("GITHUB_REPO", "").strip()
 REPO_CLONE_DIR = os.getenv("REPO_CLONE_DIR", "/opt/tasks").strip()
 POLL_INTERVAL  = int(os.getenv("POLL_INTERVAL", "60").strip())  # seconds
+GITHUB_BRANCH  = os.getenv("GITHUB_BRANCH", "main").strip()
+GIT_REMOTE_URL = os.getenv("GIT_REMOTE_URL", "").strip()          # override, e.g. a local bare repo
+HEAD_CHECK     = os.getenv("AGENT1_HEAD_CHECK", "ls-remote").strip()  # ls-remote | api (ETag)
 SLACK_TOKEN    = os.getenv("SLACK_BOT_TOKEN", "").strip()
 SLACK_CHANNEL  = os.getenv("SLACK_CHANNEL", "#all-sp").strip()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
@@ -50,77 +58,31 @@ slack = WebClient(token=SLACK_TOKEN)
 
 STATE_FILE = ".last_sha"
 
-def get_last_sha():
-    try:
-        last = open(STATE_FILE).read().strip()
-        dbg(f"last SHA loaded: {last}")
-        return last
-    except FileNotFoundError:
-        dbg("no last SHA file found")
-        return None
-
-def set_last_sha(sha: str):
-    with open(STATE_FILE, "w") as f:
-        f.write(sha)
-    dbg(f"last SHA updated to: {sha}")
-
-def fetch_latest_commit():
-    url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/commits"
-    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-    params = {"sha": "main", "per_page": 1}
-    dbg("Fetching latest commit from GitHub")
-    r = requests.get(url, headers=headers, params=params)
-    r.raise_for_status()
-    commits = r.json()
-    if not commits:
-        raise RuntimeError("No commits found in repo")
-    latest = commits[0]
-    dbg(f"Latest commit: {latest['sha']}")
-    return latest
-
-def detect_task_changes_in_commit(commit_sha):
-    auth_url = f"https://{GITHUB_TOKEN}@github.com/{GITHUB_OWNER}/{GITHUB_REPO}.git"
-    # Mask token in logs
-    try:
-        masked = auth_url.replace(GITHUB_TOKEN, "****") if GITHUB_TOKEN else auth_url
-    except Exception:
-        masked = "****"
-    dbg(f"using auth_url={masked}")
-
-    if not os.path.isdir(REPO_CLONE_DIR):
-        dbg(f"cloning repo into {REPO_CLONE_DIR}")
-        try:
-            Repo.clone_from(auth_url, REPO_CLONE_DIR)
-        except GitCommandError as e:
-            raise RuntimeError(f"Failed to clone repo: {e}")
-    else:
-        dbg(f"pulling updates into {REPO_CLONE_DIR}")
-        try:
-            repo = Repo(REPO_CLONE_DIR)
-            origin = repo.remote(name="origin")
-            origin.set_url(auth_url)
-            origin.pull()
-        except GitCommandError as e:
-            raise RuntimeError(f"Failed to pull repo: {e}")
-
+def build_change_feed() -> GitChangeFeed:
+    remote = GIT_REMOTE_URL or f"https://{GITHUB_TOKEN}@github.com/{GITHUB_OWNER}/{GITHUB_REPO}.git"
+    etag_url = None
+    headers = {}
+    if HEAD_CHECK == "api":
+        etag_url = f"https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPO}/commits/{GITHUB_BRANCH}"
+        headers = {"Authorization": f"token {GITHUB_TOKEN}"} if GITHUB_TOKEN else {}
+    feed = GitChangeFeed(REPO_CLONE_DIR, remote, branch=GITHUB_BRANCH, state_file=STATE_FILE,
+                         etag_url=etag_url, etag_headers=headers, secret=GITHUB_TOKEN, log=dbg)
+    masked = remote.replace(GITHUB_TOKEN, "****") if GITHUB_TOKEN else remote
+    dbg(f"change feed: remote={masked} branch={GITHUB_BRANCH} head_check={HEAD_CHECK}")
+    return feed
+
+def detect_task_changes(commit_sha, files):
+    """(commit_sha, path) for changed device .txt / show_cmds.ini files under task folders."""
     changes = []
-    repo = Repo(REPO_CLONE_DIR)
-    dbg(f"examining commit {commit_sha}")
-    try:
-        files = repo.git.show("--name-only", "--pretty=", commit_sha).splitlines()
-    except GitCommandError as e:
-        dbg(f"Error during git show: {e}")
-        return []
-
     if not files:
-        dbg(f"No files found in commit {commit_sha}")
+        dbg(f"No files changed up to {commit_sha}")
         return []
 
     # Only pass along device .txt files and show_cmds.ini
     ALLOWED_BASENAMES = {"show_cmds.ini"}
     ALLOWED_TXT_SUFFIX = (".txt",)
 
-    dbg("Files changed in commit:")
+    dbg("Files changed:")
     for path in files:
         dbg(f"  - {path}")
         if not TASK_FOLDER_RE.search(path):
@@ -132,6 +94,12 @@ def detect_task_changes_in_commit(commit_sha):
             dbg("    → skip dotfile")
             continue
 
+        # A task folder removed in this range has nothing left to summarize
+        task_root = os.path.join(REPO_CLONE_DIR, *path.split("/")[:3])
+        if not os.path.isdir(task_root):
+            dbg("    → skip (task folder no longer exists)")
+            continue
+
         if path.endswith(ALLOWED_TXT_SUFFIX) or base in ALLOWED_BASENAMES:
             dbg("    → matched TASK folder + allowed type ✅")
             changes.append((commit_sha, path))
@@ -361,30 +329,29 @@ support automated fast reroute, and prepare the MPLS core for future scaling.
 
 def poller_loop():
     dbg("starting poller_loop()")
-    last_sha  = get_last_sha()
+    feed = build_change_feed()
     print(f"[START] Polling every {POLL_INTERVAL}s (DEBUG={DEBUG})", flush=True)
 
     while True:
         try:
-            latest_commit = fetch_latest_commit()
-            latest_sha = latest_commit.get("sha")
-            dbg(f"latest commit sha={latest_sha}")
+            batch = feed.poll()
+
+            if batch is None:
+                dbg("No new commit detected.")
 
-            if last_sha is None:
+            elif batch.old_sha is None:
                 dbg("First run: syncing SHA without summary")
-                set_last_sha(latest_sha)
-                last_sha = latest_sha
+                feed.ack(batch)
 
-            elif latest_sha != last_sha:
-                dbg(f"New commit found: {latest_sha}, processing changes")
-                changes = detect_task_changes_in_commit(latest_sha)
+            else:
+                dbg(f"New commits {batch.old_sha}..{batch.new_sha}: {len(batch.files)} files changed")
+                changes = detect_task_changes(batch.new_sha, batch.files)
                 dbg(f"changes list: {changes}")
                 if changes:
-                    summarize_and_post(changes)
-                set_last_sha(latest_sha)
-                last_sha = latest_sha
-            else:
-                dbg("No new commit detected.")
+                    # Summaries yield to interactive triage / batch analysis LLM calls
+                    with llm_priority(BACKGROUND):
+                        summarize_and_post(changes)
+                feed.ack(batch)
 
         except Exception as e:
             slack.chat_postMessage(
@@ -13,7 +13,17 @@ import os
 import subprocess
 import requests
 
+from device_sessions import POOL, capture_devices
+from capture_scheduler import SCHEDULER, INTERACTIVE, BULK
+from output_cache import CACHE
+
 AGENT_8_URL = os.getenv("AGENT_8_URL", "").rstrip("/")
+# Captures run in-process over pooled sessions through the capture scheduler instead of
+# spawning run_show_commands.py, so concurrent /capture-only and /operational-check
+# requests share one per-device queue; set to 0 to always use the script.
+A4_POOLED_CAPTURE = os.getenv("A4_POOLED_CAPTURE", "1") == "1"
+
+_PRIORITIES = {"interactive": INTERACTIVE, "bulk": BULK}
 
 app = FastAPI(title="Agent-4 HTTP API", version="1.0.0")
 
@@ -32,6 +42,8 @@ class CaptureOnlyReq(BaseModel):
     out_subdir: str = "agent8"
     devices: list[str] | None = None
     no_grading_logs: bool = True
+    priority: str | None = None              # "interactive" | "bulk"; default: interactive iff devices given
+    refresh: bool = False                    # bypass the output cache (Slack "↻ refresh" buttons)
 
 @app.post("/operational-check")
 def operational_check(req: OperCheckReq):
@@ -41,8 +53,20 @@ def operational_check(req: OperCheckReq):
     """
     def _runner():
         try:
-            # 1) run capture
-            ok = run_show_capture(req.config_dir, req.task_id)
+            # 1) run capture (bulk priority: triage captures on the same devices go first)
+            if A4_POOLED_CAPTURE:
+                result = capture_devices(req.config_dir, req.task_id, None,
+                                         no_grading_logs=False, priority=BULK)
+                print(f"[agent-4:/operational-check] capture {result}", flush=True)
+                # {device: "ok"|"skipped: ..."|"error: ..."}: post only if something was captured
+                ok = any(st == "ok" for st in result.values())
+                failed = {d: st for d, st in result.items() if st.startswith("error")}
+                if failed:
+                    print(f"[agent-4:/operational-check] {len(failed)}/{len(result)} devices failed: {failed}", flush=True)
+                if not ok:
+                    print("[agent-4:/operational-check] no device captured; skipping operational summary", flush=True)
+            else:
+                ok = run_show_capture(req.config_dir, req.task_id)
             # 2) on success, post the summary to Slack (existing function)
             if ok:
                 post_operational_summary(req.task_id, req.config_dir, req.channel)
@@ -57,6 +81,29 @@ def operational_check(req: OperCheckReq):
         raise HTTPException(status_code=500, detail=str(e))
     
 
+def _notify_agent8(req: CaptureOnlyReq, status: str, error_msg: str | None) -> None:
+    # -------- HTTP callback to Agent-8 --------
+    try:
+        payload = {
+            "config_dir": req.config_dir,
+            "task_id": req.task_id,
+            "devices": req.devices,
+            "out_subdir": req.out_subdir,
+            "status": status,
+        }
+        if error_msg:
+            payload["error"] = error_msg
+
+        if AGENT_8_URL:
+            requests.post(f"{AGENT_8_URL}/capture-done", json=payload, timeout=30)
+            print(f"[agent-4:/capture-only] Callback sent to Agent-8 {AGENT_8_URL}/capture-done", flush=True)
+        else:
+            print("[agent-4:/capture-only] WARN: AGENT_8_URL not set, skipping callback", flush=True)
+
+    except Exception as e:
+        print(f"[agent-4:/capture-only] WARN could not notify agent-8: {e}", flush=True)
+
+
 @app.post("/capture-only")
 def capture_only(req: CaptureOnlyReq):
     """
@@ -71,19 +118,29 @@ def capture_only(req: CaptureOnlyReq):
         error_msg = None
 
         try:
-            if not os.path.isfile(script_path):
-                raise FileNotFoundError(f"run_show_commands.py not found at {script_path}")
+            if A4_POOLED_CAPTURE:
+                result = capture_devices(
+                    req.config_dir, req.task_id, req.devices,
+                    ini_relpath=req.overlay_ini_relpath, out_subdir=req.out_subdir,
+                    no_grading_logs=req.no_grading_logs,
+                    priority=_PRIORITIES.get((req.priority or "").lower()),
+                    refresh=req.refresh,
+                )
+                print(f"[agent-4:/capture-only] OK (pooled) {result}", flush=True)
+            else:
+                if not os.path.isfile(script_path):
+                    raise FileNotFoundError(f"run_show_commands.py not found at {script_path}")
 
-            cmd = ["python3", script_path, "--task", req.task_id, "--out-subdir", req.out_subdir]
-            if req.overlay_ini_relpath:
-                cmd += ["--ini", req.overlay_ini_relpath]
-            if req.no_grading_logs:
-                cmd += ["--no-grading-logs"]
-            if req.devices:
-                cmd += ["--devices", *req.devices]
+                cmd = ["python3", script_path, "--task", req.task_id, "--out-subdir", req.out_subdir]
+                if req.overlay_ini_relpath:
+                    cmd += ["--ini", req.overlay_ini_relpath]
+                if req.no_grading_logs:
+                    cmd += ["--no-grading-logs"]
+                if req.devices:
+                    cmd += ["--devices", *req.devices]
 
-            out = subprocess.check_output(cmd, stderr=subprocess.STDOUT, text=True)
-            print(f"[agent-4:/capture-only] OK\n{out}", flush=True)
+                out = subprocess.check_output(cmd, stderr=subprocess.STDOUT, text=True)
+                print(f"[agent-4:/capture-only] OK\n{out}", flush=True)
 
         except subprocess.CalledProcessError as e:
             status = "error"
@@ -94,30 +151,17 @@ def capture_only(req: CaptureOnlyReq):
             error_msg = str(e)
             print(f"[agent-4:/capture-only] ERROR: {e}", flush=True)
 
-        # -------- HTTP callback to Agent-8 --------
-        try:
-            payload = {
-                "config_dir": req.config_dir,
-                "task_id": req.task_id,
-                "devices": req.devices,
-                "out_subdir": req.out_subdir,
-                "status": status,
-            }
-            if error_msg:
-                payload["error"] = error_msg
-
-            if AGENT_8_URL:
-                requests.post(f"{AGENT_8_URL}/capture-done", json=payload, timeout=30)
-                print(f"[agent-4:/capture-only] Callback sent to Agent-8 {AGENT_8_URL}/capture-done", flush=True)
-            else:
-                print("[agent-4:/capture-only] WARN: AGENT_8_URL not set, skipping callback", flush=True)
-
-        except Exception as e:
-            print(f"[agent-4:/capture-only] WARN could not notify agent-8: {e}", flush=True)
+        _notify_agent8(req, status, error_msg)
 
     try:
         threading.Thread(target=_runner, daemon=True).start()
         return {"status": "accepted"}
     except Exception as e:
         print(f"[agent-4:/capture-only] FAILED to start thread: {e}", flush=True)
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/sessions")
+def sessions():
+    """Open pooled device sessions, capture queue and output cache state (for debugging VTY usage)."""
+    return dict(POOL.stats(), scheduler=SCHEDULER.stats(), cache=CACHE.stats())
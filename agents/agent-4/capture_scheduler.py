@@ -0,0 +1,166 @@
+# agents/agent-4/capture_scheduler.py
+# One scheduler for every device command agent-4 runs.
+#
+#  - per-device serialization: at most one command in flight per device, so two
+#    triage sessions (or a triage session and a bulk task capture) never open
+#    parallel logins to the same router
+#  - global cap: at most A4_MAX_CONCURRENT_DEVICES devices worked on at once
+#  - coalescing: an identical (device, command) request that is queued, running,
+#    or finished less than A4_COALESCE_S ago shares that run's output
+#  - priority: interactive (triage) commands are picked before bulk task
+#    captures; waiting bulk work ages towards interactive so it is never starved
+
+import os
+import time
+import threading
+import contextvars
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from device_sessions import POOL, SessionPool
+
+INTERACTIVE = 0
+BULK = 2
+
+MAX_CONCURRENT_DEVICES = int(os.getenv("A4_MAX_CONCURRENT_DEVICES", "8"))
+COALESCE_S = float(os.getenv("A4_COALESCE_S", "5"))
+# Seconds of waiting that raise a job by one priority level
+AGING_S = float(os.getenv("A4_PRIORITY_AGING_S", "30"))
+
+
+def debug(msg):
+    print(f"[agent-4][sched] {msg}", flush=True)
+
+
+def normalize_cmd(cmd: str) -> str:
+    return " ".join((cmd or "").split())
+
+
+@dataclass
+class _Job:
+    key: Tuple[str, str, str]            # (config_dir, device, normalized command)
+    dev: Dict[str, Any]
+    cmd: str
+    priority: int
+    seq: int
+    keep_session: bool
+    enq_at: float = field(default_factory=time.time)
+    future: Future = field(default_factory=Future)
+    # Submitter's context (cassette scope etc.) — the command runs inside it
+    ctx: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+    @property
+    def device(self) -> Tuple[str, str]:
+        return self.key[0], self.key[1]
+
+
+class CaptureScheduler:
+    def __init__(self, pool: SessionPool = POOL, max_devices: int = MAX_CONCURRENT_DEVICES,
+                 coalesce_s: float = COALESCE_S, aging_s: float = AGING_S):
+        self.pool = pool
+        self.max_devices = max(1, max_devices)
+        self.coalesce_s = coalesce_s
+        self.aging_s = max(1e-3, aging_s)
+        self._cv = threading.Condition()
+        self._pending: List[_Job] = []
+        self._inflight: Dict[Tuple[str, str, str], _Job] = {}       # queued or running
+        self._recent: Dict[Tuple[str, str, str], Tuple[float, Future]] = {}
+        self._busy: Set[Tuple[str, str]] = set()
+        self._seq = 0
+        self._workers: List[threading.Thread] = []
+        self._counters = {"submitted": 0, "coalesced": 0, "executed": 0, "failed": 0}
+
+    # ---- submission ----
+    def submit(self, config_dir: str, dev: Dict[str, Any], cmd: str,
+               priority: int = INTERACTIVE, keep_session: bool = True,
+               fresh: bool = False) -> Future:
+        """fresh=True never reuses an already finished run (queued/running ones are still shared)."""
+        key = (config_dir, dev["name"], normalize_cmd(cmd))
+        now = time.time()
+        with self._cv:
+            self._ensure_workers()
+            self._counters["submitted"] += 1
+            job = self._inflight.get(key)
+            if job is not None:
+                self._counters["coalesced"] += 1
+                if priority < job.priority:
+                    job.priority = priority        # a triage request upgrades a queued bulk run
+                job.keep_session = job.keep_session or keep_session
+                return job.future
+            recent = self._recent.get(key)
+            if recent and not fresh and now - recent[0] <= self.coalesce_s and recent[1].exception() is None:
+                self._counters["coalesced"] += 1
+                return recent[1]
+
+            self._seq += 1
+            job = _Job(key=key, dev=dev, cmd=cmd, priority=priority, seq=self._seq,
+                       keep_session=keep_session)
+            self._pending.append(job)
+            self._inflight[key] = job
+            self._cv.notify()
+            return job.future
+
+    def run(self, config_dir: str, dev: Dict[str, Any], cmds: List[str],
+            priority: int = INTERACTIVE, keep_session: bool = True) -> List[Tuple[str, str]]:
+        futures = [self.submit(config_dir, dev, c, priority, keep_session) for c in cmds]
+        return [(c, f.result()) for c, f in zip(cmds, futures)]
+
+    # ---- dispatch ----
+    def _ensure_workers(self) -> None:
+        while len(self._workers) < self.max_devices:
+            t = threading.Thread(target=self._worker, daemon=True,
+                                 name=f"a4-capture-{len(self._workers)}")
+            self._workers.append(t)
+            t.start()
+
+    def _pick(self) -> Optional[_Job]:
+        now = time.time()
+        best, best_rank = None, None
+        for job in self._pending:
+            if job.device in self._busy:
+                continue
+            rank = (job.priority - (now - job.enq_at) / self.aging_s, job.seq)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = job, rank
+        if best is not None:
+            self._pending.remove(best)
+            self._busy.add(best.device)
+        return best
+
+    def _worker(self) -> None:
+        while True:
+            with self._cv:
+                job = self._pick()
+                while job is None:
+                    self._cv.wait()
+                    job = self._pick()
+            try:
+                waited = time.time() - job.enq_at
+                sess = self.pool.session(job.key[0], job.dev, sticky=job.keep_session)
+                out = job.ctx.run(sess.run, [job.cmd])[0][1]
+                job.future.set_result(out)
+                ok = True
+                if waited > 1.0:
+                    debug(f"{job.key[1]} '{job.cmd}' waited {waited:.1f}s (prio={job.priority})")
+            except Exception as e:
+                job.future.set_exception(e)
+                ok = False
+            with self._cv:
+                self._busy.discard(job.device)
+                self._inflight.pop(job.key, None)
+                self._counters["executed" if ok else "failed"] += 1
+                now = time.time()
+                self._recent[job.key] = (now, job.future)
+                if len(self._recent) > 1024:
+                    self._recent = {k: v for k, v in self._recent.items()
+                                    if now - v[0] <= self.coalesce_s}
+                self._cv.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cv:
+            return dict(self._counters, pending=len(self._pending), busy_devices=len(self._busy),
+                        max_devices=self.max_devices)
+
+
+SCHEDULER = CaptureScheduler()
@@ -0,0 +1,413 @@
+# agents/agent-4/device_sessions.py
+# Long-lived device CLI sessions for interactive (triage) captures.
+#
+# /capture-only used to spawn run_show_commands.py for every triage step:
+# a new interpreter, netmiko import, devices.yaml parse, SSH/Telnet login
+# and "terminal length 0" — all to run one or two show commands. Here
+# agent-4 keeps one logged-in session per device (keyed by config_dir +
+# device name), health-checks it before each use, and closes it after it
+# has been idle for the triage session TTL.
+#
+# Command handling and the markdown layout mirror run_show_commands.py so
+# agent-8 / agent-7 read the same show_logs either way.
+
+import os
+import time
+import contextlib
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+try:
+    from shared import cassette
+except ImportError:
+    try:
+        import cassette
+    except ImportError:
+        cassette = None
+
+REPO_ROOT = os.getenv("REPO_ROOT", "/app/doo").rstrip("/")
+
+# Idle sessions are closed after this long (default = agent-8 A8_SESSION_TTL_MIN)
+SESSION_IDLE_S = float(os.getenv("A4_SESSION_IDLE_S", str(240 * 60)))
+# Upper bound on open sessions (VTY lines are scarce); least recently used is closed first
+MAX_SESSIONS = int(os.getenv("A4_MAX_SESSIONS", "32"))
+
+# Same as run_show_commands.py
+_LONG_IOS = ("show ip pim", "show ip igmp")
+_PLATFORM_SECTION = {"cisco_ios": "common_IOS", "cisco_xr": "common_IOSXR"}
+
+
+def debug(msg):
+    print(f"[agent-4][sessions] {msg}", flush=True)
+
+
+# ---------------------------
+# Inventory / INI helpers (run_show_commands.py semantics)
+# ---------------------------
+_DEVICES_CACHE: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+_DEVICES_LOCK = threading.Lock()
+
+
+def load_devices(config_dir: str) -> List[Dict[str, Any]]:
+    """devices.yaml for a config dir, re-read only when the file changes."""
+    path = os.path.join(REPO_ROOT, config_dir, "devices.yaml")
+    mtime = os.path.getmtime(path)
+    with _DEVICES_LOCK:
+        hit = _DEVICES_CACHE.get(path)
+        if hit and hit[0] == mtime:
+            return hit[1]
+    with open(path) as f:
+        devices = yaml.safe_load(f)["devices"]
+    with _DEVICES_LOCK:
+        _DEVICES_CACHE[path] = (mtime, devices)
+    return devices
+
+
+def load_show_commands(path: str) -> Dict[str, List[str]]:
+    sections: Dict[str, List[str]] = {}
+    current_name = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                current_name = line[1:-1].strip()
+                sections[current_name] = []
+            elif current_name:
+                sections[current_name].append(line)
+    return sections
+
+
+def commands_for_device(dev: Dict[str, Any], show_cmds: Dict[str, List[str]]) -> List[str]:
+    section = _PLATFORM_SECTION.get(dev["device_type"].lower())
+    if not section:
+        return []
+    return show_cmds.get(section, []) + show_cmds.get(dev["name"], [])
+
+
+# ---------------------------
+# One device session
+# ---------------------------
+class DeviceSession:
+    def __init__(self, dev: Dict[str, Any]):
+        self.name = dev["name"]
+        self.plat = dev["device_type"].lower()
+        params = {k: v for k, v in dev.items()
+                  if k in ("host", "hostname", "port", "username", "password", "device_type")}
+        if "hostname" in params:
+            params["host"] = params.pop("hostname")
+        self.params = params
+        self.conn = None
+        self.lock = threading.Lock()      # one command stream per device
+        self.last_used = time.time()
+        # Kept open for reuse (triage); bulk-only sessions are released after the capture
+        self.sticky = False
+
+    @property
+    def host(self) -> str:
+        return self.params.get("host", "")
+
+    def connect(self) -> None:
+        from netmiko import ConnectHandler   # heavy import; only when a device is actually used
+
+        params = dict(self.params)
+        # SSH, with Telnet fallback for IOS
+        try:
+            conn = ConnectHandler(**params)
+        except Exception:
+            if self.plat == "cisco_ios":
+                params["device_type"] = "cisco_ios_telnet"
+                conn = ConnectHandler(**params)
+            else:
+                raise
+        # Turn off paging
+        conn.send_command("terminal length 0", strip_prompt=False, strip_command=False)
+        conn.send_command("terminal no monitor", strip_prompt=False, strip_command=False)
+        self.conn = conn
+        debug(f"connected {self.name} ({self.host})")
+
+    def alive(self) -> bool:
+        try:
+            return self.conn is not None and bool(self.conn.is_alive())
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        try:
+            if self.conn is not None:
+                self.conn.disconnect()
+        except Exception:
+            pass
+        self.conn = None
+
+    def _send(self, cmd: str) -> str:
+        conn = self.conn
+        verb = cmd.split()[0].lower()
+        if self.plat == "cisco_ios":
+            conn.clear_buffer()
+            if verb in ("ping", "traceroute") or any(cmd.startswith(p) for p in _LONG_IOS):
+                return conn.send_command_timing(cmd, strip_prompt=False, strip_command=False,
+                                                delay_factor=2.0)
+            return conn.send_command(cmd, expect_string=r"#", strip_prompt=False,
+                                     strip_command=False, delay_factor=2.0)
+        if verb in ("ping", "traceroute"):
+            return conn.send_command_timing(cmd, strip_prompt=False, strip_command=False,
+                                            delay_factor=2.0)
+        return conn.send_command(cmd, strip_prompt=False, strip_command=False, delay_factor=2.0)
+
+    def run(self, cmds: List[str]) -> List[Tuple[str, str]]:
+        """
+        Run commands, through the task cassette when CASSETTE_MODE is record/replay
+        (replayed commands never touch the device, so no login either).
+        """
+        if cassette is None or cassette.mode() == "off":
+            return self._run_live(cmds)
+        out: List[Tuple[str, str]] = []
+        for cmd in cmds:
+            request = {"device": self.name, "platform": self.plat, "command": " ".join(cmd.split())}
+            output, _ = cassette.through("device", request, lambda c=cmd: self._run_live([c])[0][1])
+            out.append((cmd, output))
+        return out
+
+    def _run_live(self, cmds: List[str]) -> List[Tuple[str, str]]:
+        """
+        Run commands on the (re)connected session. A dead session is reconnected;
+        a command that fails on a session that looked healthy is retried once on a
+        fresh login.
+        """
+        with self.lock:
+            self.last_used = time.time()
+            if not self.alive():
+                self.close()
+                self.connect()
+            out: List[Tuple[str, str]] = []
+            for cmd in cmds:
+                try:
+                    out.append((cmd, self._send(cmd)))
+                except Exception as e:
+                    debug(f"{self.name}: '{cmd}' failed ({e}); reconnecting once")
+                    self.close()
+                    self.connect()
+                    out.append((cmd, self._send(cmd)))
+            self.last_used = time.time()
+            return out
+
+
+# ---------------------------
+# Pool
+# ---------------------------
+class SessionPool:
+    def __init__(self, idle_s: float = SESSION_IDLE_S, max_sessions: int = MAX_SESSIONS):
+        self.idle_s = idle_s
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: Dict[Tuple[str, str], DeviceSession] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True,
+                                            name="a4-session-reaper")
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while True:
+            time.sleep(min(60.0, max(1.0, self.idle_s / 4)))
+            self.reap()
+
+    def reap(self) -> int:
+        """Close sessions idle longer than idle_s (skips ones busy right now)."""
+        now = time.time()
+        with self._lock:
+            idle = [(k, s) for k, s in self._sessions.items()
+                    if now - s.last_used > self.idle_s and not s.lock.locked()]
+            for k, _ in idle:
+                self._sessions.pop(k, None)
+        for k, s in idle:
+            s.close()
+            debug(f"closed idle session {k[1]} ({k[0]})")
+        return len(idle)
+
+    def session(self, config_dir: str, dev: Dict[str, Any], sticky: bool = True) -> DeviceSession:
+        key = (config_dir, dev["name"])
+        evicted = None
+        with self._lock:
+            self._start_reaper()
+            sess = self._sessions.get(key)
+            if sess is None:
+                if len(self._sessions) >= self.max_sessions:
+                    idle = [(s.last_used, k) for k, s in self._sessions.items() if not s.lock.locked()]
+                    if idle:
+                        _, old = min(idle)
+                        evicted = self._sessions.pop(old)
+                sess = DeviceSession(dev)
+                self._sessions[key] = sess
+            sess.sticky = sess.sticky or sticky
+        if evicted is not None:
+            evicted.close()
+        return sess
+
+    def release(self, config_dir: str, name: str) -> None:
+        """Close a session opened only for a bulk capture; sticky (triage) sessions stay."""
+        with self._lock:
+            sess = self._sessions.get((config_dir, name))
+            if sess is None or sess.sticky or sess.lock.locked():
+                return
+            self._sessions.pop((config_dir, name), None)
+        sess.close()
+
+    def run(self, config_dir: str, dev: Dict[str, Any], cmds: List[str]) -> List[Tuple[str, str]]:
+        return self.session(config_dir, dev).run(cmds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"open": len(self._sessions),
+                    "hosts": sorted(f"{k[0]}/{k[1]}" for k in self._sessions)}
+
+    def close_all(self) -> None:
+        with self._lock:
+            items, self._sessions = list(self._sessions.values()), {}
+        for s in items:
+            s.close()
+
+
+POOL = SessionPool()
+
+
+# ---------------------------
+# In-process capture (run_show_commands.py equivalent for a few devices)
+# ---------------------------
+def _write_log(path: str, title: str, task: str, name: str, host: str,
+               results: List[Tuple[str, str]], cached: Optional[Dict[str, float]] = None) -> None:
+    """cached: {command: age_s} for outputs served from the output cache."""
+    cached = cached or {}
+    with open(path, "w", encoding="utf-8") as lg:
+        lg.write(f"# {title} for Task {task}\n")
+        lg.write(f"**Device:** {name} ({host})\n")
+        lg.write(f"_Generated: {datetime.now()}_\n")
+        hits = [c for c, _ in results if c in cached]
+        if hits:
+            lg.write(f"**Cached:** {len(hits)} of {len(results)} command(s) served from cache "
+                     f"(oldest {max(cached[c] for c in hits):.0f}s)\n")
+        lg.write("\n")
+        for cmd, out in results:
+            lg.write(f"## {cmd}\n\n")
+            if cmd in cached:
+                lg.write(f"_(cached, captured {cached[cmd]:.0f}s ago)_\n\n")
+            lg.write(f"```\n{out.strip()}\n```\n\n")
+
+
+def _write_error(paths: List[str], name: str, err: str) -> None:
+    for path in paths:
+        with open(path, "w", encoding="utf-8") as lg:
+            lg.write(f"# ERROR for {name}\n")
+            lg.write(f"_Time: {datetime.now()}_\n\n")
+            lg.write(f"```\n{err}\n```")
+
+
+def capture_devices(config_dir: str, task: str, devices: Optional[List[str]],
+                    ini_relpath: Optional[str] = None, out_subdir: Optional[str] = None,
+                    no_grading_logs: bool = True, pool: SessionPool = POOL,
+                    priority: Optional[int] = None, scheduler=None,
+                    refresh: bool = False, cache=None) -> Dict[str, str]:
+    """
+    Same inputs/outputs as `run_show_commands.py --task [--devices] [--ini] [--out-subdir]
+    [--no-grading-logs]`, but over pooled sessions. devices=None captures every device
+    in devices.yaml. Returns {device: "ok"|"skipped: ..."|"error: ..."}.
+
+    Commands go through the capture scheduler (per-device serialization, global cap,
+    coalescing). priority defaults to interactive for a device list, bulk otherwise;
+    sessions opened only for a bulk capture are closed when it finishes.
+
+    Interactive captures are served from the short-TTL output cache where possible
+    (flagged in the markdown); refresh=True always goes to the device. Every output
+    captured here refreshes the cache.
+    """
+    from capture_scheduler import SCHEDULER, INTERACTIVE, BULK   # imports this module
+    from output_cache import CACHE
+    scheduler = scheduler or SCHEDULER
+    cache = cache or CACHE
+    if priority is None:
+        priority = INTERACTIVE if devices else BULK
+    keep = priority == INTERACTIVE
+    use_cache = keep and not refresh
+
+    task_folder = os.path.join(REPO_ROOT, config_dir, task)
+    if ini_relpath:
+        ini_path = ini_relpath if os.path.isabs(ini_relpath) else os.path.join(task_folder, ini_relpath)
+    else:
+        ini_path = os.path.join(task_folder, "show_cmds.ini")
+    base_out = os.path.join(task_folder, out_subdir) if out_subdir else task_folder
+    show_dir = os.path.join(base_out, "show_logs")
+    grade_dir = os.path.join(base_out, "grading_logs")
+    os.makedirs(show_dir, exist_ok=True)
+    if not no_grading_logs:
+        os.makedirs(grade_dir, exist_ok=True)
+
+    show_cmds = load_show_commands(ini_path)
+    wanted = set(devices or [])
+    status: Dict[str, str] = {}
+    queued = []
+
+    # Queue every device first so the scheduler can work on them side by side.
+    # Jobs run in the submitter's context: this cassette scope covers them (CASSETTE_MODE).
+    scope = cassette.use_cassette(os.path.join(task_folder, "cassettes")) if cassette else None
+    with scope or contextlib.nullcontext():
+        for dev in load_devices(config_dir):
+            name = dev["name"]
+            if wanted and name not in wanted:
+                continue
+            cmds = commands_for_device(dev, show_cmds)
+            if dev["device_type"].lower() not in _PLATFORM_SECTION:
+                status[name] = f"skipped: unsupported platform {dev['device_type']}"
+                continue
+            if not cmds:
+                status[name] = "skipped: no commands defined"
+                continue
+            if task != "misc" and not os.path.isfile(os.path.join(task_folder, f"{name}.txt")):
+                status[name] = f"skipped: missing config for task {task}"
+                continue
+            cached: Dict[str, float] = {}
+            futures = []
+            for c in cmds:
+                hit = cache.get(config_dir, name, c) if use_cache else None
+                if hit is not None:
+                    done: Future = Future()
+                    done.set_result(hit[0])
+                    cached[c] = hit[1]
+                    futures.append(done)
+                else:
+                    futures.append(scheduler.submit(config_dir, dev, c, priority, keep, fresh=refresh))
+            queued.append((dev, cmds, futures, cached, time.time()))
+
+    for dev, cmds, futures, cached, t0 in queued:
+        name = dev["name"]
+        host = dev.get("host") or dev.get("hostname") or ""
+        full_log = os.path.join(show_dir, f"{name}.md")
+        grade_log = os.path.join(grade_dir, f"{name}.md")
+        grade_cmds = [c for c in cmds if not c.lower().startswith("show run")]
+        try:
+            results = [(c, f.result()) for c, f in zip(cmds, futures)]
+            for c, out in results:
+                if c not in cached:
+                    cache.put(config_dir, name, c, out)
+            _write_log(full_log, "Full Output", task, name, host, results, cached)
+            if (not no_grading_logs) and grade_cmds:
+                by_cmd = dict(results)
+                _write_log(grade_log, "Grading Output", task, name, host,
+                           [(c, by_cmd.get(c, "")) for c in grade_cmds], cached)
+            status[name] = "ok"
+            debug(f"{name}: {len(cmds)} command(s) ({len(cached)} cached) in "
+                  f"{time.time() - t0:.2f}s → {full_log}")
+        except Exception as e:
+            status[name] = f"error: {e}"
+            debug(f"[ERROR] on {name}: {e}")
+            _write_error([full_log] + ([] if no_grading_logs else [grade_log]), name, str(e))
+        if not keep:
+            pool.release(config_dir, name)
+    return status
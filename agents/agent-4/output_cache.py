@@ -0,0 +1,95 @@
+# agents/agent-4/output_cache.py
+# Short-lived cache of device command output for triage captures.
+#
+# In a triage loop the same `show` is often asked for again on the same host
+# within a minute (operator re-runs, the LLM's trusted commands). Outputs are
+# kept per (config_dir, device, normalized command) for a TTL that depends on
+# what the command shows:
+#   counters / live state   0 s   (never cached: interface counters, ping, logs, ...)
+#   configuration           5 min (show running-config, ...)
+#   inventory               1 h   (show version, show inventory, ...)
+#   anything else           A4_CACHE_DEFAULT_TTL_S (default 30 s)
+# Each class can be overridden with A4_CACHE_TTL_<CLASS>_S.
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from capture_scheduler import normalize_cmd
+
+MAX_ENTRIES = int(os.getenv("A4_CACHE_MAX_ENTRIES", "2048"))
+
+# (class, pattern) — first match wins; patterns match the normalized, lower-cased command
+_CLASSES = [
+    ("counters", re.compile(
+        r"^(ping|traceroute)\b|counters|statistics|\bstats\b|^show (clock|log|logging|processes|proc)\b"
+        r"|^show (interfaces?|controllers)\b(?!.*\b(description|brief)\b)")),
+    ("config", re.compile(r"^show (run|running-config|startup-config|configuration)\b")),
+    ("inventory", re.compile(r"^show (version|inventory|platform|module|license|diag|hardware)\b")),
+]
+
+TTL_S: Dict[str, float] = {
+    "counters": float(os.getenv("A4_CACHE_TTL_COUNTERS_S", "0")),
+    "config": float(os.getenv("A4_CACHE_TTL_CONFIG_S", "300")),
+    "inventory": float(os.getenv("A4_CACHE_TTL_INVENTORY_S", "3600")),
+    "default": float(os.getenv("A4_CACHE_DEFAULT_TTL_S", "30")),
+}
+
+
+def command_class(cmd: str) -> str:
+    c = normalize_cmd(cmd).lower()
+    for name, rx in _CLASSES:
+        if rx.search(c):
+            return name
+    return "default"
+
+
+class OutputCache:
+    """(config_dir, device, command) → (captured_at, output); LRU-bounded, thread-safe."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl_s: Optional[Dict[str, float]] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = dict(TTL_S, **(ttl_s or {}))
+        self._items: "OrderedDict[Tuple[str, str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def ttl_for(self, cmd: str) -> float:
+        return self.ttl_s.get(command_class(cmd), self.ttl_s["default"])
+
+    def get(self, config_dir: str, device: str, cmd: str) -> Optional[Tuple[str, float]]:
+        """(output, age_s) if a fresh entry exists, else None."""
+        ttl = self.ttl_for(cmd)
+        key = (config_dir, device, normalize_cmd(cmd))
+        with self._lock:
+            hit = self._items.get(key) if ttl > 0 else None
+            if hit is not None:
+                age = time.time() - hit[0]
+                if age <= ttl:
+                    self._items.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return hit[1], age
+                self._items.pop(key, None)
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, config_dir: str, device: str, cmd: str, output: str,
+            captured_at: Optional[float] = None) -> None:
+        if self.ttl_for(cmd) <= 0:
+            return
+        key = (config_dir, device, normalize_cmd(cmd))
+        with self._lock:
+            self._items[key] = (captured_at or time.time(), output)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self._counters, entries=len(self._items), ttl_s=dict(self.ttl_s))
+
+
+CACHE = OutputCache()
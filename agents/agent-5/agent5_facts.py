@@ -32,27 +32,28 @@ Output ONLY JSON with this schema:
 Be conservative: only include items you can point to an evidence line for. Do NOT diagnose or recommend here.
 """
 
-def _regex_prefill(md_text: str) -> Dict[str, Any]:
-    facts = {
+def empty_prefill() -> Dict[str, Any]:
+    return {
         "bgp_neighbors": [],
         "evpn_xconnects": [],
         "lacp_bundles": [],
         "reachability": []
     }
 
+def prefill_line(facts: Dict[str, Any], line: str) -> None:
+    """Regex anchors for one log line (agent5_mddoc.parse_md feeds every line once)."""
     # BGP neighbors
-    for m in _RE_BGP_NEI.finditer(md_text):
+    for m in _RE_BGP_NEI.finditer(line):
         peer, state = m.group(1), m.group(2)
         facts["bgp_neighbors"].append({"peer": peer, "state": state, "evidence": m.group(0).strip()})
 
     # EVPN xconnect states
-    for line in md_text.splitlines():
-        m = _RE_XC_DOWN.search(line)
-        if m:
-            facts["evpn_xconnects"].append({"name": "unknown", "state": m.group(1), "evidence": line.strip()})
+    m = _RE_XC_DOWN.search(line)
+    if m:
+        facts["evpn_xconnects"].append({"name": "unknown", "state": m.group(1), "evidence": line.strip()})
 
     # Ping success
-    for m in _RE_PING.finditer(md_text):
+    for m in _RE_PING.finditer(line):
         rate = int(m.group(1))
         facts["reachability"].append({
             "probe": "ping",
@@ -62,6 +63,10 @@ def _regex_prefill(md_text: str) -> Dict[str, Any]:
             "evidence": m.group(0).strip()
         })
 
+def _regex_prefill(md_text: str) -> Dict[str, Any]:
+    facts = empty_prefill()
+    for line in md_text.splitlines():
+        prefill_line(facts, line)
     return facts
 
 def build_facts_messages(hostname: str, md_text: str, platform_hint: str, focus_signals: list[str], fewshots_text: str | None = None):
@@ -117,6 +122,7 @@ def extract_facts_for_device(
     agent1_obj: dict | None = None,
     observed_cmds: list[str] | None = None,
     lexicon_candidates: list[str] | None = None,
+    doc=None,                  # agent5_mddoc.MdDoc of md_text (parsed once per host)
 ) -> dict:
     """
     Build the single source of truth for this host in Phase-1.
@@ -124,7 +130,7 @@ def extract_facts_for_device(
     """
     
     # add this near the top of extract_facts_for_device(...)
-    prefilled = _regex_prefill(md_text or "")
+    prefilled = doc.prefill if doc is not None else _regex_prefill(md_text or "")
 
     plat = normalize_platform(platform_hint)
     focus = sorted(list(focus_signals or []))
@@ -162,7 +168,7 @@ def extract_facts_for_device(
     # 4) Signals seen from the .md (very light)
     signals_seen = []
     if md_text:
-        low = md_text.lower()
+        low = doc.lower if doc is not None else md_text.lower()
         for s in ["bgp","isis","ospf","mpls","evpn","l2vpn","sr","srv6","intf","ip","bfd","lacp","ldp"]:
             if s in low:
                 signals_seen.append(s)
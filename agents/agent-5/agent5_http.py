@@ -1,13 +1,15 @@
 # agents/agent-router/llm_clients/agent5_http.py
 # FastAPI shim for Agent-5 (operational analyze)
 # Exposes POST /operational-analyze and delegates to the existing Slack handler.
+# Runs are jobs (agent5_jobs): bounded concurrency, coalesced per task, with
+# progress (GET /jobs/{job_id}) and cancellation (POST /jobs/{job_id}/cancel).
 
-import threading
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
 # Import the existing Slack command handler (no duplication of logic)
 from agent5_operational_analyze import handle_operational_analyze
+from agent5_jobs import JOBS, JobRejected
 
 app = FastAPI(title="Agent-5 HTTP API", version="1.0.0")
 
@@ -23,37 +25,62 @@ class OperAnalyzeReq(BaseModel):
 @app.post("/operational-analyze")
 def operational_analyze(req: OperAnalyzeReq):
     """
-    Fire-and-return endpoint: invoke the existing Slack command handler directly.
+    Fire-and-return endpoint: queue the existing Slack command handler as a job.
+    A request for a task that is already queued/running joins that job; the result
+    is posted to every joined requester's channel.
     """
     def _runner():
-        try:
-            # minimal Slack-like call context
-            ack = (lambda *_, **__: None)
-            respond = (lambda *_, **__: None)
+        # minimal Slack-like call context
+        ack = (lambda *_, **__: None)
+        respond = (lambda *_, **__: None)
 
-            class _NoopLogger:
-                def info(self, *args, **kwargs): pass
-                def error(self, *args, **kwargs): pass
+        class _NoopLogger:
+            def info(self, *args, **kwargs): pass
+            def error(self, *args, **kwargs): pass
 
-            command = {
-                "text": f"{req.config_dir} {req.task_id}",
-                "channel_id": req.channel,
-                "user_id": req.requested_by or "",
-                "thread_ts": req.thread_ts or "",
-            }
+        command = {
+            "text": f"{req.config_dir} {req.task_id}",
+            "channel_id": req.channel,
+            "user_id": req.requested_by or "",
+            "thread_ts": req.thread_ts or "",
+        }
 
-            # Call the existing Bolt handler
-            handle_operational_analyze(ack, command, respond, _NoopLogger())
-
-        except Exception as e:
-            print(f"[agent-5:/operational-analyze] ERROR: {e}", flush=True)
+        # Call the existing Bolt handler
+        handle_operational_analyze(ack, command, respond, _NoopLogger())
 
     try:
-        threading.Thread(target=_runner, daemon=True).start()
-        return {"status": "accepted"}
+        job, coalesced = JOBS.submit(
+            (req.config_dir, req.task_id), _runner,
+            meta={"channel": req.channel, "thread_ts": req.thread_ts, "requested_by": req.requested_by},
+        )
+    except JobRejected as e:
+        print(f"[agent-5:/operational-analyze] REJECTED: {e}", flush=True)
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
-        print(f"[agent-5:/operational-analyze] FAILED to start thread: {e}", flush=True)
+        print(f"[agent-5:/operational-analyze] FAILED to queue job: {e}", flush=True)
         raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "accepted", "job_id": job.job_id, "state": job.state, "coalesced": coalesced}
+
+
+@app.get("/jobs")
+def list_jobs():
+    return {"jobs": JOBS.list(), "stats": JOBS.stats()}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job.as_dict()
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = JOBS.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job.as_dict()
 
 # # agents/agent-router/llm_clients/agent5_http.py
 # # FastAPI shim for Agent-5 (operational analyze)
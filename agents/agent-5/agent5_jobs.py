@@ -0,0 +1,249 @@
+# agent5_jobs.py
+# Bounded job executor for /operational-analyze.
+#
+#   • AGENT5_MAX_JOBS runs at a time (default 2); up to AGENT5_MAX_QUEUED more wait
+#     (default 16), beyond that submit() raises JobRejected.
+#   • A request for a (config_dir, task_id) that is already queued/running is
+#     coalesced onto that job (same job_id) instead of starting a second run; the
+#     run delivers its result to every coalesced requester (job_requests()). Once
+#     delivery starts, new requests start a new job.
+#   • Progress per phase (facts, per_device, cross_device): the running analysis
+#     calls job_phase()/job_step(); outside a job those are no-ops.
+#   • cancel(): a queued job never starts; a running job stops at the next
+#     job_step()/job_phase() (JobCancelled), i.e. between hosts.
+#   • Finished jobs are kept for AGENT5_JOB_KEEP_S (default 3600) for GET /jobs/<id>.
+import os, time, uuid, threading, contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from agent5_shared import dbg
+
+MAX_JOBS = int(os.getenv("AGENT5_MAX_JOBS", "2"))
+MAX_QUEUED = int(os.getenv("AGENT5_MAX_QUEUED", "16"))
+KEEP_S = float(os.getenv("AGENT5_JOB_KEEP_S", "3600"))
+
+PHASES = ("facts", "per_device", "cross_device")
+ACTIVE = ("queued", "running")
+
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("agent5_job", default=None)
+
+
+class JobRejected(RuntimeError):
+    pass
+
+
+class JobCancelled(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(self, key: tuple, meta: Dict[str, Any]) -> None:
+        self.job_id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.meta = meta
+        self.requests: List[Dict[str, Any]] = [dict(meta, ts=time.time())]
+        self.accepting = True           # False once results are being delivered
+        self.state = "queued"
+        self.phase: Optional[str] = None
+        self.progress: Dict[str, Dict[str, int]] = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self._lock = threading.Lock()
+
+    def add_request(self, meta: Dict[str, Any]) -> bool:
+        """Join this job; False if it already started delivering its results."""
+        with self._lock:
+            if not self.accepting:
+                return False
+            self.requests.append(dict(meta, ts=time.time()))
+            return True
+
+    def close_requests(self) -> List[Dict[str, Any]]:
+        """Stop accepting requesters; returns all of them (first one first)."""
+        with self._lock:
+            self.accepting = False
+            return [dict(r) for r in self.requests]
+
+    def set_phase(self, name: str, total: int, current: bool = True) -> None:
+        with self._lock:
+            if current or self.phase is None:
+                self.phase = name
+            self.progress[name] = {"done": 0, "total": int(total)}
+
+    def step(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            row = self.progress.setdefault(name, {"done": 0, "total": 0})
+            row["done"] += n
+            if name == self.phase and row["done"] >= row["total"]:
+                # overlapping phases (pipelined hosts): move on to the next unfinished one
+                self.phase = next((p for p, r in self.progress.items() if r["done"] < r["total"]), name)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "state": self.state,
+                "phase": self.phase,
+                "progress": {k: dict(v) for k, v in self.progress.items()},
+                "error": self.error,
+                "config_dir": self.key[0],
+                "task_id": self.key[1],
+                "requests": len(self.requests),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "cancel_requested": self.cancel_event.is_set(),
+            }
+
+
+# ---- hooks for the running analysis ----
+def _check(job: Optional[Job]) -> None:
+    if job is not None and job.cancel_event.is_set():
+        raise JobCancelled(f"job {job.job_id} cancelled")
+
+
+def job_phase(name: str, total: int, current: bool = True) -> None:
+    """
+    Enter a phase with `total` units of work (hosts); raises JobCancelled if cancelled.
+    current=False only registers it (runs alongside the current phase).
+    """
+    job = _CURRENT.get()
+    _check(job)
+    if job is not None:
+        job.set_phase(name, total, current=current)
+
+
+def job_step(name: str, n: int = 1) -> None:
+    """One unit of `name` done; raises JobCancelled if the job was cancelled."""
+    job = _CURRENT.get()
+    if job is not None:
+        job.step(name, n)
+    _check(job)
+
+
+def job_requests() -> List[Dict[str, Any]]:
+    """
+    Request metas ({"channel", "thread_ts", "requested_by", ...}) of every request
+    coalesced onto the current job, for delivering the result to each of them; later
+    requests for the task start a new job. Outside a job: [].
+    """
+    job = _CURRENT.get()
+    return job.close_requests() if job is not None else []
+
+
+def cancelled() -> bool:
+    job = _CURRENT.get()
+    return job is not None and job.cancel_event.is_set()
+
+
+class JobManager:
+    def __init__(self, max_jobs: int = MAX_JOBS, max_queued: int = MAX_QUEUED,
+                 keep_s: float = KEEP_S) -> None:
+        self.max_jobs = max(1, max_jobs)
+        self.max_queued = max(0, max_queued)
+        self.keep_s = keep_s
+        self._pool = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="agent5-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[tuple, Job] = {}
+        self._stats = {"submitted": 0, "coalesced": 0, "rejected": 0,
+                       "done": 0, "error": 0, "cancelled": 0}
+
+    def submit(self, key: tuple, fn: Callable[[], Any], meta: Optional[Dict[str, Any]] = None) -> tuple:
+        """Returns (job, coalesced). Raises JobRejected when the queue is full."""
+        meta = meta or {}
+        with self._lock:
+            self._gc()
+            job = self._active.get(key)
+            if (job is not None and job.state in ACTIVE and not job.cancel_event.is_set()
+                    and job.add_request(meta)):
+                self._stats["coalesced"] += 1
+                dbg(f"[jobs] coalesced {key} onto {job.job_id}")
+                return job, True
+            queued = sum(1 for j in self._active.values() if j.state == "queued")
+            if queued >= self.max_queued:
+                self._stats["rejected"] += 1
+                raise JobRejected(f"too many queued jobs ({queued})")
+            job = Job(key, meta)
+            self._jobs[job.job_id] = job
+            self._active[key] = job
+            self._stats["submitted"] += 1
+            ctx = contextvars.copy_context()
+            job.future = self._pool.submit(ctx.run, self._run, job, fn)
+        dbg(f"[jobs] queued {job.job_id} for {key}")
+        return job, False
+
+    def _run(self, job: Job, fn: Callable[[], Any]) -> None:
+        with self._lock:
+            if job.cancel_event.is_set():       # cancelled while queued
+                return
+            job.state = "running"
+            job.started_at = time.time()
+        token = _CURRENT.set(job)
+        state, error = "done", None
+        try:
+            fn()
+            if job.cancel_event.is_set():
+                state = "cancelled"
+        except JobCancelled:
+            state = "cancelled"
+        except Exception as e:
+            state, error = "error", str(e)
+            dbg(f"[jobs] {job.job_id} failed: {e}")
+        finally:
+            _CURRENT.reset(token)
+            self._finish(job, state, error)
+
+    def _finish(self, job: Job, state: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            job.state = state
+            job.error = error
+            job.finished_at = time.time()
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+            self._stats[state] += 1
+        dbg(f"[jobs] {job.job_id} {state} in {job.finished_at - job.created_at:.1f}s")
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state not in ACTIVE:
+                return job
+            job.cancel_event.set()
+            queued = job.state == "queued"
+        if queued and job.future is not None:
+            job.future.cancel()
+            self._finish(job, "cancelled")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._gc()
+            jobs = sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+        return [j.as_dict() for j in jobs]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            out["running"] = sum(1 for j in self._active.values() if j.state == "running")
+            out["queued"] = sum(1 for j in self._active.values() if j.state == "queued")
+        out.update(max_jobs=self.max_jobs, max_queued=self.max_queued)
+        return out
+
+    def _gc(self) -> None:
+        """Drop finished jobs older than keep_s (lock held)."""
+        now = time.time()
+        for jid in [jid for jid, j in self._jobs.items()
+                    if j.finished_at and now - j.finished_at > self.keep_s]:
+            del self._jobs[jid]
+
+
+JOBS = JobManager()
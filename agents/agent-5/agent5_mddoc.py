@@ -0,0 +1,120 @@
+# agent5_mddoc.py
+# One-pass document model for a host's .md log.
+#
+# parse_md() walks the lines once and keeps everything the per-host phases used to
+# re-derive from the full text with their own scans:
+#   • platform_hint     (_infer_platform_hint_from_md)
+#   • signals           (derive_dynamic_signals over the md)
+#   • prefill           (agent5_facts._regex_prefill: bgp neighbors / xconnects / ping)
+#   • show blocks       ("## show ..." + fenced output) → observed(platform) gives the
+#                       commands that ran successfully (_extract_observed_successful_commands)
+# Build it once per host and pass it as doc= to the consumers.
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from agent5_facts import empty_prefill, prefill_line
+from agent5_shared import normalize_platform, sanitize_show
+
+_SHOW_HDR = re.compile(r"^##\s+show\s+", re.IGNORECASE)
+_ERR_MARKERS = re.compile(
+    r"%(?:\s*Invalid input detected|\s*Incomplete command|\s*Ambiguous command|\s*Error)"
+    r"|(?:Unknown|Unrecognized)\s+command|syntax error|Command not supported",
+    re.IGNORECASE,
+)
+_PROMPT = re.compile(r"^(?:RP/\d+/\w+\d+/CPU\d+:|[A-Za-z0-9._-]+(?:\([^)]+\))?[#>])\s*$")
+_TS = re.compile(r"^\w{3}\s\w{3}\s+\d{1,2}\s")
+
+
+def md_platform_hint(md_text: str) -> str:
+    # quick heuristic; full platform decision is inside LLM too
+    if "RP/0/" in md_text or "IOS XR" in md_text or "config-bgp" in md_text:
+        return "ios-xr"
+    if "#" in md_text and "IOS" in md_text and ">" not in md_text:
+        return "ios"
+    return "unknown"
+
+
+class SignalScanner:
+    """{proto: [regex, ...]} → set of protos whose patterns occur in a text (patterns compiled once)."""
+    def __init__(self, proto_words: Dict[str, List[str]]) -> None:
+        flags = re.IGNORECASE | re.MULTILINE
+        self._pats: List[Tuple[str, List["re.Pattern"]]] = [
+            (proto, [re.compile(p, flags) for p in pats]) for proto, pats in proto_words.items()
+        ]
+
+    def scan(self, text: str) -> Set[str]:
+        if not text:
+            return set()
+        return {proto for proto, pats in self._pats if any(p.search(text) for p in pats)}
+
+
+class MdDoc:
+    def __init__(self, text: str) -> None:
+        self.text = text or ""
+        self.lines: List[str] = self.text.splitlines()
+        self.platform_hint = md_platform_hint(self.text)
+        self.signals: Set[str] = set()
+        self.prefill = empty_prefill()
+        # (echoed command, output looks successful) per "## show ..." block
+        self.show_blocks: List[Tuple[str, bool]] = []
+        self._lower: Optional[str] = None
+        self._observed: Dict[str, List[str]] = {}
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    def observed(self, platform_hint: str) -> List[str]:
+        """Commands echoed in successful show blocks, sanitized for the platform."""
+        plat = normalize_platform(platform_hint)
+        if plat not in self._observed:
+            ok = []
+            for echoed, good in self.show_blocks:
+                clean = sanitize_show(echoed, plat) if good else ""
+                if clean:
+                    ok.append(clean)
+            self._observed[plat] = ok
+        return list(self._observed[plat])
+
+
+def parse_md(md_text: str, scanner: Optional[SignalScanner] = None) -> MdDoc:
+    doc = MdDoc(md_text)
+    if scanner is not None:
+        doc.signals = scanner.scan(doc.text)
+
+    # state: None (text) | "hdr" (after '## show', waiting for a fence) | "block"
+    state: Optional[str] = None
+    block: List[str] = []
+    for line in doc.lines:
+        prefill_line(doc.prefill, line)
+        fence = line.lstrip().startswith("```")
+        if state == "block":
+            if fence:
+                _close_block(doc, block)
+                state, block = None, []
+            else:
+                block.append(line)
+            continue
+        if state == "hdr" and fence:
+            state = "block"
+            continue
+        if _SHOW_HDR.match(line.strip()):
+            state = "hdr"
+    if state == "block":            # unterminated fence: output runs to end of file
+        _close_block(doc, block)
+    return doc
+
+
+def _close_block(doc: MdDoc, block: List[str]) -> None:
+    k = 0
+    while k < len(block) and not block[k].strip():
+        k += 1
+    if k >= len(block):
+        return
+    body = block[k + 1:]
+    good = not _ERR_MARKERS.search("\n".join(body)) and any(
+        l.strip() and not _PROMPT.match(l.strip()) and not _TS.match(l.strip()) for l in body
+    )
+    doc.show_blocks.append((block[k].strip(), good))
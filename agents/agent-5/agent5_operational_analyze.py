@@ -7,6 +7,8 @@ import os
 import re
 import json
 import glob
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
@@ -15,7 +17,8 @@ from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
-from shared.llm_api import call_llm  # same wrapper used in other agents
+from shared.llm_api import call_llm, cacheable_messages, usage_run  # same wrapper used in other agents
+from shared.cassette import use_cassette
 
 # v3 (.py.2.* worked but now v3 with modularity and new logic)
 from agent5_shared import dbg, write_audit, safe_json_loads
@@ -24,6 +27,8 @@ from agent5_facts import extract_facts_for_device           # 5a
 from agent5_reasoner import reason_per_device               # 5b
 from agent5_critic import critic_patch                      # 5d
 from agent5_correlator import correlate                     # 5c
+from agent5_jobs import job_phase, job_step, job_requests   # progress/cancel when run as a job
+from agent5_mddoc import parse_md, md_platform_hint, SignalScanner
 
 # v7 
 from agent5_shared import dbg, write_audit, safe_json_loads
@@ -38,6 +43,9 @@ REPO_ROOT       = os.getenv("REPO_ROOT", "/app/doo").strip()
 MAX_MD_CHARS_PER_DEVICE = 9000  # keep some headroom
 MAX_FINDINGS_PER_DEVICE = 10
 
+# Hosts analyzed side by side (facts → per-device pipeline per host)
+HOST_WORKERS = int(os.getenv("AGENT5_HOST_WORKERS", "4"))
+
 app    = App(token=SLACK_BOT_TOKEN)
 client = WebClient(token=SLACK_BOT_TOKEN)
 
@@ -340,19 +348,17 @@ PROTO_WORDS = {
     "intf":  [r"\binterface\b", r"\bGigabitEthernet\b", r"\bBundle-Ether\b"],
 }
 
-def derive_dynamic_signals(md_text: str, agent1_obj: Optional[dict] = None) -> Set[str]:
+_PROTO_SCANNER = SignalScanner(PROTO_WORDS)
+
+def derive_dynamic_signals(md_text: str, agent1_obj: Optional[dict] = None, doc=None) -> Set[str]:
     """
     Build a set of protocols/features to focus on for a device.
     Sources:
       • What actually appears in the .md (primary)
       • Agent‑1 intents (secondary)
+    doc: the md's agent5_mddoc.MdDoc (parsed with this scanner) instead of rescanning md_text.
     """
-    signals: Set[str] = set()
-    text = (md_text or "")
-
-    for proto, patterns in PROTO_WORDS.items():
-        if any(re.search(p, text, re.IGNORECASE | re.MULTILINE) for p in patterns):
-            signals.add(proto)
+    signals: Set[str] = set(doc.signals) if doc is not None else _PROTO_SCANNER.scan(md_text or "")
 
     # From Agent‑1 intents, add hints if present
     if agent1_obj:
@@ -506,17 +512,26 @@ def _build_per_device_messages(
     signals: set[str],
     allow_active: bool,
     show_cmds: list[str] | None = None,
-    host_facts: dict | None = None     # v4 .. agent5_fact.json
+    host_facts: dict | None = None,    # v4 .. agent5_fact.json
+    audit_root: str | None = None,     # this run's <task>/agent5_audit
 ) -> list[dict]:
-    """Compose messages for per-device analysis."""
-    # Pack context for the model (short + bounded)
+    """
+    Compose messages for per-device analysis.
+    Layout is stable → variable so the provider can cache the shared prefix across hosts:
+      system (constant) → task context (same for every host of the run) → host context + log
+    """
+    # Task-level context: identical bytes for every host in this run
+    task_payload = (
+        "### Task Context (JSON)\n"
+        f"```json\n{json.dumps({'show_cmds_ini': show_cmds or []}, indent=2)}\n```"
+    )
+    # Pack host context for the model (short + bounded)
     context = {
         "hostname": hostname,
         "platform_hint": platform_hint,
         "focus_signals": sorted(list(signals)),
         "allow_active_probes": bool(allow_active),
         "agent1_summary": agent1_obj or {},
-        "show_cmds_ini": show_cmds or [],   # <— include the ini list
         "ground_evidence_facts": host_facts or {}   # v4
 
     }
@@ -534,24 +549,21 @@ def _build_per_device_messages(
     try:
         md_preview = md_text[:600].replace("\n", "\\n")
         dbg(f"[per-device] host={hostname} platform_hint={platform_hint} signals={sorted(list(signals))} md_preview(600)={md_preview}")
-        if AUDIT_ROOT:
-            write_audit(os.path.join(AUDIT_ROOT, f"{hostname}__per_device_prompt.txt"),
-                        f"--- SYSTEM ---\n{_PER_DEVICE_SYSTEM}\n\n--- USER ---\n{user_payload}\n")
+        if audit_root:
+            write_audit(os.path.join(audit_root, f"{hostname}__per_device_prompt.txt"),
+                        f"--- SYSTEM ---\n{_PER_DEVICE_SYSTEM}\n\n--- USER (task) ---\n{task_payload}\n\n--- USER ---\n{user_payload}\n")
     except Exception as e:
         dbg(f"[per-device] prompt logging failed for {hostname}: {e}")
-    return [
-        {"role": "system", "content": _PER_DEVICE_SYSTEM},
-        {"role": "user", "content": user_payload}
-    ]
+    return cacheable_messages(_PER_DEVICE_SYSTEM, user_payload, stable_prefix=task_payload)
 
-def _build_cross_device_messages(per_device_jsons: list[dict]) -> list[dict]:
+def _build_cross_device_messages(per_device_jsons: list[dict], audit_root: str | None = None) -> list[dict]:
     """Compose messages for cross-device correlation."""
     arr = per_device_jsons[:]
     user_payload = f"```json\n{json.dumps(arr, indent=2)}\n```"
     # --- debug/audit: record cross-device prompt ---
     try:
-        if AUDIT_ROOT:
-            write_audit(os.path.join(AUDIT_ROOT, "cross_prompt.txt"),
+        if audit_root:
+            write_audit(os.path.join(audit_root, "cross_prompt.txt"),
                         f"--- SYSTEM ---\n{_CROSS_DEVICE_SYSTEM}\n\n--- USER ---\n{user_payload}\n")
         dbg(f"[cross] built cross-device prompt for {len(arr)} devices")
     except Exception as e:
@@ -575,13 +587,15 @@ def per_device_analyze_with_llm(
     signals: set[str],
     allow_active: bool,
     show_cmds: list[str] | None = None,
-    host_facts: dict | None = None           # v4 ... to make sure info from agent5_facts.json is used
+    host_facts: dict | None = None,          # v4 ... to make sure info from agent5_facts.json is used
+    audit_root: str | None = None,
 ) -> dict:
     """Run the per-device LLM call and parse JSON with hardening."""
     msgs = _build_per_device_messages(
         hostname, md_text, agent1_obj, platform_hint, signals, allow_active,
         show_cmds=show_cmds,
-        host_facts=host_facts
+        host_facts=host_facts,
+        audit_root=audit_root,
     )
     
     raw = call_llm(msgs, temperature=0.0) or ""
@@ -589,8 +603,8 @@ def per_device_analyze_with_llm(
     # --- debug/audit: raw LLM output ---
     try:
         dbg(f"[per-device] host={hostname} LLM raw (first 600): {str(raw)[:600]}")
-        if AUDIT_ROOT:
-            write_audit(os.path.join(AUDIT_ROOT, f"{hostname}__per_device_raw.json"), str(raw))
+        if audit_root:
+            write_audit(os.path.join(audit_root, f"{hostname}__per_device_raw.json"), str(raw))
     except Exception as e:
         dbg(f"[per-device] raw logging failed for {hostname}: {e}")
 
@@ -641,15 +655,15 @@ def per_device_analyze_with_llm(
     # obj = _normalize_show_cmds_fields(obj, show_cmds)
     # return obj
 
-def cross_device_analyze_with_llm(per_device_objs: list[dict]) -> dict:
+def cross_device_analyze_with_llm(per_device_objs: list[dict], audit_root: str | None = None) -> dict:
     """Run the cross-device LLM call and parse JSON with hardening."""
-    msgs = _build_cross_device_messages(per_device_objs)
+    msgs = _build_cross_device_messages(per_device_objs, audit_root=audit_root)
     raw = call_llm(msgs, temperature=0.0) or ""
     # --- debug/audit: raw LLM output ---
     try:
         dbg(f"[cross] LLM raw (first 800): {str(raw)[:800]}")
-        if AUDIT_ROOT:
-            write_audit(os.path.join(AUDIT_ROOT, "cross_raw.json"), str(raw))
+        if audit_root:
+            write_audit(os.path.join(audit_root, "cross_raw.json"), str(raw))
     except Exception as e:
         dbg(f"[cross] raw logging failed: {e}")
 
@@ -839,11 +853,7 @@ def _persist_json(obj: dict | list, path: str):
 
 def _infer_platform_hint_from_md(md_text: str) -> str:
     # quick heuristic; full platform decision is inside LLM too
-    if "RP/0/" in md_text or "IOS XR" in md_text or "config-bgp" in md_text:
-        return "ios-xr"
-    if "#" in md_text and "IOS" in md_text and ">" not in md_text:
-        return "ios"
-    return "unknown"
+    return md_platform_hint(md_text)
 
 def _default_signals():
     # start broad; LLM will prune
@@ -1285,73 +1295,22 @@ def _primary_keyword(cmd: str) -> str:
 #     return obj
 
 
-def _extract_observed_successful_commands(md_text: str, platform_hint: str) -> list[str]:
+def _extract_observed_successful_commands(md_text: str, platform_hint: str, doc=None,
+                                          audit_root: str | None = None) -> list[str]:
+    """
+    Commands echoed in '## show ...' blocks whose output is substantive (no error
+    markers, more than prompts/timestamps). Uses the host's MdDoc when given.
+    """
     if not md_text:
         return []
-    plat = normalize_platform(platform_hint)
-    lines = md_text.splitlines()
-    ok: list[str] = []
-
-    # simple fence scanning: look for code blocks after a "## show ..."
-    i = 0
-    while i < len(lines):
-        hdr = lines[i].strip()
-        if re.match(r"^##\s+show\s+", hdr, re.IGNORECASE):
-            # find next code fence
-            j = i + 1
-            while j < len(lines) and not lines[j].lstrip().startswith("```"):
-                j += 1
-            if j >= len(lines):
-                i += 1
-                continue
-            j += 1  # enter block
-            block = []
-            while j < len(lines) and not lines[j].lstrip().startswith("```"):
-                block.append(lines[j])
-                j += 1
-            # analyze first non-empty line as echoed command
-            k = 0
-            while k < len(block) and not block[k].strip():
-                k += 1
-            if k >= len(block):
-                i = j + 1
-                continue
-
-            echoed = block[k].strip()
-            clean = sanitize_show(echoed, plat)
-            if not clean:
-                i = j + 1
-                continue
-
-            body = block[k+1:]
-            block_text = "\n".join(body)
-
-            # error markers
-            if re.search(r"%(?:\s*Invalid input detected|\s*Incomplete command|\s*Ambiguous command|\s*Error)", block_text, re.IGNORECASE):
-                i = j + 1
-                continue
-            if re.search(r"(?:Unknown|Unrecognized)\s+command|syntax error|Command not supported", block_text, re.IGNORECASE):
-                i = j + 1
-                continue
-
-            # consider substantive if any non-prompt/non-timestamp non-empty line exists
-            def _is_prompt(s: str) -> bool:
-                s = s.strip()
-                return bool(re.match(r"^(?:RP/\d+/\w+\d+/CPU\d+:|[A-Za-z0-9._-]+(?:\([^)]+\))?[#>])\s*$", s))
-            def _is_ts(s: str) -> bool:
-                return bool(re.match(r"^\w{3}\s\w{3}\s+\d{1,2}\s", s.strip()))
-
-            meaningful = [l for l in body if l.strip() and not _is_prompt(l) and not _is_ts(l)]
-            if meaningful:
-                ok.append(clean)
-
-        i += 1
+    doc = doc if doc is not None else parse_md(md_text)
+    ok: list[str] = doc.observed(platform_hint)
 
     # audit
     try:
-        if AUDIT_ROOT:
-            os.makedirs(os.path.join(AUDIT_ROOT, "observed"), exist_ok=True)
-            write_audit(os.path.join(AUDIT_ROOT, "observed", "trusted_from_md.txt"),
+        if audit_root:
+            os.makedirs(os.path.join(audit_root, "observed"), exist_ok=True)
+            write_audit(os.path.join(audit_root, "observed", "trusted_from_md.txt"),
                         "\n".join(sorted(set(s.lower() for s in ok))))
     except Exception as e:
         dbg(f"[audit] failed writing trusted_from_md.txt: {e}")
@@ -1396,7 +1355,7 @@ def _extract_observed_successful_commands(md_text: str, platform_hint: str) -> l
 # Published per-platform allow-list:
 #   /_agent_knowledge/lexicon/_allow/<platform>.txt
 # Lines must be commands; each is sanitized per-platform and only 'show ...' survives.
-def _load_platform_allowlist_from_disk(platform_hint: str) -> set[str]:
+def _load_platform_allowlist_from_disk(platform_hint: str, audit_root: str | None = None) -> set[str]:
     from agent5_shared import LEXICON_ROOT  # already defined in agent5_shared
     plat = normalize_platform(platform_hint)
     allow_path = os.path.join(LEXICON_ROOT, "_allow", f"{plat}.txt")
@@ -1419,9 +1378,9 @@ def _load_platform_allowlist_from_disk(platform_hint: str) -> set[str]:
 
     # audit
     try:
-        if AUDIT_ROOT:
-            os.makedirs(os.path.join(AUDIT_ROOT, "trust"), exist_ok=True)
-            write_audit(os.path.join(AUDIT_ROOT, "trust", "trusted_from_lexicon.txt"),
+        if audit_root:
+            os.makedirs(os.path.join(audit_root, "trust"), exist_ok=True)
+            write_audit(os.path.join(audit_root, "trust", "trusted_from_lexicon.txt"),
                         "\n".join(sorted(allowed)))
     except Exception as e:
         dbg(f"[audit] failed writing trusted_from_lexicon.txt: {e}")
@@ -1434,13 +1393,16 @@ def _split_trusted_unvalidated_corrected(
     host_facts: dict | None,
     md_text: str,
     show_cmds: list[str] | None,  # ignored by design
+    doc=None,                     # agent5_mddoc.MdDoc of md_text
+    audit_root: str | None = None,
 ) -> dict:
     hostname = obj.get("hostname", "Unknown Host")
     plat_hint = obj.get("platform") or (host_facts.get("platform_hint") if isinstance(host_facts, dict) else "unknown")
 
     # 1) Build sources
-    observed_ok = set(s.lower() for s in _extract_observed_successful_commands(md_text, plat_hint))
-    lex_ok      = _load_platform_allowlist_from_disk(plat_hint)
+    observed_ok = set(s.lower() for s in _extract_observed_successful_commands(md_text, plat_hint, doc=doc,
+                                                                                audit_root=audit_root))
+    lex_ok      = _load_platform_allowlist_from_disk(plat_hint, audit_root=audit_root)
 
     pool = observed_ok | lex_ok
     src_map = {
@@ -1486,9 +1448,9 @@ def _split_trusted_unvalidated_corrected(
 
     # 3) Write per-host trace
     try:
-        if AUDIT_ROOT:
-            os.makedirs(os.path.join(AUDIT_ROOT, "trust"), exist_ok=True)
-            write_audit(os.path.join(AUDIT_ROOT, "trust", f"trace_{hostname}.ndjson"), "\n".join(trace_lines))
+        if audit_root:
+            os.makedirs(os.path.join(audit_root, "trust"), exist_ok=True)
+            write_audit(os.path.join(audit_root, "trust", f"trace_{hostname}.ndjson"), "\n".join(trace_lines))
     except Exception as e:
         dbg(f"[audit] failed to write trace for {hostname}: {e}")
 
@@ -1497,6 +1459,23 @@ def _split_trusted_unvalidated_corrected(
 # ---------- Slack command: /operational-analyze <config_dir> <task_dir> ----------
 @app.command("/operational-analyze")
 def handle_operational_analyze(ack, command, respond, logger):
+    # Account every LLM call of this run (incl. provider-cached prompt tokens);
+    # record/replay them under <task>/cassettes when CASSETTE_MODE is set
+    args = (command.get("text") or "").split()
+    cassette_dir = os.path.join(REPO_ROOT, *args, "cassettes") if len(args) == 2 else None
+    with use_cassette(cassette_dir), \
+            usage_run(f"agent5:/operational-analyze {(command.get('text') or '').strip()}") as meter:
+        audit_root = _run_operational_analyze(ack, command, respond, logger)
+    usage = meter.as_dict()
+    if usage.get("calls") and audit_root:
+        try:
+            write_audit(os.path.join(audit_root, "_llm_usage.json"), json.dumps(usage, indent=2))
+        except Exception as e:
+            dbg(f"[audit] failed writing _llm_usage.json: {e}")
+
+
+def _run_operational_analyze(ack, command, respond, logger):
+    """Returns this run's audit root (None if the request was rejected)."""
     # Ack once, right away
     ack({"response_type": "ephemeral", "text": "Starting analysis !!"})
 
@@ -1530,12 +1509,12 @@ def handle_operational_analyze(ack, command, respond, logger):
     out_dir = os.path.join(REPO_ROOT, config_dir, task_dir)
     os.makedirs(out_dir, exist_ok=True)
 
-    global AUDIT_ROOT
-    AUDIT_ROOT = os.path.join(out_dir, "agent5_audit")
+    # Per run, passed down explicitly: concurrent jobs (agent5_jobs) analyze different tasks
+    audit_root = os.path.join(out_dir, "agent5_audit")
     try:
-        os.makedirs(AUDIT_ROOT, exist_ok=True)
+        os.makedirs(audit_root, exist_ok=True)
     except Exception as e:
-        dbg(f"[audit] could not create {AUDIT_ROOT}: {e}")
+        dbg(f"[audit] could not create {audit_root}: {e}")
 
 
     # v3
@@ -1547,7 +1526,7 @@ def handle_operational_analyze(ack, command, respond, logger):
 
     # Archive show_cmds.ini into audit (helps triage)
     try:
-        sc_path = os.path.join(AUDIT_ROOT, "_show_cmds.ini.txt")
+        sc_path = os.path.join(audit_root, "_show_cmds.ini.txt")
         with open(sc_path, "w", encoding="utf-8") as fh:
             fh.write("\n".join(show_cmds) + ("\n" if show_cmds else ""))
         dbg(f"[audit] wrote {sc_path}")
@@ -1558,11 +1537,12 @@ def handle_operational_analyze(ack, command, respond, logger):
     agent1 = _load_agent1_latest(config_dir, task_dir)  # JSON array from Agent‑1
     md_pairs = _read_device_md_files(config_dir, task_dir)
     if not md_pairs:
-        slack.chat_postMessage(
-            channel=channel_id,
-            text=f"No Markdown logs found under `{config_dir}/{task_dir}/grading_logs`."
-        )
-        return
+        for ch in _result_channels(channel_id):
+            slack.chat_postMessage(
+                channel=ch,
+                text=f"No Markdown logs found under `{config_dir}/{task_dir}/grading_logs`."
+            )
+        return audit_root
 
     # inputs snapshot for audit
     try:
@@ -1574,22 +1554,24 @@ def handle_operational_analyze(ack, command, respond, logger):
             "md_files=" + ", ".join([h for h,_ in md_pairs])
         ]
         dbg(f"[inputs] " + " | ".join(inputs_txt))
-        if AUDIT_ROOT:
-            write_audit(os.path.join(AUDIT_ROOT, "_inputs.txt"), "\n".join(inputs_txt) + "\n")
+        if audit_root:
+            write_audit(os.path.join(audit_root, "_inputs.txt"), "\n".join(inputs_txt) + "\n")
     except Exception as e:
         dbg(f"[inputs] failed to write inputs snapshot: {e}")
 
 
     # v3
-    facts_bundle = []           # collect per-device facts
-    facts_dir = os.path.join(AUDIT_ROOT, "facts")
+    facts_dir = os.path.join(audit_root, "facts")
     os.makedirs(facts_dir, exist_ok=True)
 
     # Load observed & lexicon once for the task
     observed_cmds_task = load_observed_commands(config_dir, task_dir)
 
-    for host, md_text in md_pairs:
-        platform_hint = _infer_platform_hint_from_md(md_text)
+    # same for every host
+    sig_from_ini = derive_dynamic_signals("\n".join(show_cmds))
+
+    def _facts_for(host, md_text, doc):
+        platform_hint = doc.platform_hint
         signals = _default_signals()
         dbg(f"[facts] extracting facts for host={host}")
 
@@ -1608,28 +1590,18 @@ def handle_operational_analyze(ack, command, respond, logger):
             agent1_obj=_find_agent1_for_host(agent1, host) if isinstance(agent1, list) else None,
             observed_cmds=observed_cmds_task,
             lexicon_candidates=lex_cands,
+            doc=doc,
         )
-        facts_bundle.append(facts_obj)
-
-    #  v4 - Build quick lookup by hostname for reconciliation
-    facts_index = {f.get("hostname"): f for f in facts_bundle if isinstance(f, dict)}
-
-    # persist the facts as a single file (optional)
-    facts_path = os.path.join(out_dir, "agent5_facts.json")
-    _persist_json(facts_bundle, facts_path)
-    dbg(f"[persist] facts JSON → {facts_path}")
+        return facts_obj
 
-    # Per-device loop
-    per_device_objs = []
-    for host, md_text in md_pairs:
-        platform_hint = _infer_platform_hint_from_md(md_text)
+    def _per_device_for(host, md_text, host_facts, doc, audit_root):
+        platform_hint = doc.platform_hint
 
         # --- dynamic signals derived from evidence (single calc only) ---
-        sig_from_md = derive_dynamic_signals(md_text)
+        sig_from_md = derive_dynamic_signals(md_text, doc=doc)
         sig_from_agent1 = derive_dynamic_signals(
             "", _find_agent1_for_host(agent1, host) if isinstance(agent1, list) else None
         )
-        sig_from_ini = derive_dynamic_signals("\n".join(show_cmds))
         signals = set()
         signals |= sig_from_md
         signals |= sig_from_agent1
@@ -1642,7 +1614,7 @@ def handle_operational_analyze(ack, command, respond, logger):
         #     facts=facts_index.get(host) or {},
         #     agent1_for_host=_find_agent1_for_host(agent1, host) if isinstance(agent1, list) else None,
         #     call_llm_fn=call_llm,
-        #     audit_dir=AUDIT_ROOT,
+        #     audit_dir=audit_root,
         # )
 
         # obj = per_device_analyze_with_llm(
@@ -1656,17 +1628,18 @@ def handle_operational_analyze(ack, command, respond, logger):
         #     host_facts=facts_index.get(host)
         # )
         # # Schema-driven safety patch
-        # obj = critic_patch(obj, facts_index.get(host), AUDIT_ROOT)
+        # obj = critic_patch(obj, facts_index.get(host), audit_root)
 
         obj = per_device_analyze_with_llm(
             hostname=host,
             md_text=md_text,
             agent1_obj=_find_agent1_for_host(agent1, host) if isinstance(agent1, list) else None,
-            platform_hint=_infer_platform_hint_from_md(md_text),
+            platform_hint=platform_hint,
             signals=signals,
             allow_active=False,
             show_cmds=show_cmds,
-            host_facts=facts_index.get(host)
+            host_facts=host_facts,
+            audit_root=audit_root,
         )
 
         # NEW: map recommended_show_cmds → trusted_commands vs unvalidated_cmds using *facts only*
@@ -1675,10 +1648,11 @@ def handle_operational_analyze(ack, command, respond, logger):
         # DEBUG version
         # obj = _split_trusted_unvalidated_debug(obj, facts_index.get(host), md_text, show_cmds)
 
-        obj = _split_trusted_unvalidated_corrected(obj, facts_index.get(host), md_text, show_cmds)
+        obj = _split_trusted_unvalidated_corrected(obj, host_facts, md_text, show_cmds, doc=doc,
+                                                   audit_root=audit_root)
 
         # Schema-driven safety patch
-        obj = critic_patch(obj, facts_index.get(host), AUDIT_ROOT)
+        obj = critic_patch(obj, host_facts, audit_root)
 
         # # ---- Map LLM's 'recommended_show_cmds' to UI fields (trusted vs unvalidated)
         # recs = obj.get("recommended_show_cmds") or []
@@ -1699,7 +1673,40 @@ def handle_operational_analyze(ack, command, respond, logger):
             f"trusted={len(obj.get('trusted_commands') or [])} "
             f"unvalidated={len(obj.get('unvalidated_cmds') or [])}")
 
-        per_device_objs.append(obj)
+        return obj
+
+    def _host_pipeline(host, md_text, audit_root):
+        # per-device analysis only needs this host's facts: start it right away
+        doc = parse_md(md_text, _PROTO_SCANNER)       # one pass over the md, shared below
+        facts_obj = _facts_for(host, md_text, doc)
+        job_step("facts")
+        host_facts = facts_obj if isinstance(facts_obj, dict) and facts_obj.get("hostname") == host else None
+        obj = _per_device_for(host, md_text, host_facts, doc, audit_root)
+        job_step("per_device")
+        return facts_obj, obj
+
+    # Facts → per-device as one pipeline per host over a bounded pool; results in md_pairs order
+    job_phase("facts", len(md_pairs))
+    job_phase("per_device", len(md_pairs), current=False)
+    results = [None] * len(md_pairs)
+    pool = ThreadPoolExecutor(max_workers=max(1, min(HOST_WORKERS, len(md_pairs))),
+                              thread_name_prefix="agent5-host")
+    try:
+        futures = {
+            pool.submit(contextvars.copy_context().run, _host_pipeline, host, md_text, audit_root): i
+            for i, (host, md_text) in enumerate(md_pairs)
+        }
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)   # on error/cancel: drop hosts not started
+    facts_bundle = [r[0] for r in results]
+    per_device_objs = [r[1] for r in results]
+
+    # persist the facts as a single file (optional)
+    facts_path = os.path.join(out_dir, "agent5_facts.json")
+    _persist_json(facts_bundle, facts_path)
+    dbg(f"[persist] facts JSON → {facts_path}")
 
     # Persist per-device bundle
     per_device_path = os.path.join(out_dir, "agent5_per_device.json")
@@ -1710,7 +1717,8 @@ def handle_operational_analyze(ack, command, respond, logger):
         dbg(f"[persist] per-device JSON → {per_device_path} (size n/a)")
 
     # Cross-device aggregation
-    agg = cross_device_analyze_with_llm(per_device_objs)
+    job_phase("cross_device", 1)
+    agg = cross_device_analyze_with_llm(per_device_objs, audit_root=audit_root)
     # --- sanitize cross-device incidents to known devices only ---
     known = {obj.get("hostname") for obj in per_device_objs}
     clean_incidents = []
@@ -1728,6 +1736,7 @@ def handle_operational_analyze(ack, command, respond, logger):
         dbg(f"[persist] cross-device JSON → {cross_path} ({os.path.getsize(cross_path)} bytes)")
     except Exception:
         dbg(f"[persist] cross-device JSON → {cross_path} (size n/a)")
+    job_step("cross_device")
 
     # Build Slack message
     blocks = _build_cross_device_block(agg, config_dir, task_dir)
@@ -1739,16 +1748,28 @@ def handle_operational_analyze(ack, command, respond, logger):
             {"type": "mrkdwn", "text": f"... and {len(per_device_objs)-5} more devices. See JSON attachments."}
         ]})
 
-    try:
-        slack.chat_postMessage(channel=channel_id, blocks=blocks, text="Operational Analysis")
-    except SlackApiError:
-        slack.chat_postMessage(channel=channel_id, text="Operational analysis complete. See attachments.")
-
-    # Attach JSON artifacts
-    _post_files(channel_id, [
-        (per_device_path, "Agent‑5 Per‑device Analysis (JSON)"),
-        (cross_path, "Agent‑5 Cross‑device Analysis (JSON)"),
-    ])
+    for ch in _result_channels(channel_id):
+        try:
+            slack.chat_postMessage(channel=ch, blocks=blocks, text="Operational Analysis")
+        except SlackApiError:
+            slack.chat_postMessage(channel=ch, text="Operational analysis complete. See attachments.")
+
+        # Attach JSON artifacts
+        _post_files(ch, [
+            (per_device_path, "Agent‑5 Per‑device Analysis (JSON)"),
+            (cross_path, "Agent‑5 Cross‑device Analysis (JSON)"),
+        ])
+    return audit_root
+
+
+def _result_channels(channel_id: str) -> list[str]:
+    """This run's channel plus those of requests coalesced onto its job (agent5_jobs)."""
+    channels = [channel_id]
+    for r in job_requests():
+        ch = r.get("channel")
+        if ch and ch not in channels:
+            channels.append(ch)
+    return channels
 
 
 # ---------- helper: pick agent‑1 row for host ----------
@@ -0,0 +1,204 @@
+# ai_agents/agents/agent-7/adk_cache.py
+# Global (task-independent) ADK documentation cache for adk_client
+# (also holds the memoized canonical-command verdicts, under adk_verdicts/).
+#
+# Replaces agent7/meta/adk_cache.json, which was per task and rewritten in full
+# after every query_docs call:
+#   • Entries are keyed by the request hash (query/platform/signal/version/limit) and
+#     shared by all tasks: <repo_root>/_agent_knowledge/adk_cache/<0-f>.json
+#     (16 shards by the key's first hex digit).
+#   • In memory: LRU capped at AGENT7_ADK_CACHE_MAX_ENTRIES; TTL checked per lookup.
+#   • Write-behind: new entries are buffered and written per dirty shard once
+#     AGENT7_ADK_FLUSH_EVERY are pending or the oldest is AGENT7_ADK_FLUSH_S old,
+#     on flush() (end of plan_commands) and at exit.
+#   • A shard write takes an flock, merges with what is on disk (newest ts wins),
+#     drops entries older than the TTL, caps the shard and replaces it atomically,
+#     so concurrent planner runs (threads or processes) keep each other's entries.
+from __future__ import annotations
+import os, json, time, atexit, threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # no cross-process shard lock
+    fcntl = None
+
+MAX_ENTRIES = int(os.getenv("AGENT7_ADK_CACHE_MAX_ENTRIES", "4096"))
+FLUSH_EVERY = int(os.getenv("AGENT7_ADK_FLUSH_EVERY", "32"))
+FLUSH_S = float(os.getenv("AGENT7_ADK_FLUSH_S", "5"))
+SHARDS = 16
+
+
+def _dbg(msg: str) -> None:
+    print(f"[agent7][adk-cache] {msg}", flush=True)
+
+
+class DocCache:
+    def __init__(self, root: str, ttl_s: float, max_entries: int = MAX_ENTRIES,
+                 flush_every: int = FLUSH_EVERY, flush_s: float = FLUSH_S) -> None:
+        self.root = root
+        self.ttl_s = ttl_s                  # disk retention; lookups pass their own TTL
+        self.max_entries = max(SHARDS, max_entries)
+        self.flush_every = max(1, flush_every)
+        self.flush_s = flush_s
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._shard_mtime: Dict[str, float] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_since: Optional[float] = None
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0,
+                       "flushes": 0, "shard_writes": 0}
+
+    # ---- shards ----
+    def _shard(self, key: str) -> str:
+        return (key[:1] or "0").lower()
+
+    def _shard_path(self, shard: str) -> str:
+        return os.path.join(self.root, f"{shard}.json")
+
+    def _read_shard(self, path: str) -> Dict[str, Any]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _refresh_shard(self, shard: str) -> None:
+        """(Re)load a shard into memory if it changed on disk since we last read it (lock held)."""
+        path = self._shard_path(shard)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return
+        if self._shard_mtime.get(shard) == mtime:
+            return
+        self._shard_mtime[shard] = mtime
+        self._merge(self._read_shard(path))
+
+    def _merge(self, data: Dict[str, Any]) -> None:
+        """Take shard entries into memory, newest ts wins (lock held)."""
+        for key, entry in data.items():
+            cur = self._mem.get(key)
+            if cur is None or entry.get("ts", 0) > cur.get("ts", 0):
+                self._mem[key] = entry
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    # ---- public ----
+    def get(self, key: str, ttl_s: float) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            if key not in self._mem:
+                self._refresh_shard(self._shard(key))
+            entry = self._mem.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if time.time() - entry.get("ts", 0) > ttl_s:
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._mem.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.get("results", [])
+
+    def put(self, key: str, request: Dict[str, Any], results: List[Dict[str, Any]]) -> None:
+        entry = {"ts": time.time(), "request": request, "results": results}
+        with self._lock:
+            self._mem[key] = entry
+            self._mem.move_to_end(key)
+            self._evict()
+            self._pending[key] = entry
+            self._stats["stores"] += 1
+            if self._pending_since is None:
+                self._pending_since = time.time()
+            due = (len(self._pending) >= self.flush_every
+                   or time.time() - self._pending_since >= self.flush_s)
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending, self._pending_since = self._pending, {}, None
+        if not pending:
+            return
+        by_shard: Dict[str, Dict[str, Any]] = {}
+        for key, entry in pending.items():
+            by_shard.setdefault(self._shard(key), {})[key] = entry
+        try:
+            os.makedirs(self.root, exist_ok=True)
+        except OSError as e:
+            _dbg(f"cannot create {self.root}: {e}")
+            return
+        for shard, entries in by_shard.items():
+            try:
+                self._write_shard(shard, entries)
+            except OSError as e:
+                _dbg(f"shard {shard} write failed: {e}")
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["shard_writes"] += len(by_shard)
+
+    def _write_shard(self, shard: str, entries: Dict[str, Any]) -> None:
+        path = self._shard_path(shard)
+        with open(path + ".lock", "a+") as lk:
+            if fcntl is not None:
+                fcntl.flock(lk, fcntl.LOCK_EX)
+            try:
+                data = self._read_shard(path)
+                for key, entry in entries.items():
+                    if entry.get("ts", 0) >= data.get(key, {}).get("ts", 0):
+                        data[key] = entry
+                now = time.time()
+                live = [(k, v) for k, v in data.items() if now - v.get("ts", 0) <= self.ttl_s]
+                live.sort(key=lambda kv: kv[1].get("ts", 0), reverse=True)
+                data = dict(live[: max(1, self.max_entries // SHARDS)])
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp, path)
+                with self._lock:
+                    # Other processes' entries were merged on disk: take them too before
+                    # marking the shard as read, or _refresh_shard would never load them
+                    self._merge(data)
+                    self._shard_mtime[shard] = os.stat(path).st_mtime
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lk, fcntl.LOCK_UN)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["entries"] = len(self._mem)
+            out["pending"] = len(self._pending)
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        return out
+
+
+_CACHES: Dict[str, DocCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_doc_cache(repo_root: str, ttl_s: float, name: str = "adk_cache") -> DocCache:
+    """One cache per knowledge root + name, shared by every ADKClient in the process."""
+    root = os.path.join(repo_root, "_agent_knowledge", name)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(root)
+        if cache is None:
+            cache = _CACHES[root] = DocCache(root, ttl_s)
+        cache.ttl_s = max(cache.ttl_s, ttl_s)
+        return cache
+
+
+@atexit.register
+def _flush_all() -> None:
+    for cache in list(_CACHES.values()):
+        try:
+            cache.flush()
+        except Exception:
+            pass
@@ -1,17 +1,18 @@
 # ai_agents/agents/agent-7/adk_client.py
 from __future__ import annotations
-import os, json, time, hashlib, re
-from typing import Any, Dict, List, Optional
+import os, json, hashlib, re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from bootstrap import Agent7Config, Agent7Paths, load_config, resolve_paths, ensure_dirs
+from adk_cache import get_doc_cache
 
 # ---------------------------
 # Optional deps (graceful if missing)
 # ---------------------------
 try:
-    from shared.llm_api import call_llm  # type: ignore
+    from shared.llm_api import call_llm, json_object  # type: ignore
 except Exception:
-    call_llm = None
+    call_llm = json_object = None
 
 try:
     from agent5_shared import dbg as _dbg, sanitize_show, normalize_platform  # type: ignore
@@ -30,36 +31,12 @@ except Exception:
         return "unknown"
 
 # ---------------------------
-# Cache helpers
+# Cache helpers (storage: adk_cache.py)
 # ---------------------------
-def _cache_path(paths: Agent7Paths) -> str:
-    # Keep it human-inspectable under meta/
-    return os.path.join(paths.meta_dir, "adk_cache.json")
-
-def _load_cache(paths: Agent7Paths) -> Dict[str, Any]:
-    fn = _cache_path(paths)
-    try:
-        with open(fn, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def _save_cache(paths: Agent7Paths, cache: Dict[str, Any]) -> None:
-    fn = _cache_path(paths)
-    try:
-        os.makedirs(os.path.dirname(fn), exist_ok=True)
-        with open(fn, "w", encoding="utf-8") as f:
-            json.dump(cache, f, indent=2)
-    except Exception:
-        pass
-
 def _hash_request(payload: Dict[str, Any]) -> str:
     s = json.dumps(payload, sort_keys=True, separators=(",", ":"))
     return hashlib.sha256(s.encode("utf-8")).hexdigest()[:16]
 
-def _expired(ts: float, ttl_min: int) -> bool:
-    return (time.time() - ts) > (ttl_min * 60)
-
 # ---------------------------
 # Seed (offline) provider
 # ---------------------------
@@ -135,25 +112,42 @@ def _norm_row(r: Dict[str, Any]) -> Dict[str, Any]:
 # ---------------------------
 # LLM helpers
 # ---------------------------
-_CANON_SYSTEM = """You are validating whether a CLI 'show ...' command is CANONICAL for a given signal on a platform.
-Return JSON only:
+_CANON_SYSTEM = """You are validating whether CLI 'show ...' commands are CANONICAL for a given signal on a platform.
+Return JSON only, one verdict per command, in the order given:
 {
-  "decision": "canonical" | "unknown",
-  "confidence": "high" | "medium" | "low",
-  "reasons": ["..."],
-  "evidence_urls": ["..."]
+  "verdicts": [
+    {
+      "command": "<exactly as given>",
+      "decision": "canonical" | "unknown",
+      "confidence": "high" | "medium" | "low",
+      "reasons": ["<short>"],
+      "evidence_urls": ["..."]
+    }
+  ]
 }
 Use the excerpts provided. Be conservative. If unclear, return "unknown".
 """
 
-def _llm_judge_canonical(cmd: str, signal: str, platform: str,
-                         snippets: List[Dict[str, Any]]) -> Dict[str, Any]:
-    if not call_llm:
-        return {"decision": "unknown", "confidence": "low", "reasons": ["LLM unavailable"], "evidence_urls": []}
+# Commands judged per LLM call (one platform + signal group)
+JUDGE_BATCH = int(os.getenv("AGENT7_ADK_JUDGE_BATCH", "24"))
+# Verdicts are memoized across tasks; they depend on the command and the doc excerpts
+VERDICT_TTL_MIN = int(os.getenv("AGENT7_ADK_VERDICT_TTL_MIN", str(7 * 24 * 60)))
+
+def _unknown(reason: str) -> Dict[str, Any]:
+    return {"decision": "unknown", "confidence": "low", "reasons": [reason], "evidence_urls": []}
+
+def _llm_judge_canonical_batch(cmds: List[str], signal: str, platform: str,
+                               snippets: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    One LLM call for several commands of one platform/signal.
+    Returns {command.lower(): verdict} for the commands the answer covered.
+    """
+    if not call_llm or not cmds:
+        return {}
     payload = {
         "platform": platform,
         "signal": signal,
-        "command": cmd,
+        "commands": cmds,
         "snippets": [
             {"title": s.get("title"), "url": s.get("url"), "excerpt": s.get("snippet") or s.get("excerpt")}
             for s in snippets[:8]
@@ -164,17 +158,40 @@ def _llm_judge_canonical(cmd: str, signal: str, platform: str,
             {"role": "system", "content": _CANON_SYSTEM},
             {"role": "user", "content": "```json\n" + json.dumps(payload, indent=2) + "\n```"}
         ]
-        raw = call_llm(msgs, temperature=0.0)  # deterministic
+        raw = call_llm(msgs, temperature=0.0, task="classify",  # deterministic
+                       validate=json_object("verdicts"), max_tokens=120 * len(cmds) + 100)
         try:
             obj = json.loads(raw)
         except Exception:
             m = re.search(r"```json\s*(.+?)\s*```", raw or "", flags=re.DOTALL | re.IGNORECASE)
             obj = json.loads(m.group(1)) if m else {}
-        if isinstance(obj, dict) and obj.get("decision"):
-            return obj
+        verdicts = obj.get("verdicts") if isinstance(obj, dict) else None
+        out: Dict[str, Dict[str, Any]] = {}
+        for i, v in enumerate(verdicts if isinstance(verdicts, list) else []):
+            if not isinstance(v, dict) or not v.get("decision"):
+                continue
+            cmd = str(v.get("command") or (cmds[i] if i < len(cmds) else "")).strip().lower()
+            if cmd:
+                v.pop("command", None)
+                out[cmd] = v
+        return out
     except Exception as e:
         _dbg(f"[llm] canonical judge failed: {e}")
-    return {"decision": "unknown", "confidence": "low", "reasons": ["parse_error"], "evidence_urls": []}
+        return {}
+
+def _keyword_verdict(clean: str, snippets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fallback without LLM/snippets: keyword-only, conservative."""
+    urls = [s.get("url") for s in snippets if isinstance(s, dict)]
+    text = " ".join((s.get("title", "") + " " + (s.get("snippet") or s.get("excerpt") or "")) for s in snippets)
+    look = clean.lower().replace("  ", " ")
+    decision = "canonical" if look in text.lower() else "unknown"
+    conf = "medium" if decision == "canonical" else "low"
+    return {
+        "decision": decision,
+        "confidence": conf,
+        "reasons": ["keyword_match" if decision == "canonical" else "insufficient_evidence"],
+        "evidence_urls": urls[:8],
+    }
 
 # ---------------------------
 # Public client
@@ -184,7 +201,7 @@ class ADKClient:
     Phase-1: hybrid doc fetcher
       • Uses local seed snippets (optional) for offline determinism.
       • Optional provider hook for Google ADK (stub).
-      • JSON cache with TTL under agent7/meta/adk_cache.json.
+      • Global doc cache with TTL, shared by all tasks (adk_cache.py).
       • LLM-backed canonical validation (optional).
     """
 
@@ -195,7 +212,11 @@ class ADKClient:
         ensure_dirs(self.paths)
         self.ttl_min = int(os.getenv("AGENT7_ADK_CACHE_TTL_MIN", str(cfg.cache_ttl_min or 15)))
         self.provider = _pick_provider()
-        self.cache = _load_cache(self.paths)
+        self.cache = get_doc_cache(cfg.repo_root, self.ttl_min * 60)
+        self.verdicts = get_doc_cache(cfg.repo_root, VERDICT_TTL_MIN * 60, name="adk_verdicts")
+        self._hits = 0
+        self._misses = 0
+        self.judge_stats = {"judged": 0, "memo_hits": 0, "llm_calls": 0}
 
     # ---- core search ----
     def query_docs(self, query: str, *, platform: str, signal: str,
@@ -210,9 +231,12 @@ class ADKClient:
         key = _hash_request(req)
 
         # cache check
-        entry = self.cache.get(key)
-        if entry and not force_refresh and not _expired(entry.get("ts", 0), self.ttl_min):
-            return entry.get("results", [])
+        if not force_refresh:
+            cached = self.cache.get(key, self.ttl_min * 60)
+            if cached is not None:
+                self._hits += 1
+                return cached
+        self._misses += 1
 
         # provider first (if configured)
         results: List[Dict[str, Any]] = []
@@ -228,11 +252,25 @@ class ADKClient:
             seed = _seed_lookup(self.cfg.repo_root, platform_n, signal)
             results = [_norm_row(r) for r in seed if isinstance(r, dict)]
 
-        # persist cache (normalized)
-        self.cache[key] = {"ts": time.time(), "request": req, "results": results}
-        _save_cache(self.paths, self.cache)
+        # cache (normalized); written behind, see flush()
+        self.cache.put(key, req, results)
         return results
 
+    def flush(self) -> None:
+        """Write buffered cache entries now (end of a planner run)."""
+        self.cache.flush()
+        self.verdicts.flush()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """This client's lookups plus the process-wide cache counters."""
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            "global": self.cache.stats(),
+        }
+
     # ---- judgment helpers ----
     def confirm_canonical(self, cmd: str, *, platform: str, signal: str,
                           version: Optional[str] = None) -> Dict[str, Any]:
@@ -240,30 +278,66 @@ class ADKClient:
         Validates whether 'cmd' appears canonical for the signal on this platform.
         Uses LLM over fetched snippets when available; otherwise falls back to keyword checks.
         """
-        clean = sanitize_show(cmd, platform)
-        if not clean:
-            return {"decision": "unknown", "confidence": "low", "reasons": ["not_a_show_cmd"], "evidence_urls": []}
-
-        # Build a neutral query around the topic (no hardcoding of command semantics)
-        topic_q = f"{signal} {platform} show command reference {version or ''}".strip()
-        snippets = self.query_docs(topic_q, platform=platform, signal=signal, version=version, limit=8)
-
-        # LLM route (preferred)
-        if snippets and call_llm:
-            return _llm_judge_canonical(clean, signal, platform, snippets)
-
-        # Fallback: keyword-only, conservative
-        urls = [s.get("url") for s in snippets if isinstance(s, dict)]
-        text = " ".join((s.get("title", "") + " " + (s.get("snippet") or s.get("excerpt") or "")) for s in snippets)
-        look = clean.lower().replace("  ", " ")
-        decision = "canonical" if look in text.lower() else "unknown"
-        conf = "medium" if decision == "canonical" else "low"
-        return {
-            "decision": decision,
-            "confidence": conf,
-            "reasons": ["keyword_match" if decision == "canonical" else "insufficient_evidence"],
-            "evidence_urls": urls[:8],
-        }
+        return self.confirm_canonical_batch([(cmd, signal, platform)], version=version)[0]
+
+    def confirm_canonical_batch(self, items: Iterable[Tuple[str, str, str]],
+                                version: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Verdicts for many (cmd, signal, platform) at once, in input order.
+        Candidates are deduped per (platform, signal); each group is judged with one
+        LLM call per AGENT7_ADK_JUDGE_BATCH commands, and verdicts are memoized across
+        tasks (keyed on command + doc excerpts, AGENT7_ADK_VERDICT_TTL_MIN).
+        """
+        items = list(items)
+        out: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        # (platform_n, signal) -> {cmd.lower(): (clean cmd, [item indexes])}
+        groups: Dict[Tuple[str, str], Dict[str, Tuple[str, List[int]]]] = {}
+        for i, (cmd, signal, platform) in enumerate(items):
+            clean = sanitize_show(cmd, platform)
+            if not clean:
+                out[i] = _unknown("not_a_show_cmd")
+                continue
+            g = groups.setdefault((normalize_platform(platform), (signal or "").lower()), {})
+            g.setdefault(clean.lower(), (clean, []))[1].append(i)
+
+        for (plat, sig), cmds in groups.items():
+            # Build a neutral query around the topic (no hardcoding of command semantics)
+            topic_q = f"{sig} {plat} show command reference {version or ''}".strip()
+            snippets = self.query_docs(topic_q, platform=plat, signal=sig, version=version, limit=8)
+            docs = _hash_request({"docs": [[s.get("url"), s.get("snippet")] for s in snippets]})
+
+            todo: List[Tuple[str, str, str]] = []   # (lower, clean, memo key)
+            for lc, (clean, idx) in cmds.items():
+                key = _hash_request({"cmd": lc, "platform": plat, "signal": sig, "docs": docs})
+                v = self.verdicts.get(key, VERDICT_TTL_MIN * 60) if snippets and call_llm else None
+                if v is not None:
+                    self.judge_stats["memo_hits"] += 1
+                    for i in idx:
+                        out[i] = dict(v)
+                else:
+                    todo.append((lc, clean, key))
+
+            if not snippets or not call_llm:
+                for lc, clean, _ in todo:
+                    v = _keyword_verdict(clean, snippets)
+                    for i in cmds[lc][1]:
+                        out[i] = dict(v)
+                continue
+
+            for n in range(0, len(todo), max(1, JUDGE_BATCH)):
+                chunk = todo[n:n + max(1, JUDGE_BATCH)]
+                got = _llm_judge_canonical_batch([c for _, c, _ in chunk], sig, plat, snippets)
+                self.judge_stats["llm_calls"] += 1
+                for lc, clean, key in chunk:
+                    v = got.get(lc)
+                    if v is None:
+                        v = _unknown("parse_error")     # not memoized: asked again next time
+                    else:
+                        self.verdicts.put(key, {"cmd": clean, "platform": plat, "signal": sig}, v)
+                        self.judge_stats["judged"] += 1
+                    for i in cmds[lc][1]:
+                        out[i] = dict(v)
+        return [v or _unknown("not_judged") for v in out]
 
     def suggest_canonical_commands(self, *, signal: str, platform: str,
                                    version: Optional[str] = None, limit: int = 6) -> List[str]:
@@ -288,7 +362,7 @@ class ADKClient:
                 {"role": "system", "content": sys},
                 {"role": "user", "content": "```json\n" + json.dumps(payload, indent=2) + "\n```"},
             ]
-            raw = call_llm(msgs, temperature=0.0)
+            raw = call_llm(msgs, temperature=0.0, task="extract", validate=json_object("commands"))
             obj = json.loads(raw)
             cmds = obj.get("commands", []) if isinstance(obj, dict) else []
             out = []
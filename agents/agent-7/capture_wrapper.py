@@ -1,5 +1,13 @@
+# ai_agents/agents/agent-7/capture_wrapper.py
+# Capture phase for Agent-7: runs Agent-4 with the plan INI and harvests show_logs.
+#
+# Every capture gets its own run dir, agent7/2-capture/runs/<run_id>/, and the runner
+# is told explicitly which INI to read and where to write ({INI_PATH} / {OUT_SUBDIR},
+# i.e. run_show_commands.py --ini ... --out-subdir ...). Nothing shared under the task
+# root is modified, so several captures on one task (agent-7 full capture, agent-8
+# triage, retries) can run side by side.
 from __future__ import annotations
-import os, json, time, shutil, subprocess, importlib.util
+import os, json, time, shutil, subprocess, importlib.util, inspect, uuid
 from typing import Any, Dict, List, Optional
 
 from bootstrap import Agent7Config, Agent7Paths, load_config, resolve_paths, ensure_dirs
@@ -15,20 +23,29 @@ def _read_json(path: str) -> dict:
 
 def _write_json(path: str, obj: Any) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as fh:
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
         json.dump(obj, fh, indent=2)
+    os.replace(tmp, path)
 
 def _copy_if_exists(src: str, dst: str) -> bool:
+    """Copy via a temp file + rename, so concurrent readers never see a partial log."""
     if not os.path.exists(src):
         return False
     os.makedirs(os.path.dirname(dst), exist_ok=True)
-    shutil.copy2(src, dst)
+    tmp = f"{dst}.{uuid.uuid4().hex[:8]}.tmp"
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
     return True
 
 def _plan_dir(paths: Agent7Paths) -> str:
     # canonical home for planning artifacts
     return os.path.join(paths.agent7_root, "1-plan")
 
+def _run_dir(paths: Agent7Paths, run_id: str) -> str:
+    # private output dir of one capture run
+    return os.path.join(paths.agent7_root, "2-capture", "runs", run_id)
+
 def _read_capture_plan(paths: Agent7Paths, explicit_plan: Optional[str]) -> tuple[List[str], str]:
     """
     Reads the capture plan JSON and returns (hosts, ini_path).
@@ -60,46 +77,14 @@ def _read_capture_plan(paths: Agent7Paths, explicit_plan: Optional[str]) -> tupl
     ini_path = plan.get("ini_path") or os.path.join(_plan_dir(paths), "show_cmds.plan.ini")
     return hosts, ini_path
 
-class _TempIniSwap:
-    """Temporarily place plan INI as <task_root>/show_cmds.ini and restore after run."""
-    def __init__(self, task_root: str, plan_ini: str, enable: bool) -> None:
-        self.task_root = task_root
-        self.plan_ini = plan_ini
-        self.enable = enable
-        self.orig = os.path.join(task_root, "show_cmds.ini")
-        self.back = os.path.join(task_root, "show_cmds.ini.agent7.backup")
-
-    def __enter__(self):
-        if not self.enable:
-            return self
-        if not os.path.exists(self.plan_ini):
-            raise FileNotFoundError(f"Plan INI not found: {self.plan_ini}")
-        if os.path.exists(self.orig):
-            shutil.copy2(self.orig, self.back)
-        shutil.copy2(self.plan_ini, self.orig)
-        _dbg(f"[ini] plan INI active at {self.orig}")
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        if not self.enable:
-            return False
-        try:
-            if os.path.exists(self.back):
-                shutil.move(self.back, self.orig)
-            else:
-                if os.path.exists(self.orig):
-                    os.remove(self.orig)
-        finally:
-            _dbg("[ini] plan INI restored")
-        return False
-
 def _invoke_agent4_shell(cmd_tmpl: str, env: dict) -> int:
     cmd = cmd_tmpl.format(**env)
     _dbg(f"[run] shell: {cmd}")
     proc = subprocess.run(cmd, shell=True)
     return int(proc.returncode or 0)
 
-def _invoke_agent4_python(py_path: str, func_name: str, kwargs: dict) -> int:
+def _invoke_agent4_python(py_path: str, func_name: str, kwargs: dict) -> tuple[int, bool]:
+    """Returns (rc, took_out_subdir): out_subdir is passed only if the entrypoint accepts it."""
     spec = importlib.util.spec_from_file_location("agent4_entry", py_path)
     if spec is None or spec.loader is None:
         raise RuntimeError("Could not load Agent-4 python entrypoint")
@@ -108,50 +93,63 @@ def _invoke_agent4_python(py_path: str, func_name: str, kwargs: dict) -> int:
     fn = getattr(mod, func_name, None)
     if not callable(fn):
         raise RuntimeError(f"Function {func_name} not found in {py_path}")
+    params = inspect.signature(fn).parameters
+    takes_out = "out_subdir" in params or any(p.kind == p.VAR_KEYWORD for p in params.values())
+    if not takes_out:
+        kwargs = {k: v for k, v in kwargs.items() if k != "out_subdir"}
     rc = fn(**kwargs)  # expected to return 0 on success
-    return int(rc or 0)
+    return int(rc or 0), takes_out
 
-def _run_agent4(paths: Agent7Paths, hosts: List[str], ini_path: str, config_dir: str, task_dir: str) -> int:
+def _run_agent4(paths: Agent7Paths, hosts: List[str], ini_path: str, config_dir: str, task_dir: str,
+                out_dir: str) -> tuple[int, bool]:
     """
     Two modes (env-driven):
-      • AGENT4_MODE=shell (default) with AGENT4_SHELL_CMD template
+      • AGENT4_MODE=shell (default) with AGENT4_SHELL_CMD template, e.g.
+          python3 {TASK_ROOT}/../run_show_commands.py --task {TASK_DIR} --ini {INI_PATH}
+            --out-subdir {OUT_SUBDIR} --devices {HOSTS}
       • AGENT4_MODE=python with AGENT4_PY_PATH + AGENT4_PY_FUNC
-    If AGENT4_EXPECTS_INI_IN_TASK=1, we swap show_cmds.ini during run.
+        (called with config_dir, task_dir, ini_path, hosts_csv[, out_subdir])
+    Returns (rc, wrote_to_out_dir). A runner that is not given the out dir (template
+    without {OUT_SUBDIR}/{OUT_DIR}, entrypoint without out_subdir) writes the legacy
+    <task_root>/show_logs, which concurrent captures share.
     """
     mode = os.getenv("AGENT4_MODE", "shell").strip().lower()
-    expects_ini_in_task = os.getenv("AGENT4_EXPECTS_INI_IN_TASK", "0").strip() in ("1", "true", "yes")
     hosts_csv = ",".join(hosts)
+    out_subdir = os.path.relpath(out_dir, start=paths.task_root)
     env_map = {
         "CONFIG_DIR": config_dir,
         "TASK_DIR": task_dir,
         "TASK_ROOT": paths.task_root,
         "INI_PATH": os.path.abspath(ini_path),
         "HOSTS_CSV": hosts_csv,
+        "HOSTS": " ".join(hosts),
+        "OUT_SUBDIR": out_subdir,
+        "OUT_DIR": os.path.abspath(out_dir),
     }
-    with _TempIniSwap(paths.task_root, ini_path, enable=expects_ini_in_task):
-        if mode == "python":
-            py_path = os.getenv("AGENT4_PY_PATH", "").strip()
-            py_func = os.getenv("AGENT4_PY_FUNC", "run_capture").strip()
-            if not py_path:
-                raise RuntimeError("AGENT4_PY_PATH not set for python mode")
-            kwargs = {
-                "config_dir": config_dir,
-                "task_dir": task_dir,
-                "ini_path": os.path.abspath(ini_path),
-                "hosts_csv": hosts_csv,
-            }
-            return _invoke_agent4_python(py_path, py_func, kwargs)
-
-        cmd_tmpl = os.getenv("AGENT4_SHELL_CMD", "").strip()
-        if not cmd_tmpl:
-            raise RuntimeError("AGENT4_SHELL_CMD not set for shell mode")
-        return _invoke_agent4_shell(cmd_tmpl, env_map)
-
-def _harvest_show_logs(paths: Agent7Paths, hosts: List[str]) -> Dict[str, Any]:
+    if mode == "python":
+        py_path = os.getenv("AGENT4_PY_PATH", "").strip()
+        py_func = os.getenv("AGENT4_PY_FUNC", "run_capture").strip()
+        if not py_path:
+            raise RuntimeError("AGENT4_PY_PATH not set for python mode")
+        kwargs = {
+            "config_dir": config_dir,
+            "task_dir": task_dir,
+            "ini_path": os.path.abspath(ini_path),
+            "hosts_csv": hosts_csv,
+            "out_subdir": out_subdir,
+        }
+        return _invoke_agent4_python(py_path, py_func, kwargs)
+
+    cmd_tmpl = os.getenv("AGENT4_SHELL_CMD", "").strip()
+    if not cmd_tmpl:
+        raise RuntimeError("AGENT4_SHELL_CMD not set for shell mode")
+    takes_out = "{OUT_SUBDIR}" in cmd_tmpl or "{OUT_DIR}" in cmd_tmpl
+    return _invoke_agent4_shell(cmd_tmpl, env_map), takes_out
+
+def _harvest_show_logs(paths: Agent7Paths, hosts: List[str], src_dir: str) -> Dict[str, Any]:
     """
-    Copy <task_root>/show_logs/<host>.md → agent7/2-capture/show_logs/<host>.md
+    Copy <run dir>/show_logs/<host>.md → agent7/2-capture/show_logs/<host>.md
     """
-    src_dir = os.path.join(paths.task_root, "show_logs")
     dst_dir = paths.show_logs_dir  # should be agent7/2-capture/show_logs per bootstrap
     os.makedirs(dst_dir, exist_ok=True)
 
@@ -164,14 +162,14 @@ def _harvest_show_logs(paths: Agent7Paths, hosts: List[str]) -> Dict[str, Any]:
         else:
             missing.append(h)
     _dbg(f"[copy] copied={len(copied)} missing={len(missing)} → {dst_dir}")
-    return {"copied": copied, "missing": missing, "dst_dir": dst_dir}
+    return {"copied": copied, "missing": missing, "src_dir": src_dir, "dst_dir": dst_dir}
 
 def run_capture(config_dir: str, task_dir: str, plan_path: Optional[str] = None, hosts_override: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     1) Read capture plan + plan INI
-    2) Invoke Agent-4 (shell or python mode)
+    2) Invoke Agent-4 (shell or python mode) → agent7/2-capture/runs/<run_id>/
     3) Copy ONLY show_logs into agent7/2-capture/show_logs/
-    4) Write audit summary
+    4) Write audit summary (run dir + agent7/meta/capture_summary.json)
     """
     cfg = load_config()
     paths = resolve_paths(cfg, config_dir, task_dir)
@@ -186,16 +184,24 @@ def run_capture(config_dir: str, task_dir: str, plan_path: Optional[str] = None,
         raise FileNotFoundError(f"Plan INI not found: {ini_path}")
 
     started = int(time.time())
-    _dbg(f"[start] hosts={hosts} ini={ini_path}")
+    run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    out_dir = _run_dir(paths, run_id)
+    os.makedirs(out_dir, exist_ok=True)
+    _dbg(f"[start] run={run_id} hosts={hosts} ini={ini_path}")
 
-    rc = _run_agent4(paths, hosts, ini_path, config_dir, task_dir)
+    rc, isolated = _run_agent4(paths, hosts, ini_path, config_dir, task_dir, out_dir)
     if rc != 0:
         _dbg(f"[agent4] non-zero return code: {rc}")
+    if not isolated:
+        _dbg("[agent4] runner was not given the run dir; harvesting shared <task_root>/show_logs")
 
-    harvest = _harvest_show_logs(paths, hosts)
+    src_dir = os.path.join(out_dir if isolated else paths.task_root, "show_logs")
+    harvest = _harvest_show_logs(paths, hosts, src_dir)
     summary = {
         "config_dir": config_dir,
         "task_dir": task_dir,
+        "run_id": run_id,
+        "run_dir": out_dir,
         "hosts": hosts,
         "ini_path": os.path.abspath(ini_path),
         "agent4_rc": rc,
@@ -203,7 +209,8 @@ def run_capture(config_dir: str, task_dir: str, plan_path: Optional[str] = None,
         "started_at": started,
         "finished_at": int(time.time()),
     }
-    _write_json(os.path.join(paths.meta_dir, "capture_summary.json"), summary)
+    _write_json(os.path.join(out_dir, "capture_summary.json"), summary)
+    _write_json(os.path.join(paths.meta_dir, "capture_summary.json"), summary)  # latest run
     _dbg(f"[done] rc={rc} → agent7/2-capture/show_logs")
     return summary
 
@@ -5,8 +5,8 @@
 #   • agent7/1-plan/capture_plan.json
 from __future__ import annotations
 
-import os, re, json, glob, time
-from typing import Any, Dict, List, Set, Optional
+import os, re, json, glob, time, hashlib
+from typing import Any, Dict, List, Set, Optional, Tuple
 
 # ---- bootstrap (pure imports) ----
 from bootstrap import (
@@ -283,6 +283,57 @@ def _limit(lst: List[str], n: int) -> List[str]:
             break
     return out
 
+def _group_key(plat: str, signals: List[str], trusted_pool: Set[str]) -> Tuple[str, Tuple[str, ...], str]:
+    fp = hashlib.sha1("\n".join(sorted(trusted_pool)).encode("utf-8")).hexdigest()
+    return plat, tuple(signals), fp
+
+def _propose(
+    plat: str,
+    signals: List[str],
+    trusted_pool: Set[str],
+    adk_client: Any,
+    *,
+    include_lexicon: bool,
+    lexicon_memo: Dict[str, List[str]],
+) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """Lexicon extras + ADK suggestions for one (platform, signals, trusted pool) group."""
+    proposed: Dict[str, List[str]] = {}
+    reasons: Dict[str, List[str]] = {}
+
+    # optional lexicon extras
+    if include_lexicon:
+        if plat not in lexicon_memo:
+            try:
+                lex_cmds = load_lexicon_candidates(plat)
+            except Exception:
+                lex_cmds = []
+            lexicon_memo[plat] = [c for c in (sanitize_show(x, plat) for x in lex_cmds) if c]
+        for clean in lexicon_memo[plat]:
+            if clean.lower() in trusted_pool:
+                continue
+            proposed.setdefault("lexicon", []).append(clean)
+
+    # ADK suggestions per signal (if enabled)
+    if adk_client:
+        for sig in signals:
+            try:
+                cand = adk_client.suggest_canonical_commands(signal=sig, platform=plat) or []
+            except Exception:
+                cand = []
+            kept: List[str] = []
+            for cc in cand:
+                cl = sanitize_show(cc, plat)
+                if not cl:
+                    continue
+                if cl.lower() in trusted_pool:
+                    continue
+                kept.append(cl)
+            if kept:
+                proposed.setdefault(sig, []).extend(kept)
+                reasons.setdefault(sig, []).append("adk_suggest")
+
+    return proposed, reasons
+
 # ---------------------------
 # Public API
 # ---------------------------
@@ -294,11 +345,14 @@ def plan_commands(
     per_signal_limit: int = 3,
     use_adk: bool = True,
     include_lexicon: bool = True,
+    confirm_canonical: bool = False,
 ) -> Dict[str, Any]:
     """
     Main entrypoint. Returns a plan dict and writes:
       • agent7/1-plan/show_cmds.plan.ini
       • agent7/1-plan/capture_plan.json
+    confirm_canonical: keep only ADK suggestions judged canonical; all hosts'
+    candidates are judged together (one LLM call per platform + signal group).
     """
     cfg: Agent7Config = load_config()
     paths: Agent7Paths = resolve_paths(cfg, config_dir, task_dir)
@@ -326,7 +380,12 @@ def plan_commands(
         "hosts": {},
     }
 
-    # per-host synthesis
+    # per-host synthesis (ADK suggestions are limited after the optional batch judgment)
+    # Hosts with the same platform, signals and trusted pool get identical proposals:
+    # compute once per group and fan out.
+    staged: Dict[str, Dict[str, Any]] = {}
+    groups: Dict[Tuple[str, Tuple[str, ...], str], Tuple[Dict[str, List[str]], Dict[str, List[str]]]] = {}
+    lexicon_memo: Dict[str, List[str]] = {}
     for host in target_hosts:
         md_text = md_map.get(host, "")
         fx = facts_by.get(host, {})
@@ -334,47 +393,45 @@ def plan_commands(
         signals = _signals_for_host(host, harvested, md_text, fx)
         trusted_pool = _present_trusted_pool(md_text, fx, ini_cmds)
 
-        proposed: Dict[str, List[str]] = {}
-        reasons: Dict[str, List[str]] = {}
-
-        # optional lexicon extras
-        if include_lexicon:
-            try:
-                lex_cmds = load_lexicon_candidates(plat)
-            except Exception:
-                lex_cmds = []
-            for c in lex_cmds:
-                clean = sanitize_show(c, plat)
-                if not clean:
-                    continue
-                if clean.lower() in trusted_pool:
+        key = _group_key(plat, signals, trusted_pool)
+        if key not in groups:
+            groups[key] = _propose(plat, signals, trusted_pool, adk_client,
+                                   include_lexicon=include_lexicon, lexicon_memo=lexicon_memo)
+        proposed = {k: list(v) for k, v in groups[key][0].items()}   # per-host copies (judge filters them)
+        reasons = {k: list(v) for k, v in groups[key][1].items()}
+
+        staged[host] = {"platform": plat, "signals": signals, "trusted_pool": trusted_pool,
+                        "proposed": proposed, "reasons": reasons}
+
+    plan["plan_groups"] = {"groups": len(groups), "hosts": len(staged)}
+    _dbg(f"[plan] groups={len(groups)} computed for hosts={len(staged)}")
+
+    # canonical judgment across all hosts at once
+    if adk_client and confirm_canonical:
+        items = [(c, sig, st["platform"])
+                 for st in staged.values()
+                 for sig, cmds in st["proposed"].items() if sig != "lexicon"
+                 for c in cmds]
+        verdicts = adk_client.confirm_canonical_batch(items) if items else []
+        it = iter(verdicts)
+        for st in staged.values():
+            for sig, cmds in list(st["proposed"].items()):
+                if sig == "lexicon":
                     continue
-                proposed.setdefault("lexicon", []).append(clean)
-
-        # ADK suggestions per signal (if enabled)
-        if adk_client:
-            for sig in signals:
-                try:
-                    cand = adk_client.suggest_canonical_commands(signal=sig, platform=plat) or []
-                except Exception:
-                    cand = []
-                kept: List[str] = []
-                for cc in cand:
-                    cl = sanitize_show(cc, plat)
-                    if not cl:
-                        continue
-                    if cl.lower() in trusted_pool:
-                        continue
-                    kept.append(cl)
-                if kept:
-                    proposed.setdefault(sig, []).extend(_limit(kept, per_signal_limit))
-                    reasons.setdefault(sig, []).append("adk_suggest")
+                st["proposed"][sig] = [c for c in cmds if next(it).get("decision") == "canonical"]
+                st["reasons"].setdefault(sig, []).append("adk_confirmed")
+        plan["canonical_judge"] = dict(adk_client.judge_stats, candidates=len(items))
+
+    for host in target_hosts:
+        st = staged[host]
+        plat, signals, trusted_pool = st["platform"], st["signals"], st["trusted_pool"]
+        proposed, reasons = st["proposed"], st["reasons"]
 
         # flatten & dedupe against trusted/baseline
         final_cmds: List[str] = []
         for sig in signals:
             if sig in proposed:
-                final_cmds.extend(proposed[sig])
+                final_cmds.extend(_limit(proposed[sig], per_signal_limit))
         if "lexicon" in proposed:
             final_cmds.extend(_limit(proposed["lexicon"], per_signal_limit))
 
@@ -394,6 +451,11 @@ def plan_commands(
             "reasons": reasons,
         }
 
+    # ADK doc cache: persist what this run fetched, report its hit rate
+    if adk_client:
+        adk_client.flush()
+        plan["adk_cache"] = adk_client.cache_stats()
+
     # write INI
     ini_lines: List[str] = []
     ini_lines.append("# --- GENERATED by Agent-7 command_plan_builder ---")
@@ -443,6 +505,7 @@ def _main():
     per_signal_limit = int(os.getenv("AGENT7_PLAN_PER_SIGNAL_LIMIT", "3"))
     use_adk = os.getenv("AGENT7_USE_ADK", "1").lower() not in ("0", "false", "no")
     include_lexicon = os.getenv("AGENT7_INCLUDE_LEXICON", "1").lower() not in ("0", "false", "no")
+    confirm_canonical = os.getenv("AGENT7_PLAN_CONFIRM_CANONICAL", "0").lower() in ("1", "true", "yes")
 
     obj = plan_commands(
         config_dir=config_dir,
@@ -451,6 +514,7 @@ def _main():
         per_signal_limit=per_signal_limit,
         use_adk=use_adk,
         include_lexicon=include_lexicon,
+        confirm_canonical=confirm_canonical,
     )
     print(json.dumps(obj, indent=2))
 
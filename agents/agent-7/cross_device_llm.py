@@ -13,14 +13,15 @@ def _dbg(msg: str) -> None:
 # Plain bootstrap imports (no dynamic loaders)
 # ---------------------------
 from bootstrap import Agent7Config, Agent7Paths, load_config, resolve_paths, ensure_dirs
+from pipeline_context import PipelineContext
 
 # ---------------------------
 # LLM wrapper (graceful fallback if missing)
 # ---------------------------
 try:
-    from shared.llm_api import call_llm  # type: ignore
+    from shared.llm_api import call_llm, json_object  # type: ignore
 except Exception:
-    call_llm = None  # degrade gracefully
+    call_llm = json_object = None  # degrade gracefully
 
 # ---------------------------
 # Small IO helpers
@@ -228,14 +229,16 @@ def analyze_all(
     out_prompt_path: Optional[str] = None,
     out_raw_path: Optional[str] = None,
     validation_log_path: Optional[str] = None,
+    ctx: Optional[PipelineContext] = None,
 ) -> Dict[str, Any]:
     """
     Correlates multiple per-device analyses + facts.
     - per_device_rows: list of per-device JSON objects
     - facts_by_host: {hostname: facts dict}
-    - out_*_path: optional audit outputs
+    - out_*_path: optional audit outputs (queued on ctx's background writer if given)
     Returns CLEANED dict ready to persist.
     """
+    write_text = ctx.write_text if ctx is not None else _write_text
     # Build prompt payload
     facts_for_prompt: Dict[str, str] = {}
     known_hosts: set = set(facts_by_host.keys())
@@ -258,20 +261,20 @@ def analyze_all(
 
     # Audit prompt if requested
     if out_prompt_path:
-        _write_text(out_prompt_path, f"--- SYSTEM ---\n{_SYS}\n\n--- USER ---\n{msgs[1]['content']}\n")
+        write_text(out_prompt_path, f"--- SYSTEM ---\n{_SYS}\n\n--- USER ---\n{msgs[1]['content']}\n")
 
     # Call LLM (graceful fallback)
     if call_llm is None:
         raw = ""
     else:
         try:
-            raw = call_llm(msgs, temperature=0.0) or ""
+            raw = call_llm(msgs, temperature=0.0, task="reason", validate=json_object()) or ""
         except Exception as e:
             _dbg(f"[llm] call failed: {e}")
             raw = ""
 
     if out_raw_path:
-        _write_text(out_raw_path, raw if isinstance(raw, str) else json.dumps(raw))
+        write_text(out_raw_path, raw if isinstance(raw, str) else json.dumps(raw))
 
     # # Parse JSON strictly; fallback skeleton
     # try:
@@ -346,37 +349,43 @@ def analyze_all(
     result["top_incidents"] = kept
 
     if errs and validation_log_path:
-        _write_text(validation_log_path, "\n".join(errs))
+        write_text(validation_log_path, "\n".join(errs))
 
     return result
 
 # ---------------------------
 # Orchestrator: run(config_dir, task_dir)
 # ---------------------------
-def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
+def run(config_dir: str, task_dir: str, ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
     """
-    Loads per-device and facts from disk, runs analyze_all, writes:
+    Loads per-device and facts from disk (or from ctx when given), runs analyze_all, writes:
       - paths.cross_device_json
       - agent7/audit/cross_prompt.txt
       - agent7/audit/cross_raw.json
       - agent7/audit/cross_validation.log (if any)
     """
-    cfg: Agent7Config = load_config()
-    paths: Agent7Paths = resolve_paths(cfg, config_dir, task_dir)
-    ensure_dirs(paths)
-
-    # Load per-device
-    per_device_path = paths.per_device_json
-    per_device_rows = _read_json(per_device_path) or []
-    if not isinstance(per_device_rows, list):
-        per_device_rows = []
-
-    # Load all facts
     facts_by_host: Dict[str, Dict[str, Any]] = {}
-    for fp in _list_facts(paths):
-        fobj = _read_json(fp) or {}
-        host = fobj.get("hostname") or os.path.splitext(os.path.basename(fp))[0]
-        facts_by_host[host] = fobj
+    if ctx is not None:
+        paths = ctx.paths
+        per_device_rows = ctx.per_device_rows if isinstance(ctx.per_device_rows, list) else []
+        for h, fobj in ctx.facts_by_host.items():
+            facts_by_host[(fobj or {}).get("hostname") or h] = fobj or {}
+    else:
+        cfg: Agent7Config = load_config()
+        paths = resolve_paths(cfg, config_dir, task_dir)
+        ensure_dirs(paths)
+
+        # Load per-device
+        per_device_path = paths.per_device_json
+        per_device_rows = _read_json(per_device_path) or []
+        if not isinstance(per_device_rows, list):
+            per_device_rows = []
+
+        # Load all facts
+        for fp in _list_facts(paths):
+            fobj = _read_json(fp) or {}
+            host = fobj.get("hostname") or os.path.splitext(os.path.basename(fp))[0]
+            facts_by_host[host] = fobj
 
     # Audit paths
     prompt_p = os.path.join(paths.audit_dir, "cross_prompt.txt")
@@ -390,11 +399,16 @@ def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
         out_prompt_path=prompt_p,
         out_raw_path=raw_p,
         validation_log_path=v_log_p,
+        ctx=ctx,
     )
 
     # Persist cleaned result
     out_p = paths.cross_device_json
-    _write_json(out_p, result)
+    if ctx is not None:
+        ctx.cross_device = result
+        ctx.write_json(out_p, result)
+    else:
+        _write_json(out_p, result)
     _dbg(f"[done] wrote {out_p} (incidents={len(result.get('top_incidents') or [])})")
 
     return {
@@ -14,6 +14,7 @@ from bootstrap import (
     resolve_paths,
     ensure_dirs,
 )
+from pipeline_context import PipelineContext
 
 # ------- optional shared helpers (static import with safe fallback) -------
 try:
@@ -30,9 +31,9 @@ except Exception:
 
 # ------- optional LLM wrapper (graceful fallback) -------
 try:
-    from shared.llm_api import call_llm  # type: ignore
+    from shared.llm_api import call_llm, json_object  # type: ignore
 except Exception:
-    call_llm = None  # degrade gracefully
+    call_llm = json_object = None  # degrade gracefully
 
 # --- feature flag: allow legacy audit backfill (default: OFF) ---
 # Set A7_ALLOW_AUDIT_BACKFILL=1 to re-enable reading agent7/audit/<host>__blocks.json
@@ -389,7 +390,8 @@ def _llm_extract_from_text(*, cmd: str, text: str, platform_hint: str) -> Tuple[
 
     raw_text: Optional[str] = None
     try:
-        raw = call_llm(msgs, temperature=0.0) or ""
+        raw = call_llm(msgs, temperature=0.0, task="extract",
+                       validate=json_object("status", "summary")) or ""
         # Normalize raw → string for auditing
         if isinstance(raw, str):
             raw_text = raw
@@ -420,9 +422,20 @@ def _llm_extract_from_text(*, cmd: str, text: str, platform_hint: str) -> Tuple[
         return None, raw_text
 
 # ------- core facts build for a single host -------
-def _build_facts_for_host(paths: Agent7Paths, host: str) -> Dict[str, Any]:
-    blocks_by_key = _load_blocks_index(paths, host)
-    parsed_map = _collect_parsed_for_host(paths, host)
+def _build_facts_for_host(paths: Agent7Paths, host: str,
+                          ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
+    md_index_fp = os.path.join(paths.md_index_dir, f"{host}__blocks.json")
+    if ctx is not None:
+        # In-memory handoff: blocks from md_splitter, parse results from genie_parser
+        md_arr = ctx.blocks_by_host.get(host) or []
+        blocks_by_key = {b["cmd_key"]: b for b in md_arr if isinstance(b, dict) and b.get("cmd_key")}
+        parsed_map = dict(ctx.parsed_by_host.get(host) or {})
+        has_md_index = host in ctx.blocks_by_host
+    else:
+        blocks_by_key = _load_blocks_index(paths, host)
+        parsed_map = _collect_parsed_for_host(paths, host)
+        md_arr = _read_json(md_index_fp)
+        has_md_index = os.path.isfile(md_index_fp)
 
     # Step-local audit directory for raw LLM replies
     audit_dir = os.path.join(paths.facts_dir, "_audit")
@@ -430,12 +443,10 @@ def _build_facts_for_host(paths: Agent7Paths, host: str) -> Dict[str, Any]:
 
     # ---- Option A gating: NEVER revive old parsed JSON when md-index has 0 blocks ----
     # (e.g., TCP error capture produced no "## show ..." sections)
-    md_index_fp = os.path.join(paths.md_index_dir, f"{host}__blocks.json")
-    md_arr = _read_json(md_index_fp)
     md_block_count = len(md_arr) if isinstance(md_arr, list) else 0
     _dbg(f"[blocks] {host}: md_blocks={md_block_count} parsed_cmds={len(parsed_map)}")
 
-    if os.path.isfile(md_index_fp) and md_block_count == 0:
+    if has_md_index and md_block_count == 0:
         # Explicitly ignore any leftover 1-parsed data for safety
         parsed_map = {}
         blocks_by_key = {}
@@ -455,12 +466,14 @@ def _build_facts_for_host(paths: Agent7Paths, host: str) -> Dict[str, Any]:
         sanitized_cmd = b.get("sanitized_command") or cmd_key.replace("_", " ")
         text_path = b.get("text_path") or ""
         plat_hint = normalize_platform(b.get("platform_hint") or "")
+        # md_splitter hands the block body over in memory when run with a PipelineContext
+        block_text = b.get("output_text")
 
         # Try Genie first if a parsed file exists (for THIS cmd_key only)
         genie_row = parsed_map.get(cmd_key)
         genie_data = None
         if genie_row:
-            data = _read_json(genie_row["path"])
+            data = genie_row["data"] if "data" in genie_row else _read_json(genie_row["path"])
             if _is_empty_data(data):
                 genie_err += 1
             else:
@@ -473,7 +486,7 @@ def _build_facts_for_host(paths: Agent7Paths, host: str) -> Dict[str, Any]:
         if genie_data is None:
             # MCP (stub)
             if text_path:
-                mcp_obj = _try_mcp_extract(cmd=sanitized_cmd, text=_read_text(text_path), platform_hint=plat_hint)
+                mcp_obj = _try_mcp_extract(cmd=sanitized_cmd, text=block_text if block_text is not None else _read_text(text_path), platform_hint=plat_hint)
             else:
                 mcp_obj = None
 
@@ -484,18 +497,21 @@ def _build_facts_for_host(paths: Agent7Paths, host: str) -> Dict[str, Any]:
             elif text_path:
                 llm_obj, raw_text = _llm_extract_from_text(
                     cmd=sanitized_cmd,
-                    text=_read_text(text_path),
+                    text=block_text if block_text is not None else _read_text(text_path),
                     platform_hint=plat_hint
                 )
                 # Always write the raw response if we got one (even if parsing failed)
                 if raw_text:
                     audit_fp = os.path.join(audit_dir, f"{host}__{cmd_key}__llm_extract.raw")
-                    try:
-                        with open(audit_fp, "w", encoding="utf-8") as fh:
-                            fh.write(raw_text)
-                        _dbg(f"[audit] wrote {audit_fp}")
-                    except Exception as e:
-                        _dbg(f"[audit] write failed for {audit_fp}: {e}")
+                    if ctx is not None:
+                        ctx.write_text(audit_fp, raw_text)
+                    else:
+                        try:
+                            with open(audit_fp, "w", encoding="utf-8") as fh:
+                                fh.write(raw_text)
+                            _dbg(f"[audit] wrote {audit_fp}")
+                        except Exception as e:
+                            _dbg(f"[audit] write failed for {audit_fp}: {e}")
 
                 if isinstance(llm_obj, dict):
                     llm_data = llm_obj
@@ -560,19 +576,28 @@ def _build_facts_for_host(paths: Agent7Paths, host: str) -> Dict[str, Any]:
     return facts
 
 # ------- public: build all hosts -------
-def build_all(config_dir: str, task_dir: str) -> Dict[str, Any]:
+def build_all(config_dir: str, task_dir: str, ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
     """
     Build per-host facts:
       - Prefer hosts discovered from md-index (authoritative when present).
       - Fall back to parsed/ only if md-index is entirely absent.
       - When md-index exists, rotate parsed and facts for non-indexed hosts.
-    """
-    cfg = load_config()
-    paths = resolve_paths(cfg, config_dir, task_dir)
-    ensure_dirs(paths)
 
-    md_hosts = _hosts_from_md_index(paths)
-    parsed_hosts = _hosts_from_parsed(paths)
+    With ctx, hosts/blocks/parse results come from memory, facts land in
+    ctx.facts_by_host and the JSON files are written in the background.
+    """
+    if ctx is not None:
+        paths = ctx.paths
+        md_hosts = ctx.hosts()
+        parsed_hosts = sorted(ctx.parsed_by_host.keys())
+        write_json = ctx.write_json
+    else:
+        cfg = load_config()
+        paths = resolve_paths(cfg, config_dir, task_dir)
+        ensure_dirs(paths)
+        md_hosts = _hosts_from_md_index(paths)
+        parsed_hosts = _hosts_from_parsed(paths)
+        write_json = _write_json
 
     if md_hosts:
         hosts = sorted(md_hosts)
@@ -585,9 +610,11 @@ def build_all(config_dir: str, task_dir: str) -> Dict[str, Any]:
 
     written: List[str] = []
     for h in hosts:
-        facts = _build_facts_for_host(paths, h)
+        facts = _build_facts_for_host(paths, h, ctx=ctx)
         out_path = os.path.join(paths.facts_dir, f"{h}.json")
-        _write_json(out_path, facts)
+        write_json(out_path, facts)
+        if ctx is not None:
+            ctx.facts_by_host[h] = facts
         written.append(out_path)
         _dbg(f"[write] {out_path} (cmds={len(facts.get('commands', {}))})")
 
@@ -597,7 +624,7 @@ def build_all(config_dir: str, task_dir: str) -> Dict[str, Any]:
         "hosts": len(hosts),
         "facts_written": written,
     }
-    _write_json(os.path.join(paths.analyze_dir, "facts_summary.json"), summary)
+    write_json(os.path.join(paths.analyze_dir, "facts_summary.json"), summary)
     _dbg(f"[done] facts for {len(hosts)} host(s)")
     return summary
 
@@ -14,6 +14,7 @@ from bootstrap import (
     resolve_paths,
     ensure_dirs,
 )
+from pipeline_context import PipelineContext
 
 # Optional shared helpers (with safe fallbacks)
 try:
@@ -170,21 +171,30 @@ def _output_path(paths: Agent7Paths, host: str, platform_hint: str, cmd_key: str
 # ---------------------------
 # Public: run genie parsing
 # ---------------------------
-def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
+def run(config_dir: str, task_dir: str, ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
     """
     Reads md-index for each host and produces:
       • agent7/3-analyze/1-parsed/<host>/<platform>__<cmd_key>.json  (only on success)
       • agent7/audit/coverage.json                                   (hit/miss stats)
+
+    With ctx, blocks come from ctx.blocks_by_host (no md-index reads) and parse
+    results are stored in ctx.parsed_by_host; files are written in the background.
     """
-    cfg = load_config()
-    paths = resolve_paths(cfg, config_dir, task_dir)
-    ensure_dirs(paths)
+    if ctx is not None:
+        paths = ctx.paths
+        hosts = ctx.hosts()
+        write_json = ctx.write_json
+    else:
+        cfg = load_config()
+        paths = resolve_paths(cfg, config_dir, task_dir)
+        ensure_dirs(paths)
+        hosts = _list_hosts_with_blocks(paths)
+        write_json = _write_json
 
-    hosts = _list_hosts_with_blocks(paths)
     if not hosts:
         _dbg("[inputs] no md-index found; did you run md_splitter.split_task() ?")
         summary = {"hosts": 0, "blocks": 0, "ok": 0, "err": 0}
-        _write_json(os.path.join(paths.audit_dir, "coverage.json"), {
+        write_json(os.path.join(paths.audit_dir, "coverage.json"), {
             "generated_at": int(time.time()),
             "summary": summary,
             "per_platform": {},
@@ -197,7 +207,11 @@ def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
     total_blocks = ok = err = 0
 
     for host in hosts:
-        blocks = _load_blocks_for_host(paths, host)
+        if ctx is not None:
+            blocks = ctx.blocks_by_host.get(host) or []
+            parsed_for_host = ctx.parsed_by_host.setdefault(host, {})
+        else:
+            blocks = _load_blocks_for_host(paths, host)
         if not blocks:
             continue
 
@@ -224,13 +238,14 @@ def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
             cmd_key = b.get("cmd_key") or _safe_cmd_key(cmd)  # tolerate missing
             total_blocks += 1
 
-            if not cmd or not txt_path or not os.path.exists(txt_path):
+            in_memory = ctx is not None and "output_text" in b
+            if not cmd or not txt_path or not (in_memory or os.path.exists(txt_path)):
                 err += 1
                 errors.append({"host": host, "command": cmd, "error": "skip: missing command/text_path"})
                 per_platform.setdefault(normalize_platform(plat_hint), {"ok": 0, "err": 0})["err"] += 1
                 continue
 
-            text = _read(txt_path)
+            text = b["output_text"] if in_memory else _read(txt_path)
             if not text.strip():
                 err += 1
                 errors.append({"host": host, "command": cmd, "error": "skip: empty output"})
@@ -240,7 +255,13 @@ def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
             res = _parse_one(dev, cmd, text)
             if res.get("ok"):
                 out_path = _output_path(paths, host, plat_hint, cmd_key)
-                _write_json(out_path, res.get("data"))
+                write_json(out_path, res.get("data"))
+                if ctx is not None:
+                    parsed_for_host[cmd_key] = {
+                        "path": out_path,
+                        "platform_hint": normalize_platform(plat_hint) or "unknown",
+                        "data": res.get("data"),
+                    }
                 ok += 1
                 per_platform.setdefault(normalize_platform(plat_hint), {"ok": 0, "err": 0})["ok"] += 1
             else:
@@ -257,7 +278,7 @@ def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
         "per_platform": per_platform,
         "errors": errors[:200],  # cap to keep file small
     }
-    _write_json(os.path.join(paths.audit_dir, "coverage.json"), cov)
+    write_json(os.path.join(paths.audit_dir, "coverage.json"), cov)
     _dbg(f"[done] ok={ok} err={err} → {os.path.join(paths.audit_dir, 'coverage.json')}")
     return cov
 
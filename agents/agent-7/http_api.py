@@ -4,11 +4,27 @@ import os
 import time
 import json
 import glob
+import contextlib
 from typing import Any, Dict, List, Optional, Set
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
+from pipeline_context import PipelineContext, new_context
+
+try:
+    from shared.llm_api import usage_run  # type: ignore
+except Exception:
+    usage_run = None  # no token accounting without the shared wrapper
+try:
+    from shared.llm_api import scheduler_stats, routing_stats  # type: ignore
+except Exception:
+    scheduler_stats = routing_stats = None
+try:
+    from shared.cassette import use_cassette  # type: ignore
+except Exception:
+    use_cassette = None  # no record/replay without the shared module
+
 app = FastAPI(title="Agent-7 HTTP API", version="1.1.0")
 
 REPO_ROOT = os.getenv("REPO_ROOT", "/app/doo")
@@ -181,6 +197,7 @@ class PlanRequest(BaseModel):
     per_signal_limit: int = 3
     use_adk: bool = True
     include_lexicon: bool = True
+    confirm_canonical: bool = False   # batch-judge ADK suggestions, keep canonical ones
 
 class PlanResponse(BaseModel):
     # Field names kept for backward compatibility with callers.
@@ -211,11 +228,15 @@ class AnalyzeResponse(BaseModel):
     per_device_json_path: str
     cross_device_json_path: str
     slack_overview_path: Optional[str] = None  # best-effort
+    llm_usage: Optional[Dict[str, Any]] = None  # calls / prompt / cached prompt / completion tokens
 
 # -------- endpoints --------
 @app.get("/health")
 def health():
-    return {"ok": True}
+    # llm: queue wait per priority class (interactive / batch / background)
+    # llm_routes: model, latency and cost per task class (extract / classify / ...)
+    return {"ok": True, "llm": scheduler_stats() if scheduler_stats else None,
+            "llm_routes": routing_stats() if routing_stats else None}
 
 @app.post("/plan", response_model=PlanResponse)
 def plan(req: PlanRequest):
@@ -257,6 +278,7 @@ def plan(req: PlanRequest):
             per_signal_limit=req.per_signal_limit,
             use_adk=req.use_adk,
             include_lexicon=req.include_lexicon,
+            confirm_canonical=req.confirm_canonical,
         )
     else:
         plan_obj = _planner.plan_overlay(
@@ -472,12 +494,12 @@ def analyze(req: AnalyzeRequest):
       7) slack_summarizer.summarize(...)               → agent7/3-analyze/slack_overview.json  (best-effort)
     emits →
       • agent7/3-analyze/facts_summary.json
+
+    Stages hand their results to each other through a PipelineContext (blocks →
+    parse results → facts → per-device → cross-device) instead of re-reading the
+    files the previous stage wrote. Those files are still written, on a background
+    thread; pending writes are flushed before responding so returned paths exist.
     """
-    import md_splitter
-    import genie_parser
-    import facts_builder
-    import per_device_llm
-    import cross_device_llm
 
     # DEBUG: show incoming scope
     print(f"[agent7][analyze] req.hosts={req.hosts}", flush=True)
@@ -493,11 +515,36 @@ def analyze(req: AnalyzeRequest):
     allow_backfill = not bool(req.hosts)
     hosts_filter   = list({h.strip() for h in (req.hosts or []) if h and isinstance(h, str)}) or None
 
+    ctx = new_context(req.config_dir, req.task_dir)
+    # LLM calls are recorded/replayed under <task>/cassettes when CASSETTE_MODE is set
+    scope = use_cassette(os.path.join(REPO_ROOT, req.config_dir, req.task_dir, "cassettes")) \
+        if use_cassette else contextlib.nullcontext()
+    try:
+        with scope:
+            if usage_run is None:
+                return _analyze_with_context(req, ctx, allow_backfill, hosts_filter)
+            with usage_run(f"agent7:/analyze {req.config_dir}/{req.task_dir}") as meter:
+                resp = _analyze_with_context(req, ctx, allow_backfill, hosts_filter)
+        resp.llm_usage = meter.as_dict()
+        _write_json(os.path.join(ctx.paths.meta_dir, "llm_usage.json"), resp.llm_usage)
+        return resp
+    finally:
+        ctx.close()
+
+def _analyze_with_context(req: AnalyzeRequest, ctx: PipelineContext, allow_backfill: bool,
+                          hosts_filter: Optional[List[str]]) -> AnalyzeResponse:
+    import md_splitter
+    import genie_parser
+    import facts_builder
+    import per_device_llm
+    import cross_device_llm
+
     md_splitter.split_task(
         req.config_dir,
         req.task_dir,
         allow_backfill=allow_backfill,   # <-- corrected kwarg
-        hosts_filter=hosts_filter        # <-- pass scope (or None)
+        hosts_filter=hosts_filter,       # <-- pass scope (or None)
+        ctx=ctx,
     )
 
     # --- 2) Safe prune of md-index to selected hosts (defensive, non-destructive) ---
@@ -509,23 +556,19 @@ def analyze(req: AnalyzeRequest):
         # DEBUG: list hosts present in md-index after prune
     root = _agent7_root(req.config_dir, req.task_dir)
     dirs = _ensure_dirs(root)
-    now_hosts = [
-        n for n in os.listdir(dirs["md_index_dir"])
-        if os.path.isfile(os.path.join(dirs["md_index_dir"], f"{n}__blocks.json"))
-    ]
-    print(f"[agent7][analyze] md_index hosts after prune={now_hosts}", flush=True)
+    print(f"[agent7][analyze] md_index hosts in context={ctx.hosts()}", flush=True)
 
-    # --- 3) Parser (Genie) over current md-index ---
-    genie_parser.run(req.config_dir, req.task_dir)
+    # --- 3) Parser (Genie) over the in-memory md-index ---
+    genie_parser.run(req.config_dir, req.task_dir, ctx=ctx)
 
     # --- 4) Facts builder (Option A semantics inside facts_builder) ---
-    facts_summary = facts_builder.build_all(req.config_dir, req.task_dir)
+    facts_summary = facts_builder.build_all(req.config_dir, req.task_dir, ctx=ctx)
 
     # --- 5) Per-device LLM: scoped vs full ---
     if hosts_filter:
-        per_dev = per_device_llm.run_hosts(req.config_dir, req.task_dir, hosts_filter) or {}
+        per_dev = per_device_llm.run_hosts(req.config_dir, req.task_dir, hosts_filter, ctx=ctx) or {}
     else:
-        per_dev = per_device_llm.run(req.config_dir, req.task_dir) or {}
+        per_dev = per_device_llm.run(req.config_dir, req.task_dir, ctx=ctx) or {}
 
     # --- 6) Cross-device: skip if single-host triage ---
     run_cross = True
@@ -534,16 +577,18 @@ def analyze(req: AnalyzeRequest):
     print(f"[DEBUG] run_cross={run_cross}")
     cross = {}
     if run_cross:
-        cross = cross_device_llm.run(req.config_dir, req.task_dir) or {}
+        cross = cross_device_llm.run(req.config_dir, req.task_dir, ctx=ctx) or {}
     else:
         print("[DEBUG] Skipping stale cross_device.json loading (triage mode)")
-        cross_obj = {}
 
     # --- 7) Slack overview (best effort) ---
     facts_summary_path     = os.path.join(dirs["analyze_dir"], "facts_summary.json")
     per_device_json_path   = per_dev.get("path")   or os.path.join(dirs["analyze_dir"], "per_device.json")
     cross_device_json_path = cross.get("path")     or os.path.join(dirs["analyze_dir"], "cross_device.json")
 
+    # Background artifact writes must land before callers get the paths
+    ctx.flush()
+
     # Debug instrumentation (AFTER paths are known; no inner imports)
     def _dbg_file(p):
         try:
@@ -558,14 +603,13 @@ def analyze(req: AnalyzeRequest):
     slack_overview_path: Optional[str] = None
     try:
         import slack_summarizer  # local module in agents/agent-7/
-        per_rows = _read_json(per_device_json_path) or []
-        cross_obj = _read_json(cross_device_json_path) or {}
-        # Load all facts for context (by host)
-        facts_by_host: Dict[str, Dict[str, Any]] = {}
-        for fp in glob.glob(os.path.join(dirs["facts_dir"], "*.json")):
-            fobj = _read_json(fp) or {}
-            h = fobj.get("hostname") or os.path.splitext(os.path.basename(fp))[0]
-            facts_by_host[h] = fobj
+        # Handed over in memory; triage runs skip cross-device, so fall back to the
+        # previous cross_device.json on disk exactly as before.
+        per_rows = ctx.per_device_rows if ctx.per_device_rows is not None else (_read_json(per_device_json_path) or [])
+        cross_obj = ctx.cross_device if ctx.cross_device is not None else (_read_json(cross_device_json_path) or {})
+        facts_by_host: Dict[str, Dict[str, Any]] = {
+            (fobj or {}).get("hostname") or h: fobj or {} for h, fobj in ctx.facts_by_host.items()
+        }
         slack_overview_path = os.path.join(dirs["analyze_dir"], "slack_overview.json")
         # DEBUG for slack message loading
         print(f"[DEBUG] Calling build_overview_blocks with {len(per_rows)} per-device entries and cross keys: {list(cross_obj.keys())}")
@@ -1,7 +1,7 @@
 # agents/agent-7/md_splitter.py
 from __future__ import annotations
 import os, re, json, glob, hashlib, time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 # ---------------------------
 # Optional shared helpers (graceful fallback)
@@ -28,6 +28,7 @@ from bootstrap import (
     resolve_paths,
     ensure_dirs,
 )
+from pipeline_context import PipelineContext
 
 # ---------------------------
 # Inputs: .md from two locations (merge)
@@ -197,13 +198,17 @@ def _extract_blocks(md_text: str) -> List[Dict[str, Any]]:
 # ---------------------------
 # Writer
 # ---------------------------
-def _write_blocks_for_host(paths: Agent7Paths, host: str, md_text: str) -> List[Dict[str, Any]]:
+def _write_blocks_for_host(paths: Agent7Paths, host: str, md_text: str,
+                           ctx: Optional[PipelineContext] = None) -> List[Dict[str, Any]]:
     """
     Writes per-block files and a JSON index under:
       agent7/3-analyze/0-md-index/<host>__blocks.json
       agent7/3-analyze/0-md-index/<host>/*.txt   (raw outputs)
     Also mirrors the JSON index to:
       agent7/audit/<host>__blocks.json           (back-compat for downstream readers)
+
+    With a PipelineContext the files are queued on its background writer and the
+    entries (plus their "output_text") are handed to the next stage in memory.
     """
     plat = normalize_platform(_infer_platform(md_text))
     blocks = _extract_blocks(md_text)
@@ -223,8 +228,12 @@ def _write_blocks_for_host(paths: Agent7Paths, host: str, md_text: str) -> List[
         text_path = os.path.join(host_dir, f"{stem}.txt")
 
         # write body
-        with open(text_path, "w", encoding="utf-8") as fh:
-            fh.write(body + ("\n" if body and not body.endswith("\n") else ""))
+        body_out = body + ("\n" if body and not body.endswith("\n") else "")
+        if ctx is not None:
+            ctx.write_text(text_path, body_out)
+        else:
+            with open(text_path, "w", encoding="utf-8") as fh:
+                fh.write(body_out)
 
         entry = {
             "host": host,
@@ -239,14 +248,23 @@ def _write_blocks_for_host(paths: Agent7Paths, host: str, md_text: str) -> List[
             "end_line": blk.get("end_line"),
         }
         index_entries.append(entry)
+        if ctx is not None:
+            ctx.blocks_by_host.setdefault(host, []).append(dict(entry, output_text=body_out))
 
-    # write per-host JSON index (list)
     json_index = os.path.join(paths.md_index_dir, f"{host}__blocks.json")
+    audit_index = os.path.join(paths.audit_dir, f"{host}__blocks.json")
+    if ctx is not None:
+        ctx.blocks_by_host.setdefault(host, [])  # hosts with 0 blocks stay visible downstream
+        ctx.write_json(json_index, index_entries)
+        ctx.write_json(audit_index, index_entries)
+        _dbg(f"[write] host={host} blocks={len(index_entries)} → {json_index} (queued)")
+        return index_entries
+
+    # write per-host JSON index (list)
     with open(json_index, "w", encoding="utf-8") as fh:
         json.dump(index_entries, fh, indent=2)
 
     # mirror to audit for downstream readers that still look there
-    audit_index = os.path.join(paths.audit_dir, f"{host}__blocks.json")
     try:
         with open(audit_index, "w", encoding="utf-8") as fh:
             json.dump(index_entries, fh, indent=2)
@@ -263,7 +281,8 @@ def _write_blocks_for_host(paths: Agent7Paths, host: str, md_text: str) -> List[
 def split_task(config_dir: str,
                task_dir: str,
                hosts_filter: List[str] | None = None,
-               allow_backfill: bool = True) -> Dict[str, Any]:
+               allow_backfill: bool = True,
+               ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
     """
     Processes host markdown and writes:
       - agent7/3-analyze/0-md-index/<host>__blocks.json
@@ -275,10 +294,16 @@ def split_task(config_dir: str,
           Merge order per host → grading_logs + fresh capture (if both exist).
       • Scoped triage (allow_backfill=False; hosts_filter provided):
           Use ONLY fresh capture for the selected hosts (ignore grading_logs entirely).
+
+    When ctx (PipelineContext) is given, blocks are kept in ctx.blocks_by_host
+    and all files are written in the background.
     """
-    cfg = load_config()
-    paths = resolve_paths(cfg, config_dir, task_dir)
-    ensure_dirs(paths)
+    if ctx is not None:
+        paths = ctx.paths
+    else:
+        cfg = load_config()
+        paths = resolve_paths(cfg, config_dir, task_dir)
+        ensure_dirs(paths)
 
     md_map = _read_md_for_task(paths, hosts_filter=hosts_filter, allow_backfill=allow_backfill)
     _dbg(f"[mode] allow_backfill={allow_backfill} hosts_filter={list(hosts_filter or [])} md_hosts={len(md_map)}")
@@ -292,7 +317,7 @@ def split_task(config_dir: str,
 
     total_blocks = 0
     for host, md_text in md_map.items():
-        entries = _write_blocks_for_host(paths, host, md_text)
+        entries = _write_blocks_for_host(paths, host, md_text, ctx=ctx)
         total_blocks += len(entries)
         summary["hosts"][host] = {
             "platform_hint": entries[0]["platform_hint"] if entries else "unknown",
@@ -303,9 +328,12 @@ def split_task(config_dir: str,
 
     # write summary index
     idx_path = os.path.join(paths.meta_dir, "md_index_summary.json")
-    os.makedirs(os.path.dirname(idx_path), exist_ok=True)
-    with open(idx_path, "w", encoding="utf-8") as fh:
-        json.dump(summary, fh, indent=2)
+    if ctx is not None:
+        ctx.write_json(idx_path, summary)
+    else:
+        os.makedirs(os.path.dirname(idx_path), exist_ok=True)
+        with open(idx_path, "w", encoding="utf-8") as fh:
+            json.dump(summary, fh, indent=2)
 
     _dbg(f"[summary] hosts={len(summary['hosts'])} total_blocks={total_blocks} → {idx_path}")
     return summary
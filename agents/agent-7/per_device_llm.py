@@ -7,14 +7,15 @@ from typing import Any, Dict, List, Optional, Tuple
 # Plain bootstrap imports (no dynamic loaders)
 # ---------------------------
 from bootstrap import Agent7Config, Agent7Paths, load_config, resolve_paths, ensure_dirs
+from pipeline_context import PipelineContext
 
 # ---------------------------
 # LLM wrapper (graceful fallback if missing)
 # ---------------------------
 try:
-    from shared.llm_api import call_llm  # type: ignore
+    from shared.llm_api import call_llm, json_object  # type: ignore
 except Exception:
-    call_llm = None  # degrade gracefully
+    call_llm = json_object = None  # degrade gracefully
 
 # ---------------------------
 # Validators (centralized gating & safety)
@@ -202,28 +203,30 @@ def analyze_host(*,
                  agent1_row_path: Optional[str] = None,
                  adk_cache_path: Optional[str] = None,
                  out_prompt_path: Optional[str] = None,
-                 out_raw_path: Optional[str] = None) -> Dict[str, Any]:
+                 out_raw_path: Optional[str] = None,
+                 ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
     host = hostname or facts.get("hostname") or "unknown"
+    write_text = ctx.write_text if ctx is not None else _write_text
     agent1 = _read_agent1_row(agent1_row_path, host)
     adk   = _read_adk_snippets(adk_cache_path, facts.get("signals_seen") or [], facts.get("platform_hint","unknown"))
 
     msgs = _build_messages(host, facts, agent1, adk)
 
     if out_prompt_path:
-        _write_text(out_prompt_path, f"--- SYSTEM ---\n{_SYS}\n\n--- USER ---\n{msgs[1]['content']}\n")
+        write_text(out_prompt_path, f"--- SYSTEM ---\n{_SYS}\n\n--- USER ---\n{msgs[1]['content']}\n")
 
     # ---- call LLM ----
     if call_llm is None:
         raw = ""
     else:
         try:
-            raw = call_llm(msgs, temperature=0.0) or ""
+            raw = call_llm(msgs, temperature=0.0, task="reason", validate=json_object("status")) or ""
         except Exception as e:
             _dbg(f"[llm] call failed: {e}")
             raw = ""
 
     if out_raw_path:
-        _write_text(out_raw_path, raw if isinstance(raw, str) else json.dumps(raw, indent=2))
+        write_text(out_raw_path, raw if isinstance(raw, str) else json.dumps(raw, indent=2))
 
     # ---- parse LLM output (dict OR JSON string; also handle ```json fences) ----
     obj: Dict[str, Any]
@@ -293,22 +296,28 @@ def _list_facts_for_hosts(paths: Agent7Paths, hosts: List[str]) -> List[str]:
     return sorted(out)
 
 
-def run_hosts(config_dir: str, task_dir: str, hosts: List[str]) -> Dict[str, Any]:
+def run_hosts(config_dir: str, task_dir: str, hosts: List[str],
+              ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
     """
     Host-scoped per-device analysis.
-    - Reads facts only for `hosts`.
+    - Reads facts only for `hosts` (from ctx.facts_by_host when a context is given).
     - Writes a separate scoped per_device JSON (does NOT merge with the global file).
     - Returns the same shape as run(), but with 'path' pointing to the scoped file.
     """
-    cfg: Agent7Config = load_config()
-    paths: Agent7Paths = resolve_paths(cfg, config_dir, task_dir)
-    ensure_dirs(paths)
+    if ctx is not None:
+        paths = ctx.paths
+        hostset = {h.strip() for h in hosts or [] if isinstance(h, str) and h.strip()}
+        facts_paths = [_facts_path(paths, h) for h in sorted(ctx.facts_by_host) if h in hostset]
+    else:
+        cfg: Agent7Config = load_config()
+        paths = resolve_paths(cfg, config_dir, task_dir)
+        ensure_dirs(paths)
+        facts_paths = _list_facts_for_hosts(paths, hosts)
 
-    facts_paths = _list_facts_for_hosts(paths, hosts)
     results: List[Dict[str, Any]] = []
     for fp in facts_paths:
         try:
-            res = _analyze_one_host(paths, fp)
+            res = _analyze_one_host(paths, fp, ctx=ctx)
             results.append(res)
             _dbg(f"[host] {res.get('hostname','?')} status={res.get('status','?')} findings={len(res.get('findings') or [])}")
         except Exception as e:
@@ -320,16 +329,28 @@ def run_hosts(config_dir: str, task_dir: str, hosts: List[str]) -> Dict[str, Any
     short_id = hashlib.sha1(id_src.encode("utf-8", errors="ignore")).hexdigest()[:8]
     out_p = os.path.join(paths.analyze_dir, f"per_device__scoped__{short_id}.json")
 
-    _write_json(out_p, results)
+    if ctx is not None:
+        ctx.per_device_rows = results
+        ctx.write_json(out_p, results)
+    else:
+        _write_json(out_p, results)
     _dbg(f"[done] wrote {out_p} (hosts={len(results)})")
     return {"hosts": len(results), "path": out_p, "generated_at": int(time.time())}
 
 # ---------------------------
 # Internal: iterate facts dir and write per_device.json
 # ---------------------------
-def _analyze_one_host(paths: Agent7Paths, facts_path: str) -> Dict[str, Any]:
-    facts = _read_json(facts_path) or {}
-    host = facts.get("hostname") or os.path.splitext(os.path.basename(facts_path))[0]
+def _facts_path(paths: Agent7Paths, host: str) -> str:
+    return os.path.join(paths.facts_dir, f"{host}.json")
+
+def _analyze_one_host(paths: Agent7Paths, facts_path: str,
+                      ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
+    stem = os.path.splitext(os.path.basename(facts_path))[0]
+    if ctx is not None and stem in ctx.facts_by_host:
+        facts = ctx.facts_by_host[stem] or {}
+    else:
+        facts = _read_json(facts_path) or {}
+    host = facts.get("hostname") or stem
 
     # default locations for optional inputs/audits
     agent1_row_path = os.path.join(paths.task_root, "agent1_summary.json")
@@ -344,23 +365,29 @@ def _analyze_one_host(paths: Agent7Paths, facts_path: str) -> Dict[str, Any]:
         adk_cache_path=adk_cache_path,
         out_prompt_path=out_prompt_path,
         out_raw_path=out_raw_path,
+        ctx=ctx,
     )
 
-def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
+def run(config_dir: str, task_dir: str, ctx: Optional[PipelineContext] = None) -> Dict[str, Any]:
     """
-    Reads facts (paths.facts_dir), analyzes each host, and writes:
+    Reads facts (paths.facts_dir, or ctx.facts_by_host), analyzes each host, and writes:
       - paths.per_device_json
       - agent7/audit/<host>__per_device_prompt.txt
       - agent7/audit/<host>__per_device_raw.json
     """
-    cfg: Agent7Config = load_config()
-    paths: Agent7Paths = resolve_paths(cfg, config_dir, task_dir)
-    ensure_dirs(paths)
+    if ctx is not None:
+        paths = ctx.paths
+        facts_paths = [_facts_path(paths, h) for h in sorted(ctx.facts_by_host)]
+    else:
+        cfg: Agent7Config = load_config()
+        paths = resolve_paths(cfg, config_dir, task_dir)
+        ensure_dirs(paths)
+        facts_paths = _list_facts(paths)
 
     results: List[Dict[str, Any]] = []
-    for fp in _list_facts(paths):
+    for fp in facts_paths:
         try:
-            res = _analyze_one_host(paths, fp)
+            res = _analyze_one_host(paths, fp, ctx=ctx)
             results.append(res)
             _dbg(f"[host] {res.get('hostname','?')} status={res.get('status','?')} findings={len(res.get('findings') or [])}")
         except Exception as e:
@@ -377,7 +404,11 @@ def run(config_dir: str, task_dir: str) -> Dict[str, Any]:
     else:
         merged = results
 
-    _write_json(out_p, merged)
+    if ctx is not None:
+        ctx.per_device_rows = merged
+        ctx.write_json(out_p, merged)
+    else:
+        _write_json(out_p, merged)
     _dbg(f"[done] wrote {out_p} (hosts={len(merged)})")
     return {"hosts": len(merged), "path": out_p, "generated_at": int(time.time())}
 
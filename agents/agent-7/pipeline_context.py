@@ -0,0 +1,113 @@
+# agents/agent-7/pipeline_context.py
+from __future__ import annotations
+import os, json, threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from bootstrap import Agent7Paths, load_config, resolve_paths, ensure_dirs
+
+# Number of background writer threads; 1 keeps writes ordered per run.
+_WRITER_THREADS = max(1, int(os.getenv("AGENT7_WRITER_THREADS", "1") or "1"))
+
+def _dbg(msg: str) -> None:
+    print(f"[agent7][ctx] {msg}", flush=True)
+
+# ---------------------------
+# Plain (synchronous) IO used by the background writer
+# ---------------------------
+def _write_json_now(path: str, obj: Any) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(obj, fh, indent=2)
+
+def _write_text_now(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(text if isinstance(text, str) else str(text))
+
+# ---------------------------
+# In-memory handoff between analysis stages
+# ---------------------------
+@dataclass
+class PipelineContext:
+    """
+    Carries artifacts of one /analyze run from stage to stage:
+      md_splitter     → blocks_by_host   {host: [block index entry + "output_text"]}
+      genie_parser    → parsed_by_host   {host: {cmd_key: {"platform_hint", "data", "path"}}}
+      facts_builder   → facts_by_host    {host: facts dict}
+      per_device_llm  → per_device_rows  [per-device row, ...]
+      cross_device_llm→ cross_device     {...}
+
+    Every stage still persists its usual files, but through write_json()/write_text(),
+    which queue the write on a background thread. Stages never read back what an
+    earlier stage of the same run produced. Call flush() before handing paths to callers.
+    """
+    config_dir: str
+    task_dir: str
+    paths: Agent7Paths
+    blocks_by_host: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    parsed_by_host: Dict[str, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+    facts_by_host: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    per_device_rows: Optional[List[Dict[str, Any]]] = None
+    cross_device: Optional[Dict[str, Any]] = None
+
+    _pool: Optional[ThreadPoolExecutor] = field(default=None, repr=False)
+    _pending: List[Future] = field(default_factory=list, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _errors: List[str] = field(default_factory=list, repr=False)
+
+    # ----- background persistence -----
+    def _submit(self, fn: Callable[..., None], *args: Any) -> None:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=_WRITER_THREADS,
+                                                thread_name_prefix="a7-writer")
+            self._pending.append(self._pool.submit(self._guard, fn, *args))
+
+    def _guard(self, fn: Callable[..., None], *args: Any) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            path = args[0] if args else "?"
+            self._errors.append(f"{path}: {e}")
+            _dbg(f"[write] failed {path}: {e}")
+
+    def write_json(self, path: str, obj: Any) -> None:
+        self._submit(_write_json_now, path, obj)
+
+    def write_text(self, path: str, text: str) -> None:
+        self._submit(_write_text_now, path, text)
+
+    def flush(self) -> List[str]:
+        """
+        Wait for all queued writes. Returns the list of write errors (never raises).
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for fut in pending:
+            try:
+                fut.result()
+            except Exception:
+                pass
+        if pending:
+            _dbg(f"[flush] writes={len(pending)} errors={len(self._errors)}")
+        return list(self._errors)
+
+    def close(self) -> List[str]:
+        errs = self.flush()
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        return errs
+
+    # ----- helpers for stages -----
+    def hosts(self) -> List[str]:
+        return sorted(self.blocks_by_host.keys())
+
+def new_context(config_dir: str, task_dir: str) -> PipelineContext:
+    cfg = load_config()
+    paths = resolve_paths(cfg, config_dir, task_dir)
+    ensure_dirs(paths)
+    return PipelineContext(config_dir=config_dir, task_dir=task_dir, paths=paths)
@@ -1,11 +1,21 @@
 # ai_agents/agents/agent-7/signal_harvester.py
 # LLM-only signal harvesting. No static keyword lists, no regex heuristics.
+#
+# Hosts are asked concurrently (AGENT7_SIGNALS_WORKERS). Each host gets a bounded
+# sample of its logs (every heading + the first lines of each block, volatile
+# timestamps dropped) and the answer is cached under agent7/meta/signal_cache,
+# keyed on a hash of the exact prompt — re-planning unchanged logs makes no LLM calls.
 
 from __future__ import annotations
 import os
+import re
 import json
 import glob
-from typing import Dict, Any
+import hashlib
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
 from bootstrap import load_config, resolve_paths
 
@@ -17,6 +27,16 @@ except Exception:
         from llm_api import call_llm  # type: ignore
     except Exception:
         call_llm = None  # degrade: we will return empty signals
+try:
+    from shared.llm_api import llm_priority, BACKGROUND, json_object  # type: ignore
+except Exception:
+    llm_priority, BACKGROUND = (lambda cls: contextlib.nullcontext()), "background"
+    json_object = lambda *keys: None  # noqa: E731  (no schema check → no fallback)
+
+SIGNALS_WORKERS = max(1, int(os.getenv("AGENT7_SIGNALS_WORKERS", "8")))
+# Sample size per host (chars) and lines kept per command block before shrinking
+SAMPLE_CHARS = int(os.getenv("AGENT7_SIGNALS_SAMPLE_CHARS", "15000"))
+SAMPLE_LINES_PER_BLOCK = int(os.getenv("AGENT7_SIGNALS_LINES_PER_BLOCK", "24"))
 
 def _dbg(msg: str) -> None:
     print(f"[agent7][signals] {msg}", flush=True)
@@ -71,6 +91,84 @@ def _read_md_logs(task_root: str) -> Dict[str, str]:
     _dbg(f"[signals] loaded md logs: {len(merged)} (grading_logs + agent7/show_logs)")
     return merged
 
+# Lines that change on every capture without changing what the device runs
+_VOLATILE = re.compile(
+    r"^(_Generated:|_Time:|\*\*Cached:\*\*|_\(cached|"
+    r"(Mon|Tue|Wed|Thu|Fri|Sat|Sun) \w{3} +\d+ \d\d:\d\d:\d\d)"
+)
+
+def _split_blocks(md_text: str) -> List[Tuple[Optional[str], List[str]]]:
+    """[(heading line or None, content lines)] — fences, blanks and volatile lines dropped."""
+    blocks: List[Tuple[Optional[str], List[str]]] = [(None, [])]
+    for line in md_text.splitlines():
+        t = line.rstrip()
+        if t.startswith("#"):
+            blocks.append((t, []))
+        elif t.strip() and not t.lstrip().startswith("```") and not _VOLATILE.match(t.strip()):
+            blocks[-1][1].append(t)
+    return [b for b in blocks if b[0] is not None or b[1]]
+
+def _sample_markdown(md_text: str, budget: int = SAMPLE_CHARS,
+                     per_block: int = SAMPLE_LINES_PER_BLOCK) -> str:
+    """
+    Bounded view of a host's logs: every heading plus the first per_block lines of each
+    block (halved until it fits the budget), so late commands are not cut off the way a
+    plain prefix would cut them.
+    """
+    blocks = _split_blocks(md_text or "")
+    n = max(1, per_block)
+    while True:
+        out: List[str] = []
+        for heading, lines in blocks:
+            if heading:
+                out.append(heading)
+            out.extend(lines[:n])
+            if len(lines) > n:
+                out.append(f"... (+{len(lines) - n} more lines)")
+        text = "\n".join(out)
+        if len(text) <= budget or n == 1:
+            return text[:budget]
+        n //= 2
+
+def _prompt(host: str, md_text: str) -> List[Dict[str, str]]:
+    user = (
+        f"### Hostname\n{host}\n\n"
+        f"### CLI Markdown (sampled: headings + first lines of each block)\n```md\n{_sample_markdown(md_text)}\n```"
+    )
+    return [{"role": "system", "content": _SYSTEM},
+            {"role": "user", "content": user}]
+
+def _prompt_key(msgs: List[Dict[str, str]]) -> str:
+    h = hashlib.sha256()
+    for m in msgs:
+        h.update(m["role"].encode("utf-8") + b"\0" + m["content"].encode("utf-8") + b"\0")
+    return h.hexdigest()
+
+def _cache_path(cache_dir: str, host: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{host}__{key[:24]}.json")
+
+def _cache_get(cache_dir: str, host: str, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_cache_path(cache_dir, host, key), "r", encoding="utf-8") as fh:
+            obj = json.load(fh)
+        return obj if isinstance(obj, dict) else None
+    except (OSError, ValueError):
+        return None
+
+def _cache_put(cache_dir: str, host: str, key: str, obj: Dict[str, Any]) -> None:
+    path = _cache_path(cache_dir, host, key)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for old in glob.glob(os.path.join(cache_dir, f"{glob.escape(host)}__*.json")):
+            if old != path:
+                os.remove(old)   # one entry per host: the logs it was asked about last
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(obj, fh, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        _dbg(f"[signals] cache write failed for {host}: {e}")
+
 def _fallback_empty(host: str) -> Dict[str, Any]:
     return {
         "hostname": host,
@@ -81,23 +179,33 @@ def _fallback_empty(host: str) -> Dict[str, Any]:
         "notes": "fallback: LLM unavailable or returned non-JSON",
     }
 
-def _ask_llm_for_signals(host: str, md_text: str) -> Dict[str, Any]:
-    """Call the LLM with the host's markdown only (no local parsing)."""
+def _ask_llm_for_signals(host: str, md_text: str,
+                         cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Call the LLM with a sample of the host's markdown only (no local parsing).
+    With cache_dir, an answer for the identical prompt is reused.
+    """
     if not call_llm:
         return _fallback_empty(host)
 
-    snippet = md_text[:15000] if md_text else ""
-    user = (
-        f"### Hostname\n{host}\n\n"
-        f"### CLI Markdown (truncated)\n```md\n{snippet}\n```"
-    )
+    msgs = _prompt(host, md_text)
+    key = _prompt_key(msgs)
+    if cache_dir:
+        hit = _cache_get(cache_dir, host, key)
+        if hit is not None:
+            return hit
+
     obj: Dict[str, Any] = {}
+    ok = False
     try:
-        raw = call_llm(
-            messages=[{"role": "system", "content": _SYSTEM},
-                      {"role": "user", "content": user}],
-            temperature=0.0,
-        ) or ""
+        # Harvesting is background work: interactive/batch LLM calls go first
+        with llm_priority(BACKGROUND):
+            raw = call_llm(
+                messages=msgs,
+                temperature=0.0,
+                task="extract",
+                validate=json_object("signals"),
+            ) or ""
         try:
             obj = json.loads(raw)
         except Exception:
@@ -105,6 +213,9 @@ def _ask_llm_for_signals(host: str, md_text: str) -> Dict[str, Any]:
             m = re.search(r"```json\s*(.+?)\s*```", str(raw), flags=re.DOTALL | re.IGNORECASE)
             if m:
                 obj = json.loads(m.group(1))
+        # Cache only a real answer: parsed JSON object carrying "signals"
+        # (prose without a fence / empty output leaves obj == {} → fallback, not cached)
+        ok = isinstance(obj, dict) and "signals" in obj
     except Exception as e:
         _dbg(f"[signals][{host}] LLM call failed: {e}")
         obj = {}
@@ -132,6 +243,8 @@ def _ask_llm_for_signals(host: str, md_text: str) -> Dict[str, Any]:
     obj.setdefault("confidence", 0.0)
     obj.setdefault("evidence", {})
     obj.setdefault("notes", obj.get("notes", ""))
+    if ok and cache_dir:
+        _cache_put(cache_dir, host, key, obj)   # LLM failures are retried next time
     return obj
 
 def harvest_signals(config_dir: str, task_dir: str) -> Dict[str, Dict[str, object]]:
@@ -148,9 +261,18 @@ def harvest_signals(config_dir: str, task_dir: str) -> Dict[str, Dict[str, objec
 
     md_map = _read_md_logs(paths.task_root)
     results: Dict[str, Dict[str, object]] = {}
+    cache_dir = os.path.join(paths.meta_dir, "signal_cache")
+
+    # Hosts side by side; each worker runs in a copy of this context (usage meter,
+    # LLM priority, cassette scope)
+    with ThreadPoolExecutor(max_workers=min(SIGNALS_WORKERS, max(1, len(md_map))),
+                            thread_name_prefix="a7-signals") as pool:
+        futures = {host: pool.submit(contextvars.copy_context().run, _ask_llm_for_signals,
+                                     host, text, cache_dir)
+                   for host, text in md_map.items()}
 
-    for host, text in md_map.items():
-        obj = _ask_llm_for_signals(host, text)
+    for host, fut in futures.items():
+        obj = fut.result()
         results[host] = obj
 
         per_host_path = os.path.join(paths.meta_dir, f"{host}__signal_set.json")
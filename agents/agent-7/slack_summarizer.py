@@ -5,9 +5,9 @@ from typing import Any, Dict, List, Optional
 
 # LLM wrapper (graceful fallback if missing)
 try:
-    from shared.llm_api import call_llm  # type: ignore
+    from shared.llm_api import call_llm, json_object  # type: ignore
 except Exception:
-    call_llm = None  # degrade gracefully
+    call_llm = json_object = None  # degrade gracefully
 
 # Slack action id (kept identical to orchestrator listener)
 ATTACH_BTN_ACTION_ID = "agent7_attach_artifacts"
@@ -115,18 +115,6 @@ def build_overview_blocks(
     print("\n📥 cross (input):")
     print(cross)
 
-    llm_obj = LLMOutput.from_analysis(per_device, cross)
-
-    print("\n✅ LLMOutput.device_cards:")
-    print(llm_obj.device_cards)
-
-    summary_block = llm_obj.generate_summary()
-
-    device_blocks = llm_obj.device_cards_to_blocks()
-
-    print("\n📦 Final Slack blocks to return:")
-    print([summary_block] + device_blocks)
-
     print("========== DEBUG END ==========\n")
 
 
@@ -138,7 +126,7 @@ def build_overview_blocks(
     if call_llm is not None:
         try:
             msgs = _build_messages(per_device, cross, rollup_hint)
-            raw = call_llm(msgs, temperature=0.0) or ""
+            raw = call_llm(msgs, temperature=0.0, task="summarize", validate=json_object()) or ""
             tmp = json.loads(raw) if isinstance(raw, str) else {}
             if isinstance(tmp, dict):
                 llm_obj = tmp
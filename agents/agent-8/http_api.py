@@ -1,19 +1,24 @@
 # agents/agent-8/http_api.py
 from __future__ import annotations
-import os, time, json, uuid
+import os, time, json, uuid, queue, threading, contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
 import httpx
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 # Simple local imports (all modules live in the same folder)
 import triage_llm
 import commands_trusted
 import triage_history
+from session_store import SQLiteSessionStore
 
 # shared/helpers.py
-from shared.helpers import extract_cmd_output   
+from shared.helpers import read_cmd_output
+from shared.cassette import use_cassette
+from shared.llm_api import scheduler_stats
 
 # -----------------------------
 # Lightweight local "vector" memory (no external deps)
@@ -184,33 +189,39 @@ AGENT_4_URL = os.getenv("AGENT_4_URL")   # e.g. http://agent-4:8004
 AGENT_7_URL = os.getenv("AGENT_7_URL")   # e.g. http://agent-7:8007
 SESSION_TTL_MIN = int(os.getenv("A8_SESSION_TTL_MIN", "240"))  # default 4h
 ORCH_CALLBACK_URL = os.getenv("ORCH_CALLBACK_URL") # for callback to orchestrator to post slack messages when analysis done
+A8_STREAM_PROGRESS = os.getenv("A8_STREAM_PROGRESS", "1") == "1"   # stream analysis text to orchestrator while the LLM writes
+A8_PROGRESS_UPDATE_S = float(os.getenv("A8_PROGRESS_UPDATE_S", "1.0"))  # min gap between progress posts (Slack chat_update ~1/s)
+A8_BATCH_WORKERS = int(os.getenv("A8_BATCH_WORKERS", "4"))  # commands of one capture analyzed at once (LLM calls still capped by LLM_MAX_CONCURRENCY)
 
-# ---- Minimal in-memory session store (TTL) ----
-_SESS: Dict[str, Dict[str, Any]] = {}
+# ---- Session store (SQLite/WAL, shared by all workers; TTL) ----
+_SESSIONS = SQLiteSessionStore(ttl_s=SESSION_TTL_MIN * 60)
 
 def _now() -> float:
     return time.time()
 
 def _cleanup_sessions() -> None:
-    if not _SESS:
-        return
-    now = _now()
-    dead = [sid for sid, s in _SESS.items() if s.get("expires_at", 0) <= now]
-    for sid in dead:
-        _SESS.pop(sid, None)
+    _SESSIONS.expire()
 
 def _new_session_id() -> str:
     return uuid.uuid4().hex
 
 def _require_session(session_id: str) -> Dict[str, Any]:
-    _cleanup_sessions()
-    s = _SESS.get(session_id)
+    # refresh TTL on use
+    s = _SESSIONS.touch(session_id)
     if not s:
         raise HTTPException(status_code=404, detail="session not found/expired")
-    # refresh TTL on use
-    s["expires_at"] = _now() + SESSION_TTL_MIN * 60
     return s
 
+def _update_session(session_id: str, s: Dict[str, Any], mutate) -> None:
+    """
+    Apply mutate() to the stored session atomically and refresh the local copy `s`.
+    Never write a whole (possibly stale) copy back: other workers update the same session.
+    """
+    updated = _SESSIONS.update(session_id, mutate)
+    if updated is not None:
+        s.clear()
+        s.update(updated)
+
 # ---- Models ----
 class StartReq(BaseModel):
     config_dir: str
@@ -248,6 +259,7 @@ class RunShowsReq(BaseModel):
     session_id: str
     host: str
     commands: List[str]
+    refresh: bool = False      # ask Agent-4 to skip its output cache
 
 class RunShowsResp(BaseModel):
     plan_ini_path: str
@@ -490,8 +502,7 @@ def _mk_host_ini(host: str, commands: List[str]) -> str:
 # ---- Endpoints ----
 @app.get("/health")
 def health():
-    _cleanup_sessions()
-    return {"ok": True, "sessions": len(_SESS)}
+    return {"ok": True, "sessions": _SESSIONS.count(), "llm": scheduler_stats()}
 
 @app.post("/triage/start", response_model=StartResp)
 def triage_start(req: StartReq):
@@ -503,7 +514,7 @@ def triage_start(req: StartReq):
         raise HTTPException(status_code=400, detail="host required")
 
     sid = _new_session_id()
-    _SESS[sid] = {
+    _SESSIONS.put(sid, {
         "config_dir": req.config_dir,
         "task_dir": req.task_dir,
         "host": host,
@@ -518,7 +529,7 @@ def triage_start(req: StartReq):
         # NEW: hints for downstream LLM/Kb
         "vendor": _norm_vendor(req.vendor),
         "platform": _norm_platform(req.platform),
-    }
+    })
     return StartResp(
         session_id=sid,
         ttl_min=SESSION_TTL_MIN,
@@ -533,16 +544,18 @@ def triage_ingest(req: IngestReq):
     Accept free-text, return structured suggestions from LLM + trusted AK.
     """
     s = _require_session(req.session_id)
-    # --- NEW: remember the very first user text as session summary ---
-    # This helps later when we save the issue to memory.
-    # We only capture it once, when the session is still new.
-    if not s.get("summary_text"):
-        s["summary_text"] = req.user_text
-        print(f"[DEBUG] Stored first summary_text for session {req.session_id}", flush=True)
-    # --- #
 
-    # Append to chat history for this session
-    s["history"].append({"role": "user", "text": req.user_text, "ts": _now()})
+    def _remember_text(sess: Dict[str, Any]) -> None:
+        # --- NEW: remember the very first user text as session summary ---
+        # This helps later when we save the issue to memory.
+        # We only capture it once, when the session is still new.
+        if not sess.get("summary_text"):
+            sess["summary_text"] = req.user_text
+            print(f"[DEBUG] Stored first summary_text for session {req.session_id}", flush=True)
+        # Append to chat history for this session
+        sess.setdefault("history", []).append({"role": "user", "text": req.user_text, "ts": _now()})
+
+    _update_session(req.session_id, s, _remember_text)
 
     vendor_hint = s.get("vendor")
     platform_hint = s.get("platform")
@@ -643,7 +656,12 @@ def triage_ingest(req: IngestReq):
             "type": "proposal"
         }
     )
-    s["last_proposals"] = [pc.command for pc in proposed]
+    last_proposals = [pc.command for pc in proposed]
+
+    def _remember_proposals(sess: Dict[str, Any]) -> None:
+        sess["last_proposals"] = last_proposals
+
+    _update_session(req.session_id, s, _remember_proposals)
 
     return IngestResp(
         guidance_text=guidance,
@@ -694,6 +712,7 @@ def triage_run_shows(req: RunShowsReq):
                 "out_subdir": "agent8/2-capture",
                 "devices": [host_use],
                 "no_grading_logs": True,
+                "refresh": req.refresh,
             }
             with httpx.Client(timeout=180.0) as cli:
                 r = cli.post(f"{AGENT_4_URL}/capture-only", json=payload)
@@ -761,6 +780,59 @@ def triage_analyze_command(req: AnalyzeCommandReq):
     """
     print(f"\n----# def triage/analyze_command:--\n----")
 
+    s, raw_output, cmd_output = _load_command_output(req)
+    return _analyze_two_pass(req, s, raw_output, cmd_output)
+
+
+def _submit_ctx(pool: ThreadPoolExecutor, fn, *args):
+    # Run in a copy of the caller's context so llm_api usage_run() sees the calls
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _cassette_dir(s: Dict[str, Any]) -> str:
+    # Triage LLM calls are recorded/replayed per task when CASSETTE_MODE is set
+    return os.path.join(REPO_ROOT, s["config_dir"], s["task_dir"], "cassettes")
+
+
+def _analyze_two_pass(req: AnalyzeCommandReq, s: Dict[str, Any],
+                      raw_output: str, cmd_output: str) -> AnalyzeCommandResp:
+    # 2. Call LLM for analysis (two passes, concurrently — they are independent)
+    # --- Pass-1: single-step, no history ---
+    # --- Pass-2: with history (optional) ---
+    cmds = [req.command]
+    outputs = [cmd_output]
+    history_pass1 = []   # always empty
+    history_pass2 = _pass2_history(req, cmd_output)
+    print(f"[DEBUG] Pass-1 INPUT → cmds={cmds}, outputs_len={len(outputs[0])}, history={history_pass1}")
+    print(f"[DEBUG] Pass-2 INPUT → cmds={cmds}, outputs_len={len(outputs[0])}, history_len={len(history_pass2)}")
+    # Both passes share the system prompt, rules and command output → one usage run
+    with use_cassette(_cassette_dir(s)), \
+            triage_llm.usage_run(f"agent8:analyze_command {req.host} {req.command}"):
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="a8-pass") as pool:
+            f1 = _submit_ctx(pool, triage_llm.triage_llm_analyze, req.host, cmds, outputs, history_pass1)
+            f2 = _submit_ctx(pool, triage_llm.triage_llm_analyze, req.host, cmds, outputs, history_pass2)
+            llm_pass1, llm_pass2 = f1.result(), f2.result()
+    print(f"[DEBUG] Pass-1 OUTPUT → analysis_text={llm_pass1.get('analysis_text', '')[:200]}")
+    print(f"[DEBUG] Pass-2 OUTPUT → analysis_text={llm_pass2.get('analysis_text', '')[:200]}")
+    print("-" * 60)
+
+    return _finish_analyze(req, s, raw_output, llm_pass1, llm_pass2)
+
+
+def _pass2_history(req: AnalyzeCommandReq, cmd_output: str) -> List[Dict[str, Any]]:
+    is_error = any(err in cmd_output for err in [
+        "% Invalid input", "Unknown command", "Incomplete command", "Ambiguous command"
+    ])
+    if is_error:
+        return []
+    return triage_history.collect_recent_steps(req.session_id, limit=10)
+
+
+def _load_command_output(req: AnalyzeCommandReq):
+    """
+    Returns (session, raw_output, cmd_output) for the command's show_log section.
+    cmd_output is never empty (placeholder text) so it can go straight to the LLM.
+    """
     s = _require_session(req.session_id)
 
     # 1. Locate the show_log file
@@ -771,15 +843,13 @@ def triage_analyze_command(req: AnalyzeCommandReq):
     if not os.path.isfile(md_path):
         raise HTTPException(status_code=404, detail=f"show_log not found for {req.host}")
 
-    body = Path(md_path).read_text(encoding="utf-8")
-
     # --- Debug A: what we’re looking for
     print(f"[DEBUG] analyze_command: session={req.session_id}, host={req.host}")
     print(f"[DEBUG] Command requested = {req.command}")
     print(f"[DEBUG] md_path = {md_path}")
 
-    # Use shared helper
-    cmd_output = extract_cmd_output(body, req.command)
+    # Use shared helper (file is indexed once per mtime/size, not re-scanned per command)
+    cmd_output = read_cmd_output(md_path, req.command)
 
     raw_output = cmd_output   # capture before LLM passes
     # --- Append to session transcript for escalation ---
@@ -807,43 +877,26 @@ def triage_analyze_command(req: AnalyzeCommandReq):
     print(f"[DEBUG] Extracted cmd_output (first 200 chars):\n{cmd_output[:200]}")
     print("-" * 60)
 
+    return s, raw_output, cmd_output
 
-    # 2. Call LLM for analysis (two passes)
-    # --- Pass-1: single-step, no history ---
-    cmds = [req.command]
-    outputs = [cmd_output]
-    history_pass1 = []   # always empty
-    print(f"[DEBUG] Pass-1 INPUT → cmds={cmds}, outputs_len={len(outputs[0])}, history={history_pass1}")
-    llm_pass1 = triage_llm.triage_llm_analyze(
-        host=req.host,
-        cmds=cmds,
-        outputs=outputs,
-        history=history_pass1
-    )
-    analysis_pass1 = llm_pass1.get("analysis_text", "")
-    print(f"[DEBUG] Pass-1 OUTPUT → analysis_text={analysis_pass1[:200]}")
-    print("-" * 60)
 
-    # --- Pass-2: with history (optional) ---
-    is_error = any(err in cmd_output for err in [
-        "% Invalid input", "Unknown command", "Incomplete command", "Ambiguous command"
-    ])
-    if is_error:
-        history_pass2 = []
-    else:
-        history_pass2 = triage_history.collect_recent_steps(req.session_id, limit=10)
+# commands_trusted / triage_history / session memory are read-modify-write; with
+# commands analyzed concurrently, the (cheap, non-LLM) finishing step runs one at a time.
+_FINISH_LOCK = threading.Lock()
 
-    print(f"[DEBUG] Pass-2 INPUT → cmds={cmds}, outputs_len={len(outputs[0])}, history_len={len(history_pass2)}")
-    llm_pass2 = triage_llm.triage_llm_analyze(
-        host=req.host,
-        cmds=cmds,
-        outputs=outputs,
-        history=history_pass2
-    )
+def _finish_analyze(req: AnalyzeCommandReq, s: Dict[str, Any], raw_output: str,
+                    llm_pass1: Dict[str, Any], llm_pass2: Dict[str, Any]) -> AnalyzeCommandResp:
+    """
+    Bucket follow-ups, promote the executed command, record history/session memory.
+    """
+    with _FINISH_LOCK:
+        return _finish_analyze_locked(req, s, raw_output, llm_pass1, llm_pass2)
+
+def _finish_analyze_locked(req: AnalyzeCommandReq, s: Dict[str, Any], raw_output: str,
+                           llm_pass1: Dict[str, Any], llm_pass2: Dict[str, Any]) -> AnalyzeCommandResp:
+    analysis_pass1 = llm_pass1.get("analysis_text", "")
     analysis_pass2 = llm_pass2.get("analysis_text", "")
-    print(f"[DEBUG] Pass-2 OUTPUT → analysis_text={analysis_pass2[:200]}")
-    print("-" * 60)
-      
+
     # --- Direction / Recommendations come from Pass-2 (contextual) ---
     direction = llm_pass2.get("direction", "")
     recommended = llm_pass2.get("recommended", [])
@@ -921,39 +974,43 @@ def triage_analyze_command(req: AnalyzeCommandReq):
 
     # --- NEW: update temporary session memory for this triage session ---
     # Each command we analyze is recorded here for later recall (Close Issue).
-    if "executed_cmds" not in s:
-        s["executed_cmds"] = []   # list of {"cmd": ..., "ran_ok": bool, "ts": float}
-    if "analyses" not in s:
-        s["analyses"] = []        # recent analysis texts from LLM pass-2
-    if "directions" not in s:
-        s["directions"] = []      # recent direction lines
-    if "last_trusted" not in s:
-        s["last_trusted"] = []
-    if "last_unvalidated" not in s:
-        s["last_unvalidated"] = []
-
-    # 1) Record the executed command and whether it succeeded
-    s["executed_cmds"].append({
-        "cmd": req.command,
-        "ran_ok": ran_ok,
-        "ts": _now()
-    })
-
-    # 2) Keep last few (up to 5) analyses for context
-    if analysis_pass2:
-        s["analyses"].append(analysis_pass2)
-        if len(s["analyses"]) > 5:
-            s["analyses"] = s["analyses"][-5:]
-
-    # 3) Keep last few (up to 5) directions for recall
-    if direction:
-        s["directions"].append(direction)
-        if len(s["directions"]) > 5:
-            s["directions"] = s["directions"][-5:]
-
-    # 4) Store snapshot of current trusted/unvalidated lists
-    s["last_trusted"] = trusted_cmds[:]
-    s["last_unvalidated"] = unvalidated_cmds[:]
+    # Applied as one atomic update so concurrent workers don't drop each other's steps.
+    def _remember(sess: Dict[str, Any]) -> None:
+        if "executed_cmds" not in sess:
+            sess["executed_cmds"] = []   # list of {"cmd": ..., "ran_ok": bool, "ts": float}
+        if "analyses" not in sess:
+            sess["analyses"] = []        # recent analysis texts from LLM pass-2
+        if "directions" not in sess:
+            sess["directions"] = []      # recent direction lines
+        if "last_trusted" not in sess:
+            sess["last_trusted"] = []
+        if "last_unvalidated" not in sess:
+            sess["last_unvalidated"] = []
+
+        # 1) Record the executed command and whether it succeeded
+        sess["executed_cmds"].append({
+            "cmd": req.command,
+            "ran_ok": ran_ok,
+            "ts": _now()
+        })
+
+        # 2) Keep last few (up to 5) analyses for context
+        if analysis_pass2:
+            sess["analyses"].append(analysis_pass2)
+            if len(sess["analyses"]) > 5:
+                sess["analyses"] = sess["analyses"][-5:]
+
+        # 3) Keep last few (up to 5) directions for recall
+        if direction:
+            sess["directions"].append(direction)
+            if len(sess["directions"]) > 5:
+                sess["directions"] = sess["directions"][-5:]
+
+        # 4) Store snapshot of current trusted/unvalidated lists
+        sess["last_trusted"] = trusted_cmds[:]
+        sess["last_unvalidated"] = unvalidated_cmds[:]
+
+    _update_session(req.session_id, s, _remember)
 
     print(f"[DEBUG] Session memory updated for {req.command}", flush=True)
 
@@ -969,6 +1026,116 @@ def triage_analyze_command(req: AnalyzeCommandReq):
         promoted=promoted
     )
 
+def _analyze_events(req: AnalyzeCommandReq, s: Dict[str, Any], raw_output: str, cmd_output: str):
+    """
+    Both LLM passes, streamed concurrently. Yields event dicts (passes interleave):
+      {"event": "delta", "pass": 1|2, "text": "<analysis_text characters>"}
+      {"event": "pass_done", "pass": 1|2, "analysis_text": "..."}
+      {"event": "result", ...AnalyzeCommandResp fields...}   (last)
+    """
+    histories = {1: [], 2: _pass2_history(req, cmd_output)}
+    events: "queue.Queue" = queue.Queue()
+
+    def _run(n: int) -> None:
+        try:
+            with use_cassette(_cassette_dir(s)):
+                for ev in triage_llm.triage_llm_analyze_stream(
+                        host=req.host, cmds=[req.command], outputs=[cmd_output], history=histories[n]):
+                    events.put((n, ev))
+        except Exception as e:
+            events.put((n, {"event": "done", "result": {"analysis_text": f"LLM call failed: {e}"}}))
+
+    llm: Dict[int, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="a8-pass") as pool:
+        for n in histories:
+            _submit_ctx(pool, _run, n)
+        while len(llm) < len(histories):
+            n, ev = events.get()
+            if ev["event"] == "delta":
+                yield {"event": "delta", "pass": n, "text": ev["text"]}
+                continue
+            llm[n] = ev["result"]
+            analysis = llm[n].get("analysis_text", "")
+            print(f"[DEBUG] Pass-{n} OUTPUT (stream) → analysis_text={analysis[:200]}")
+            yield {"event": "pass_done", "pass": n, "analysis_text": analysis}
+
+    resp = _finish_analyze(req, s, raw_output, llm[1], llm[2])
+    yield dict(resp.dict(), event="result")
+
+
+@app.post("/triage/analyze_command/stream")
+def triage_analyze_command_stream(req: AnalyzeCommandReq):
+    """
+    Same work as /triage/analyze_command, streamed as NDJSON (one JSON object per line):
+      {"event": "output", "raw_output": "..."}
+      then the _analyze_events() events, ending with "result"
+      or {"event": "error", "detail": "..."} if the run fails midway.
+    """
+    print(f"\n----# def triage/analyze_command/stream:--\n----")
+    s, raw_output, cmd_output = _load_command_output(req)   # 404s before streaming starts
+
+    def _line(obj: Dict[str, Any]) -> bytes:
+        return (json.dumps(obj) + "\n").encode("utf-8")
+
+    def _lines():
+        try:
+            yield _line({"event": "output", "raw_output": raw_output})
+            for ev in _analyze_events(req, s, raw_output, cmd_output):
+                yield _line(ev)
+        except Exception as e:
+            print(f"[agent-8/analyze_command/stream] ERROR: {e}", flush=True)
+            yield _line({"event": "error", "detail": str(e)})
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+def _progress_base(req: AnalyzeCommandReq, session: Dict[str, Any], raw_output: str) -> Dict[str, Any]:
+    return {
+        "channel": session.get("channel"),
+        "thread_ts": session.get("thread_ts"),
+        "session_id": req.session_id,
+        "host": req.host,
+        "command": req.command,
+        "preview": raw_output[:1000],
+    }
+
+def _post_progress(base: Dict[str, Any], partial: Dict[str, str], pending: List[int]) -> None:
+    try:
+        with httpx.Client(timeout=5.0) as cli:
+            cli.post(f"{ORCH_CALLBACK_URL}/agent8/progress",
+                     json=dict(base, pending=pending, **partial))
+    except Exception as e:
+        print(f"[agent-8:/capture-done] WARN: progress post failed: {e}", flush=True)
+
+def _analyze_with_progress(req: AnalyzeCommandReq, session: Dict[str, Any],
+                           loaded) -> AnalyzeCommandResp:
+    """
+    /capture-done path: run the streamed analysis and push partial text to the
+    Orchestrator (/agent8/progress) so it can chat_update one Slack message while
+    the LLM writes. The caller posts the placeholder (keeps messages in command
+    order); progress posts are best-effort and throttled.
+    """
+    s, raw_output, cmd_output = loaded
+    base = _progress_base(req, session, raw_output)
+    partial = {"analysis_pass1": "", "analysis_pass2": ""}
+    pending = {1, 2}
+    last_post = _now()
+
+    for ev in _analyze_events(req, s, raw_output, cmd_output):
+        if ev["event"] == "result":
+            ev.pop("event")
+            return AnalyzeCommandResp(**ev)
+        key = f"analysis_pass{ev['pass']}"
+        if ev["event"] == "delta":
+            partial[key] += ev["text"]
+        else:
+            partial[key] = ev["analysis_text"]
+            pending.discard(ev["pass"])
+        if _now() - last_post >= A8_PROGRESS_UPDATE_S:
+            _post_progress(base, partial, sorted(pending))
+            last_post = _now()
+    raise RuntimeError("analysis stream ended without a result")
+
 @app.post("/capture-done")
 def capture_done(req: CaptureDoneReq):
     """
@@ -982,19 +1149,17 @@ def capture_done(req: CaptureDoneReq):
         print("[agent-8:/capture-done] ERROR: ORCH_CALLBACK_URL is not set!", flush=True)
         return {"ok": False, "error": "ORCH_CALLBACK_URL not set"}
 
-    # Try to locate the session
-    session = None
-    session_id = None
-
-    for sid, s in list(_SESS.items()):
-        if s.get("config_dir") != req.config_dir:
-            continue
-        task_val = s.get("task_dir")
-        # accept either "task_id" or "task_dir" from request
-        if task_val == getattr(req, "task_id", None) or task_val == getattr(req, "task_dir", None):
-            session = s
-            session_id = sid
+    # Try to locate the session (indexed by config_dir/task_dir[/host]);
+    # accept either "task_id" or "task_dir" from request
+    task_val = getattr(req, "task_id", None) or getattr(req, "task_dir", None)
+    found = None
+    for dev in (req.devices or []):
+        found = _SESSIONS.find(req.config_dir, task_val, dev)
+        if found:
             break
+    if not found:
+        found = _SESSIONS.find(req.config_dir, task_val)
+    session_id, session = found if found else (None, None)
 
     if not session:
         print(f"[agent-8:/capture-done] WARN: no active session found for {req.config_dir}/{req.task_id}", flush=True)
@@ -1057,13 +1222,34 @@ def capture_done(req: CaptureDoneReq):
     if not lines:
         lines = ["show running-config"]
 
-    # Analyze and post each command
+    # Analyze all commands concurrently; post results in command order.
+    # Outputs are loaded (and transcript appended) up front, in order; with progress
+    # streaming the Slack placeholders are also created in order before any LLM call.
+    def _analyze_one(a_req: AnalyzeCommandReq, loaded) -> AnalyzeCommandResp:
+        if A8_STREAM_PROGRESS:
+            return _analyze_with_progress(a_req, session, loaded)
+        return _analyze_two_pass(a_req, *loaded)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(len(lines), A8_BATCH_WORKERS)),
+                              thread_name_prefix="a8-batch")
+    futures = []
     for cmd in lines:
+        try:
+            a_req = AnalyzeCommandReq(session_id=session_id, host=host, command=cmd)
+            loaded = _load_command_output(a_req)
+            if A8_STREAM_PROGRESS:
+                _post_progress(_progress_base(a_req, session, loaded[1]),
+                               {"analysis_pass1": "", "analysis_pass2": ""}, [1, 2])
+            futures.append((cmd, _submit_ctx(pool, _analyze_one, a_req, loaded)))
+        except Exception as e:
+            futures.append((cmd, e))
+
+    for cmd, fut in futures:
         print(f"\n\n-----[triage_analyze_command] in [def capture_done]-----\n\\n\----\n", flush=True)
         try:
-            resp = triage_analyze_command(
-                AnalyzeCommandReq(session_id=session_id, host=host, command=cmd)
-            )
+            if isinstance(fut, Exception):
+                raise fut
+            resp = fut.result()
             print(f"\n\n\n----# Analyze and post each command:--\n----{ORCH_CALLBACK_URL}/agent8/callback\n\n")
 
             result = {
@@ -1098,6 +1284,7 @@ def capture_done(req: CaptureDoneReq):
 
         except Exception as e:
             results.append({"command": cmd, "error": str(e)})
+    pool.shutdown(wait=False)
 
     print(f"\n\n-----end of [def capture_done]-----\n\--- \nresults: {results}n\----\n", flush=True)
     return {"ok": True, "results": results}
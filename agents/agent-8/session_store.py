@@ -0,0 +1,211 @@
+# agents/agent-8/session_store.py
+# Triage session storage for agent-8.
+# Sessions used to live in a module-level dict inside http_api.py, which
+# tied agent-8 to a single uvicorn worker and needed a full scan to find a
+# session by config/task or to drop expired ones.
+#
+# SQLiteSessionStore keeps every session as one row (JSON payload) with
+# indexed columns for the lookups we actually do:
+#   - by session id                       (primary key)
+#   - by (config_dir, task_dir, host)     (/capture-done callback)
+# Expired sessions are dropped from a min-heap of expiry times instead of
+# scanning every session, plus a periodic indexed sweep for rows created
+# by other worker processes. WAL mode lets several workers share one file.
+#
+# Use path=":memory:" for tests (private, in-process database).
+
+import os
+import json
+import time
+import heapq
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PATH = os.getenv(
+    "A8_SESSION_DB", "/app/shared/_agent_knowledge/agent8_sessions.sqlite3"
+)
+
+# How often (seconds) to run the indexed sweep for rows this process never saw
+SWEEP_INTERVAL_S = float(os.getenv("A8_SESSION_SWEEP_S", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id  TEXT PRIMARY KEY,
+    config_dir  TEXT NOT NULL,
+    task_dir    TEXT NOT NULL,
+    host        TEXT NOT NULL,
+    expires_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_sessions_task ON sessions (config_dir, task_dir, host, updated_at);
+CREATE INDEX IF NOT EXISTS ix_sessions_expiry ON sessions (expires_at);
+"""
+
+
+class SQLiteSessionStore:
+    """
+    Session dicts in, session dicts out. Callers mutate the dict they got from
+    get()/touch() and hand it back with put(); update() does the same atomically
+    across worker processes.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl_s: float = 240 * 60):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._lock = threading.RLock()
+        self._heap: List[Tuple[float, str]] = []   # (expires_at, session_id)
+        self._last_sweep = 0.0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30.0, check_same_thread=False,
+                                   isolation_level=None)  # autocommit; explicit BEGIN where needed
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=30000")
+        self._db.executescript(_SCHEMA)
+
+    # ---- internals ----
+    def _row_to_session(self, row) -> Optional[Dict[str, Any]]:
+        if not row:
+            return None
+        try:
+            data = json.loads(row[0])
+        except Exception:
+            return None
+        data["expires_at"] = row[1]
+        return data
+
+    def _write(self, session_id: str, data: Dict[str, Any], expires_at: float) -> None:
+        data["expires_at"] = expires_at
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions "
+            "(session_id, config_dir, task_dir, host, expires_at, updated_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id,
+             str(data.get("config_dir") or ""),
+             str(data.get("task_dir") or ""),
+             str(data.get("host") or ""),
+             expires_at, time.time(), json.dumps(data)),
+        )
+        heapq.heappush(self._heap, (expires_at, session_id))
+
+    # ---- public API ----
+    def put(self, session_id: str, data: Dict[str, Any], refresh: bool = True) -> None:
+        """Insert or replace a session; refresh=True restarts its TTL."""
+        with self._lock:
+            expires_at = time.time() + self.ttl_s if refresh else float(data.get("expires_at") or 0)
+            self._write(session_id, data, expires_at)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Live session or None. Does not refresh the TTL."""
+        with self._lock:
+            self.expire()
+            row = self._db.execute(
+                "SELECT data, expires_at FROM sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, time.time()),
+            ).fetchone()
+        return self._row_to_session(row)
+
+    def touch(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Live session with its TTL refreshed, or None."""
+        with self._lock:
+            self.expire()
+            now = time.time()
+            expires_at = now + self.ttl_s
+            cur = self._db.execute(
+                "UPDATE sessions SET expires_at = ? WHERE session_id = ? AND expires_at > ?",
+                (expires_at, session_id, now),
+            )
+            if cur.rowcount == 0:
+                return None
+            heapq.heappush(self._heap, (expires_at, session_id))
+            row = self._db.execute(
+                "SELECT data, expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return self._row_to_session(row)
+
+    def update(self, session_id: str, mutate) -> Optional[Dict[str, Any]]:
+        """
+        Atomic read-modify-write: mutate(session_dict) runs inside one write
+        transaction, so concurrent workers never overwrite each other's fields.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT data, expires_at FROM sessions WHERE session_id = ? AND expires_at > ?",
+                    (session_id, time.time()),
+                ).fetchone()
+                data = self._row_to_session(row)
+                if data is None:
+                    self._db.execute("COMMIT")
+                    return None
+                mutate(data)
+                self._write(session_id, data, time.time() + self.ttl_s)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return data
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def find(self, config_dir: str, task_dir: str,
+             host: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Most recently used live session for (config_dir, task_dir[, host])."""
+        sql = ("SELECT session_id, data, expires_at FROM sessions "
+               "WHERE config_dir = ? AND task_dir = ? ")
+        args: List[Any] = [config_dir, task_dir]
+        if host:
+            sql += "AND host = ? "
+            args.append(host)
+        sql += "AND expires_at > ? ORDER BY updated_at DESC LIMIT 1"
+        args.append(time.time())
+        with self._lock:
+            self.expire()
+            row = self._db.execute(sql, args).fetchone()
+        if not row:
+            return None
+        data = self._row_to_session(row[1:])
+        return (row[0], data) if data is not None else None
+
+    def count(self) -> int:
+        with self._lock:
+            self.expire()
+            return int(self._db.execute(
+                "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0])
+
+    def expire(self) -> int:
+        """
+        Drop expired sessions. Pops only heap entries that are due (a refreshed
+        session leaves a stale entry behind; the expires_at guard makes it a no-op).
+        Every SWEEP_INTERVAL_S an indexed range delete also catches rows from
+        other workers. Returns rows deleted.
+        """
+        now = time.time()
+        deleted = 0
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+            for sid in due:
+                deleted += self._db.execute(
+                    "DELETE FROM sessions WHERE session_id = ? AND expires_at <= ?", (sid, now)
+                ).rowcount
+            if now - self._last_sweep >= SWEEP_INTERVAL_S:
+                self._last_sweep = now
+                deleted += self._db.execute(
+                    "DELETE FROM sessions WHERE expires_at <= ?", (now,)
+                ).rowcount
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -4,16 +4,31 @@
 # It builds a clear prompt, calls the LLM, and parses
 # the JSON reply into a simple Python dict.
 
-import json, os, pathlib
-from typing import List, Dict
+import json, os, pathlib, contextlib
+from typing import Any, Dict, Iterator, List, Optional
 from datetime import datetime, timezone
 
 # helper function call_llm(prompt: str) -> str 
 try:
-    from shared.llm_api import call_llm  # type: ignore
+    from shared.llm_api import call_llm, cacheable_messages, usage_run  # type: ignore
 except Exception:
     call_llm = None  # degrade gracefully
 
+    def usage_run(name: str):
+        return contextlib.nullcontext()
+
+    def cacheable_messages(system_prompt: str, variable: str, stable_prefix: str = "") -> List[Dict]:
+        msgs = [{"role": "system", "content": system_prompt}]
+        if stable_prefix:
+            msgs.append({"role": "user", "content": stable_prefix})
+        msgs.append({"role": "user", "content": variable})
+        return msgs
+
+try:
+    from shared.llm_api import stream_llm  # type: ignore
+except Exception:
+    stream_llm = None  # triage_llm_analyze_stream falls back to one blocking call
+
 # debug directory for LLM logs (shared across all agents)
 debug_dir = "/app/shared/_agent_knowledge/llm_debug"
 os.makedirs(debug_dir, exist_ok=True)
@@ -30,40 +45,19 @@ SYSTEM_PROMPT = (
     "and still produce recommendations when possible."
 )
 
-def build_prompt(host: str, cmds: List[str], outputs: List[str],
-                 history: List[Dict]) -> str:
-    """
-    Build the text prompt for the LLM.
+# Fixed analysis rules + reply schema. Sent as its own message right after the
+# system prompt and never varies per host/step, so every triage call shares the
+# same leading bytes and the provider can serve them from its prompt cache.
+ANALYZE_RULES = """Base your analysis ONLY on the fresh CLI outputs in the next message.
+Do NOT reuse conclusions from prior steps unless they are consistent with those outputs.
+Recommend ONLY read-only 'show' commands. Never recommend configuration mode commands.
+If you believe configuration is needed, instead recommend a 'show' command that would validate the hypothesis.
+If the output indicates an error (e.g., '% Invalid input', 'Unknown command'), your analysis_text should say so and execution_judgment must be 'error' for that command.
+Be concise and practical.
 
-    Includes:
-    - Host name
-    - Commands just run + their outputs (the current request always has 1)
-    - Recent triage history (for context)
-    - STRICT rules to avoid config-mode suggestions or unrelated analysis
-    """
-    prompt = []
-    prompt.append(f"You are analyzing network device: {host}.")
-    prompt.append("You are given fresh CLI outputs below. Base your analysis ONLY on these outputs.")
-    prompt.append("Do NOT reuse conclusions from prior steps unless they are consistent with the outputs in this message.")
-    prompt.append("Recommend ONLY read-only 'show' commands. Never recommend configuration mode commands.")
-    prompt.append("If you believe configuration is needed, instead recommend a 'show' command that would validate the hypothesis.")
-    prompt.append("If the output indicates an error (e.g., '% Invalid input', 'Unknown command'), your analysis_text should say so and execution_judgment must be 'error' for that command.")
-    prompt.append("Be concise and practical.")
-
-    prompt.append("\nHere are the command outputs:")
-    for cmd, out in zip(cmds, outputs):
-        prompt.append(f"\nCOMMAND: {cmd}\nOUTPUT:\n{out}\n")
-
-    if history:
-        prompt.append("\nRecent triage history (last 3 steps, for context only):")
-        for step in history[-3:]:
-            prompt.append(f"- ran: {step.get('commands', [])} → {step.get('analysis','')}")
-
-    prompt.append(
-        """
 Return JSON only with this exact shape:
 {
-  "analysis_text": "<short plain analysis derived strictly from the outputs above>",
+  "analysis_text": "<short plain analysis derived strictly from the outputs>",
   "direction": "<next diagnostic steps in plain English; no config>",
   "recommended": [
     {"command": "<read-only show cmd 1>", "tech": "<bgp|ospf|interfaces|routing|mpls|misc>", "trust_hint": "low"},
@@ -87,23 +81,44 @@ The 'recommended' list MUST contain only read-only 'show' commands.
 If the output indicates an invalid or failed command, set execution_judgment to "error".
 Do not invent facts not present in the outputs.
 """
-    )
+
+def build_prompt(host: str, cmds: List[str], outputs: List[str],
+                 history: List[Dict]) -> str:
+    """
+    Build the per-step part of the prompt for the LLM.
+
+    Includes:
+    - Host name
+    - Commands just run + their outputs (the current request always has 1)
+    - Recent triage history (for context)
+    The STRICT rules and JSON schema live in ANALYZE_RULES (sent ahead of this).
+    """
+    prompt = []
+    prompt.append(f"You are analyzing network device: {host}.")
+
+    prompt.append("\nHere are the command outputs:")
+    for cmd, out in zip(cmds, outputs):
+        prompt.append(f"\nCOMMAND: {cmd}\nOUTPUT:\n{out}\n")
+
+    if history:
+        prompt.append("\nRecent triage history (last 3 steps, for context only):")
+        for step in history[-3:]:
+            prompt.append(f"- ran: {step.get('commands', [])} → {step.get('analysis','')}")
+
     return "\n".join(prompt)
 
 
-def call_llm_json(prompt: str) -> Dict:
+def call_llm_json(prompt: str, stable_prefix: str = "") -> Dict:
     """
     Call the LLM and parse its JSON output safely.
+    stable_prefix: constant text sent before `prompt` (see ANALYZE_RULES).
     Returns a dict, or empty structure if parsing fails.
     """
     try:
         if call_llm is None:
             raise RuntimeError("LLM API not available")
 
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
-        ]
+        messages = cacheable_messages(SYSTEM_PROMPT, prompt, stable_prefix=stable_prefix)
         raw = call_llm(messages, temperature=LLM_TEMPERATURE)
         # --- log raw exchange ---
         ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
@@ -118,13 +133,7 @@ def call_llm_json(prompt: str) -> Dict:
 
     except Exception as e:
         # --- also log failures ---
-        ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        path = pathlib.Path(debug_dir) / f"llm_debug_error_{ts}.json"
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump({
-                "error": str(e),
-                "prompt": prompt
-            }, f, indent=2)
+        _log_error(prompt, e)
 
         return {
             "analysis_text": f"LLM call failed: {e}",
@@ -139,7 +148,7 @@ def triage_llm_analyze(host: str, cmds: List[str], outputs: List[str],
     Main entrypoint: build prompt, call LLM, return analysis dict.
     """
     prompt = build_prompt(host, cmds, outputs, history)
-    result = call_llm_json(prompt)
+    result = call_llm_json(prompt, stable_prefix=ANALYZE_RULES)
 
     # Always ensure required keys exist
     return {
@@ -150,6 +159,99 @@ def triage_llm_analyze(host: str, cmds: List[str], outputs: List[str],
     }
 
 
+def _partial_json_string(buf: str, key: str) -> Optional[str]:
+    """
+    Decode the (possibly unfinished) string value of top-level `key` from a JSON
+    reply that is still streaming in. Returns None until the value has started.
+    """
+    marker = f'"{key}"'
+    i = buf.find(marker)
+    if i < 0:
+        return None
+    i += len(marker)
+    while i < len(buf) and buf[i] in " \t\r\n:":
+        i += 1
+    if i >= len(buf) or buf[i] != '"':
+        return None
+    i += 1
+    start = j = i
+    while j < len(buf):
+        ch = buf[j]
+        if ch == '"':
+            break
+        if ch == "\\":
+            need = 6 if buf[j + 1:j + 2] == "u" else 2
+            if j + need > len(buf):
+                break  # escape not complete yet
+            j += need
+            continue
+        j += 1
+    try:
+        return json.loads('"' + buf[start:j] + '"')
+    except Exception:
+        return None
+
+
+def _log_error(prompt: str, e: Exception, raw: Optional[str] = None) -> None:
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    path = pathlib.Path(debug_dir) / f"llm_debug_error_{ts}.json"
+    entry: Dict[str, Any] = {"error": str(e), "prompt": prompt}
+    if raw:
+        entry["raw"] = raw
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, indent=2)
+
+
+def _log_exchange(messages: List[Dict], raw: str) -> None:
+    ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    path = pathlib.Path(debug_dir) / f"llm_debug_{ts}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"messages": messages, "raw": raw}, f, indent=2)
+
+
+def triage_llm_analyze_stream(host: str, cmds: List[str], outputs: List[str],
+                              history: List[Dict]) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of triage_llm_analyze. Yields events:
+      {"event": "delta", "text": "<new analysis_text characters>"}   (0..n times)
+      {"event": "done",  "result": <same dict triage_llm_analyze returns>}
+    Only analysis_text is surfaced while streaming; the rest of the JSON reply
+    (direction, recommended, ...) is returned with "done".
+    """
+    if stream_llm is None or call_llm is None:
+        result = triage_llm_analyze(host, cmds, outputs, history)
+        if result.get("analysis_text"):
+            yield {"event": "delta", "text": result["analysis_text"]}
+        yield {"event": "done", "result": result}
+        return
+
+    prompt = build_prompt(host, cmds, outputs, history)
+    messages = cacheable_messages(SYSTEM_PROMPT, prompt, stable_prefix=ANALYZE_RULES)
+    buf, shown = "", ""
+    try:
+        for delta in stream_llm(messages, temperature=LLM_TEMPERATURE):
+            buf += delta
+            text = _partial_json_string(buf, "analysis_text")
+            if text and len(text) > len(shown):
+                yield {"event": "delta", "text": text[len(shown):]}
+                shown = text
+        _log_exchange(messages, buf)
+        result = json.loads(buf)
+    except Exception as e:
+        try:
+            _log_error(prompt, e, raw=buf)   # same failure log as call_llm_json
+        except Exception:
+            pass
+        result = {"analysis_text": shown or f"LLM call failed: {e}"}
+
+    yield {"event": "done", "result": {
+        "analysis_text": result.get("analysis_text", ""),
+        "direction": result.get("direction", ""),
+        "recommended": result.get("recommended", []),
+        "execution_judgment": result.get("execution_judgment", {})
+    }}
+
+
 def triage_llm_propose(user_text: str,
                        vendor: str = None,
                        platform: str = None,
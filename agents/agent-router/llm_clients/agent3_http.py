@@ -3,6 +3,7 @@
 # Exposes POST /analyze-host and calls existing agent_c_analyze_log.analyze_log_entry
 
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
@@ -30,6 +31,14 @@ class AnalyzeHostJSONReq(BaseModel):
     task_id: str
     hostname: str
 
+# Batch variant: many hosts of one task in a single request
+class AnalyzeHostsJSONReq(BaseModel):
+    config_dir: str
+    task_id: str
+    hostnames: list[str]
+
+AGENT3_BATCH_WORKERS = int(os.getenv("AGENT3_BATCH_WORKERS", "8"))
+
 @app.post("/analyze-host")
 def analyze_host(req: AnalyzeHostReq):
     """
@@ -70,4 +79,36 @@ def analyze_host_json(req: AnalyzeHostJSONReq):
     except Exception as e:
         print(f"[agent-3:/analyze-host-json] ERROR: {e}", flush=True)
         raise HTTPException(status_code=500, detail=str(e))
-    
\ No newline at end of file
+    
+
+
+def _analyze_one(config_dir: str, task_id: str, hostname: str) -> dict:
+    try:
+        summary = analyze_log_core(config_dir, task_id, hostname)
+        save_agent3_json(config_dir, task_id, hostname, summary)
+        return summary
+    except Exception as e:
+        print(f"[agent-3:/analyze-hosts-json] {hostname} ERROR: {e}", flush=True)
+        return {
+            "issue": "Agent-3 analysis failed",
+            "explanation": str(e),
+            "recommendation": "Check Agent-3 logs for this host.",
+            "confidence": "unknown",
+            "needs_more_context": True
+        }
+
+
+@app.post("/analyze-hosts-json")
+def analyze_hosts_json(req: AnalyzeHostsJSONReq):
+    """
+    Batch of /analyze-host-json: analyzes every host (up to AGENT3_BATCH_WORKERS at once),
+    saves each agent3_<HOST>-analysis.json and returns {"results": {host: summary}} in
+    request order. A failing host gets an error object instead of failing the batch.
+    """
+    hosts = list(dict.fromkeys(h for h in req.hostnames if h))
+    if not hosts:
+        return {"results": {}}
+    workers = max(1, min(AGENT3_BATCH_WORKERS, len(hosts)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {h: pool.submit(_analyze_one, req.config_dir, req.task_id, h) for h in hosts}
+        return {"results": {h: fut.result() for h, fut in futures.items()}}
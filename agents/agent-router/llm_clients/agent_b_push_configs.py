@@ -30,6 +30,7 @@ import uvicorn
 import json
 import httpx
 from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
 from llm_api import call_llm
 
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
@@ -178,36 +179,48 @@ def generate_summary_md(log_dir, output_path):
         print(f"[ERROR] Failed to generate summary markdown: {e}", flush=True)
 
 # for agent-2 to invoke agent-3
-# === Agent-3 fan-out (sequential for minimal churn) ===
+# === Agent-3 fan-out (concurrent, bounded, one shared connection pool) ===
+AGENT3_CONCURRENCY = int(os.getenv("AGENT3_CONCURRENCY", "8"))
+AGENT3_TIMEOUT_S = float(os.getenv("AGENT3_TIMEOUT_S", "10"))
+
+def _fetch_agent3_one(client: httpx.Client, h: str, config_dir: str, task_dir: str) -> dict:
+    payload = {"hostname": h, "config_dir": config_dir, "task_id": task_dir}
+    try:
+        r = client.post(AGENT3_URL, json=payload)
+        if r.headers.get("content-type", "").startswith("application/json"):
+            return r.json()
+        return {
+            "issue": "Bad content-type",
+            "explanation": f"Expected JSON, got: {r.headers.get('content-type')}",
+            "recommendation": "Check Agent-3 /analyze-host-json endpoint.",
+            "confidence": "unknown",
+            "needs_more_context": True
+        }
+    except Exception as e:  # incl. per-host timeout
+        return {
+            "issue": "Agent-3 unreachable",
+            "explanation": str(e),
+            "recommendation": "Verify Agent-3 is running and reachable at AGENT3_URL.",
+            "confidence": "unknown",
+            "needs_more_context": True
+        }
+
 def fetch_agent3_analyses(hosts: List[str], config_dir: str, task_dir: str) -> Dict[str, dict]:
     """
-    Calls Agent-3 /analyze-host-json once per host.
-    Returns {host: analysis_json} where analysis_json matches Agent-3's schema.
+    Calls Agent-3 /analyze-host-json once per host, up to AGENT3_CONCURRENCY at a time
+    over one keep-alive pool; each host has its own AGENT3_TIMEOUT_S.
+    Returns {host: analysis_json} (in `hosts` order) where analysis_json matches Agent-3's schema.
     """
     results: Dict[str, dict] = {}
-    for h in hosts:
-        payload = {"hostname": h, "config_dir": config_dir, "task_id": task_dir}
-        try:
-            with httpx.Client(timeout=httpx.Timeout(10.0, connect=3.0)) as client:
-                r = client.post(AGENT3_URL, json=payload)
-                if r.headers.get("content-type", "").startswith("application/json"):
-                    results[h] = r.json()
-                else:
-                    results[h] = {
-                        "issue": "Bad content-type",
-                        "explanation": f"Expected JSON, got: {r.headers.get('content-type')}",
-                        "recommendation": "Check Agent-3 /analyze-host-json endpoint.",
-                        "confidence": "unknown",
-                        "needs_more_context": True
-                    }
-        except Exception as e:
-            results[h] = {
-                "issue": "Agent-3 unreachable",
-                "explanation": str(e),
-                "recommendation": "Verify Agent-3 is running and reachable at AGENT3_URL.",
-                "confidence": "unknown",
-                "needs_more_context": True
-            }
+    if not hosts:
+        return results
+    workers = max(1, min(AGENT3_CONCURRENCY, len(hosts)))
+    limits = httpx.Limits(max_connections=workers, max_keepalive_connections=workers)
+    with httpx.Client(timeout=httpx.Timeout(AGENT3_TIMEOUT_S, connect=3.0), limits=limits) as client:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {h: pool.submit(_fetch_agent3_one, client, h, config_dir, task_dir) for h in hosts}
+            for h, fut in futures.items():
+                results[h] = fut.result()
     return results
 
 
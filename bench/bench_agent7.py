@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# bench/bench_agent7.py
+# End-to-end benchmark of the agent-7 /analyze pipeline.
+#
+#   synthetic task (synth_fleet) under a temp REPO_ROOT
+#   → md_splitter → genie_parser → facts_builder → per_device_llm
+#   → cross_device_llm → slack_summarizer (+ flush of background writes)
+#
+# The stages are driven in the same order, with the same PipelineContext hand-off,
+# as agent-7 http_api._analyze_with_context; LLM calls go to the deterministic
+# fake in fake_llm.py. Reports per-stage wall time, throughput (hosts/s, MB/s of
+# show-log input), Python heap peak (tracemalloc, --memory) and process max RSS,
+# plus LLM token usage; compares against a stored baseline.
+#
+#   python bench/bench_agent7.py --hosts 50 --commands 8 --bgp-prefixes 5000 \
+#       --llm-latency-ms 200 --save-baseline bench/baselines/agent7.json
+#   python bench/bench_agent7.py ... --baseline bench/baselines/agent7.json
+#
+# Exit code 1 when a stage is slower than baseline by more than --tolerance
+# (relative) and --min-delta-s (absolute).
+
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import io
+from typing import Any, Callable, Dict, List
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO = os.path.dirname(_THIS_DIR)
+for p in (os.path.join(_REPO, "agents", "agent-7"), os.path.join(_REPO, "shared"), _REPO, _THIS_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+import synth_fleet  # noqa: E402
+import fake_llm  # noqa: E402
+
+STAGES = ["md_splitter", "genie_parser", "facts_builder", "per_device_llm",
+          "cross_device_llm", "slack_summarizer", "flush"]
+
+
+def _run_stage(name: str, fn: Callable[[], Any], results: Dict[str, Dict[str, Any]],
+               memory: bool, quiet: bool, best_effort: bool = False) -> Any:
+    """best_effort: an exception is recorded in the row instead of aborting (as /analyze does)."""
+    if memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    sink = io.StringIO()
+    out, error = None, None
+    with (contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext()):
+        try:
+            out = fn()
+        except Exception as e:
+            if not best_effort:
+                raise
+            error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - t0
+    row: Dict[str, Any] = {"wall_s": round(wall, 4)}
+    if error:
+        row["error"] = error
+    if memory:
+        row["heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    results[name] = row
+    return out
+
+
+def run_once(repo_root: str, config_dir: str, task_dir: str, hosts: int, input_bytes: int,
+             memory: bool = False, quiet: bool = True) -> Dict[str, Any]:
+    os.environ["REPO_ROOT"] = repo_root
+    import md_splitter
+    import genie_parser
+    import facts_builder
+    import per_device_llm
+    import cross_device_llm
+    import slack_summarizer
+    from pipeline_context import new_context
+    from shared.llm_api import usage_run, routing_stats
+
+    # fresh outputs every run (inputs under 2-capture stay)
+    shutil.rmtree(os.path.join(repo_root, config_dir, task_dir, "agent7", "3-analyze"), ignore_errors=True)
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    t0 = time.perf_counter()
+    with usage_run(f"bench:agent7 {task_dir}") as meter:
+        ctx = new_context(config_dir, task_dir)
+        try:
+            _run_stage("md_splitter", lambda: md_splitter.split_task(
+                config_dir, task_dir, allow_backfill=True, hosts_filter=None, ctx=ctx), stages, memory, quiet)
+            _run_stage("genie_parser", lambda: genie_parser.run(config_dir, task_dir, ctx=ctx),
+                       stages, memory, quiet)
+            _run_stage("facts_builder", lambda: facts_builder.build_all(config_dir, task_dir, ctx=ctx),
+                       stages, memory, quiet)
+            _run_stage("per_device_llm", lambda: per_device_llm.run(config_dir, task_dir, ctx=ctx),
+                       stages, memory, quiet)
+            _run_stage("cross_device_llm", lambda: cross_device_llm.run(config_dir, task_dir, ctx=ctx),
+                       stages, memory, quiet)
+            # Best effort, like the Slack overview step of /analyze
+            _run_stage("slack_summarizer", lambda: slack_summarizer.build_overview_blocks(
+                config_dir, task_dir, ctx.cross_device or {}, ctx.per_device_rows or []),
+                stages, memory, quiet, best_effort=True)
+            _run_stage("flush", ctx.flush, stages, memory, quiet)
+        finally:
+            ctx.close()
+    total = time.perf_counter() - t0
+
+    mb = input_bytes / 1e6
+    for name, row in stages.items():
+        w = row["wall_s"] or 1e-9
+        row["hosts_per_s"] = round(hosts / w, 2)
+        if name in ("md_splitter", "genie_parser", "facts_builder"):
+            row["input_mb_per_s"] = round(mb / w, 2)
+    return {
+        "total_s": round(total, 4),
+        "hosts_per_s": round(hosts / total, 3) if total else 0.0,
+        "stages": stages,
+        "llm_usage": meter.as_dict(),
+        "llm_routes": routing_stats(),   # cumulative over repeats
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _median(values: List[float]) -> float:
+    v = sorted(values)
+    return v[len(v) // 2] if v else 0.0
+
+
+def summarize_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median over repeats (per stage and total); memory/usage from the last run."""
+    out = dict(runs[-1])
+    out["total_s"] = _median([r["total_s"] for r in runs])
+    out["stages"] = {}
+    for name in STAGES:
+        rows = [r["stages"][name] for r in runs if name in r["stages"]]
+        if not rows:
+            continue
+        row = dict(rows[-1])
+        row["wall_s"] = _median([x["wall_s"] for x in rows])
+        out["stages"][name] = row
+    out["repeats"] = len(runs)
+    return out
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+            min_delta_s: float) -> List[str]:
+    regressions = []
+    pairs = [("total", result["total_s"], baseline.get("total_s"))]
+    pairs += [(n, r["wall_s"], (baseline.get("stages") or {}).get(n, {}).get("wall_s"))
+              for n, r in result["stages"].items()]
+    print(f"\n{'stage':<18}{'baseline s':>12}{'now s':>10}{'ratio':>8}")
+    for name, now, base in pairs:
+        if base is None:
+            print(f"{name:<18}{'-':>12}{now:>10.3f}{'-':>8}")
+            continue
+        ratio = now / base if base else float("inf")
+        flag = ""
+        if now - base > min_delta_s and ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<18}{base:>12.3f}{now:>10.3f}{ratio:>8.2f}{flag}")
+    if baseline.get("scenario") != result.get("scenario"):
+        print("[bench] WARN: baseline was recorded for a different scenario "
+              f"({baseline.get('scenario')})")
+    return regressions
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    sc = result["scenario"]
+    print(f"\n[bench] agent-7 pipeline: {sc['hosts']} host(s) × {sc['commands']} command(s), "
+          f"{sc['input_mb']:.1f} MB input, bgp_prefixes={sc['bgp_prefixes']}, "
+          f"llm_latency_ms={sc['llm_latency_ms']}  (median of {result['repeats']})")
+    print(f"{'stage':<18}{'wall s':>9}{'hosts/s':>10}{'MB/s':>8}{'heap MB':>9}")
+    for name, row in result["stages"].items():
+        print(f"{name:<18}{row['wall_s']:>9.3f}{row['hosts_per_s']:>10.1f}"
+              f"{row.get('input_mb_per_s', ''):>8}{row.get('heap_peak_mb', ''):>9}"
+              + (f"  (failed: {row['error']})" if row.get("error") else ""))
+    u = result["llm_usage"]
+    print(f"{'total':<18}{result['total_s']:>9.3f}{result['hosts_per_s']:>10.2f}")
+    print(f"max RSS {result['max_rss_mb']} MB; LLM calls={u['calls']} prompt={u['prompt_tokens']} "
+          f"cached={u['cached_prompt_tokens']} completion={u['completion_tokens']}")
+    routes = result.get("llm_routes") or {}
+    if routes:
+        print(f"{'task class':<18}{'calls':>7}{'mean s':>9}{'p95 s':>8}{'cost $':>10}{'fallbacks':>11}  models")
+        for task, r in routes.items():
+            print(f"{task:<18}{r['calls']:>7}{r['mean_latency_s']:>9.3f}{r['p95_latency_s']:>8.3f}"
+                  f"{r['cost_usd']:>10.4f}{r['fallbacks']:>11}  {r['models']}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="agent-7 pipeline benchmark (synthetic fleet, fake LLM)")
+    ap.add_argument("--hosts", type=int, default=10)
+    ap.add_argument("--commands", type=int, default=8)
+    ap.add_argument("--bgp-prefixes", type=int, default=1000)
+    ap.add_argument("--platform", choices=("mix", "cisco_xr", "cisco_ios"), default="mix")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--llm-latency-ms", type=float, default=0.0, help="Fake LLM base latency per call")
+    ap.add_argument("--llm-prefill-ms-per-1k", type=float, default=0.0)
+    ap.add_argument("--llm-decode-ms-per-1k", type=float, default=0.0)
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per scenario (median reported)")
+    ap.add_argument("--memory", action="store_true", help="Track Python heap peak per stage (slower)")
+    ap.add_argument("--verbose", action="store_true", help="Show pipeline debug output")
+    ap.add_argument("--repo-root", help="Reuse/keep this REPO_ROOT instead of a temp dir")
+    ap.add_argument("--json-out", help="Write the result JSON here")
+    ap.add_argument("--baseline", help="Compare against this result JSON")
+    ap.add_argument("--save-baseline", help="Write the result as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.20)
+    ap.add_argument("--min-delta-s", type=float, default=0.05)
+    args = ap.parse_args(argv)
+
+    repo_root = args.repo_root or tempfile.mkdtemp(prefix="a7bench-")
+    config_dir, task_dir = "bench", "synthetic"
+    info = synth_fleet.generate(repo_root, config_dir, task_dir, args.hosts, args.commands,
+                                args.bgp_prefixes, args.platform, seed=args.seed)
+    fake_llm.install(latency_s=args.llm_latency_ms / 1000.0,
+                     prefill_ms_per_1k=args.llm_prefill_ms_per_1k,
+                     decode_ms_per_1k=args.llm_decode_ms_per_1k)
+    try:
+        runs = [run_once(repo_root, config_dir, task_dir, args.hosts, int(info["bytes"]),
+                         memory=args.memory, quiet=not args.verbose) for _ in range(max(1, args.repeat))]
+    finally:
+        if not args.repo_root:
+            shutil.rmtree(repo_root, ignore_errors=True)
+
+    result = summarize_runs(runs)
+    result["scenario"] = {"hosts": args.hosts, "commands": args.commands, "bgp_prefixes": args.bgp_prefixes,
+                          "platform": args.platform, "seed": args.seed,
+                          "llm_latency_ms": args.llm_latency_ms,
+                          "input_mb": round(info["bytes"] / 1e6, 2)}
+    print_report(result)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(result, f, indent=2)
+    rc = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        regressions = compare(result, base, args.tolerance, args.min_delta_s)
+        if regressions:
+            print(f"[bench] regressions: {', '.join(regressions)}")
+            rc = 1
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"[bench] baseline saved → {args.save_baseline}")
+    return rc
+
+
+if __name__ == "__main__":
+    sys.exit(main())
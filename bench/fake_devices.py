@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+# bench/fake_devices.py
+# Local fake router fleet for capture / push benchmarks.
+#
+# Every simulated device listens on its own 127.0.0.1 port and speaks either
+# SSH (when paramiko is installed — it is whenever netmiko is) or Telnet; the
+# protocol is sniffed from the client's first bytes, so an IOS device behaves
+# like the lab: SSH first, Telnet fallback.
+#
+# The CLI replays recorded outputs from show_logs/*.md (e.g. doo/configs.5/task-18.bfd):
+#   - exact per-device replay when the device name exists in the recordings,
+#     otherwise the same command from a recorded device of that platform
+#     (hostname substituted)
+#   - IOS / IOS-XR prompts, "terminal length" paging with --More--
+#   - configure terminal / commit / end, with candidate config and
+#     the XR "Uncommitted changes found" prompt
+#   - per-command latency + jitter, output bandwidth, login delay
+#   - error injection: invalid-input rejects, dropped sessions, refused logins
+#
+# Usage:
+#   python bench/fake_devices.py --replay doo/configs.5 --count 50 \
+#       --write-config-dir /tmp/fleet --latency-ms 30
+#   python3 /tmp/fleet/run_show_commands.py --task task-18.bfd ...
+#
+# --write-config-dir lays out a config dir (devices.yaml pointing at the fake
+# fleet, plus copies of run_show_commands.py / push_cli_configs.py and the
+# replayed task folders) that the capture/push scripts and agent-4
+# (REPO_ROOT=<parent>) can run against unchanged.
+
+import os
+import re
+import sys
+import glob
+import time
+import json
+import random
+import shutil
+import select
+import socket
+import argparse
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+try:
+    import paramiko
+except ImportError:  # Telnet only
+    paramiko = None
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(_THIS_DIR), "shared"))
+from helpers import index_sections  # noqa: E402
+
+SNIFF_S = 0.3          # how long to wait for an SSH client banner before assuming Telnet
+XR_PREFIX = "RP/0/RP0/CPU0:"
+
+
+def debug(msg):
+    print(f"[fake-devices] {msg}", flush=True)
+
+
+# ---------------------------
+# Recorded outputs
+# ---------------------------
+class ReplayLibrary:
+    """
+    show_logs/*.md → {device: {command: output}} with the echoed command line
+    and trailing prompt removed (the simulator adds its own).
+    """
+
+    def __init__(self):
+        self.by_device: Dict[str, Dict[str, str]] = {}
+        self.platform: Dict[str, str] = {}
+
+    @staticmethod
+    def _clean(cmd: str, body: str) -> str:
+        lines = body.splitlines()
+        if lines and lines[0].strip() == cmd:
+            lines = lines[1:]
+        if lines and re.match(r"^\S*#\s*$", lines[-1].strip()):
+            lines = lines[:-1]
+        return "\n".join(lines).strip("\n")
+
+    def load(self, root: str) -> "ReplayLibrary":
+        for md in sorted(glob.glob(os.path.join(root, "**", "show_logs", "*.md"), recursive=True)):
+            name = os.path.splitext(os.path.basename(md))[0]
+            try:
+                with open(md, encoding="utf-8") as f:
+                    text = f.read()
+            except Exception:
+                continue
+            outputs = self.by_device.setdefault(name, {})
+            for cmd, (off, length) in index_sections(text).items():
+                if length and cmd not in outputs:
+                    out = self._clean(cmd, text[off:off + length])
+                    outputs[cmd] = out
+                    if XR_PREFIX in text[off:off + length]:
+                        self.platform[name] = "cisco_xr"
+            self.platform.setdefault(name, "cisco_ios")
+        debug(f"replay library: {len(self.by_device)} device(s), "
+              f"{sum(len(v) for v in self.by_device.values())} output(s) from {root}")
+        return self
+
+    def lookup(self, device: str, platform: str, cmd: str) -> Optional[str]:
+        cmd = " ".join(cmd.split())
+        own = self.by_device.get(device, {})
+        if cmd in own:
+            return own[cmd]
+        donors = sorted(d for d, outs in self.by_device.items()
+                        if cmd in outs and self.platform.get(d) == platform)
+        if not donors:
+            donors = sorted(d for d, outs in self.by_device.items() if cmd in outs)
+        if not donors:
+            return None
+        donor = donors[sum(map(ord, device)) % len(donors)]
+        return self.by_device[donor][cmd].replace(donor, device)
+
+    def commands(self, device: str) -> List[str]:
+        return list(self.by_device.get(device, {}))
+
+
+# ---------------------------
+# Behaviour knobs
+# ---------------------------
+class SimConfig:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, login_ms: float = 0.0,
+                 bytes_per_s: float = 0.0, error_rate: float = 0.0, drop_rate: float = 0.0,
+                 refuse_rate: float = 0.0, reject_pattern: Optional[str] = None,
+                 username: str = "cisco", password: str = "cisco", seed: Optional[int] = None):
+        self.latency_s = latency_ms / 1000.0
+        self.jitter_s = jitter_ms / 1000.0
+        self.login_s = login_ms / 1000.0
+        self.bytes_per_s = bytes_per_s
+        self.error_rate = error_rate          # command answered with "% Invalid input"
+        self.drop_rate = drop_rate            # session closed instead of answering
+        self.refuse_rate = refuse_rate        # login refused
+        self.reject_re = re.compile(reject_pattern) if reject_pattern else None
+        self.username = username
+        self.password = password
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def chance(self, p: float) -> bool:
+        if p <= 0:
+            return False
+        with self._rng_lock:
+            return self.rng.random() < p
+
+    def delay(self) -> float:
+        with self._rng_lock:
+            return max(0.0, self.latency_s + self.rng.uniform(-self.jitter_s, self.jitter_s))
+
+
+class _Dropped(Exception):
+    pass
+
+
+# ---------------------------
+# Transport adapters
+# ---------------------------
+class _TelnetChan:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+
+    def send(self, data: bytes) -> None:
+        self.sock.sendall(data)
+
+    def recv(self, n: int) -> bytes:
+        data = self.sock.recv(n)
+        # drop IAC option negotiation (3-byte sequences) from the client
+        while b"\xff" in data:
+            i = data.index(b"\xff")
+            data = data[:i] + data[i + 3:]
+        return data
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+
+class _SSHServer(paramiko.ServerInterface if paramiko else object):
+    def __init__(self, cfg: SimConfig):
+        self.cfg = cfg
+        self.shell = threading.Event()
+
+    def check_auth_password(self, username, password):
+        ok = username == self.cfg.username and password == self.cfg.password
+        return paramiko.AUTH_SUCCESSFUL if ok else paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell.set()
+        return True
+
+
+_HOST_KEY = None
+_HOST_KEY_LOCK = threading.Lock()
+
+
+def _host_key():
+    global _HOST_KEY
+    with _HOST_KEY_LOCK:
+        if _HOST_KEY is None:
+            _HOST_KEY = paramiko.RSAKey.generate(2048)
+        return _HOST_KEY
+
+
+# ---------------------------
+# One simulated device
+# ---------------------------
+class FakeDevice:
+    def __init__(self, name: str, platform: str, port: int, library: ReplayLibrary,
+                 cfg: SimConfig, host: str = "127.0.0.1"):
+        self.name = name
+        self.platform = platform
+        self.host = host
+        self.port = port
+        self.library = library
+        self.cfg = cfg
+        self.running_config: List[str] = []
+        self.stats = {"logins": 0, "refused": 0, "commands": 0, "bytes_out": 0,
+                      "config_lines": 0, "commits": 0, "errors": 0, "drops": 0}
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._stop = threading.Event()
+
+    # ---- lifecycle ----
+    def start(self) -> "FakeDevice":
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((self.host, self.port))
+        self.port = s.getsockname()[1]
+        s.listen(64)
+        self._sock = s
+        threading.Thread(target=self._accept_loop, daemon=True, name=f"fake-{self.name}").start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+
+    def _bump(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        try:
+            ready, _, _ = select.select([conn], [], [], SNIFF_S)
+            first = conn.recv(4, socket.MSG_PEEK) if ready else b""
+            if first.startswith(b"SSH-"):
+                if paramiko is None:
+                    conn.close()       # no SSH here: fail fast so clients fall back to Telnet
+                    return
+                self._serve_ssh(conn)
+            else:
+                self._serve_telnet(conn)
+        except (_Dropped, OSError, EOFError):
+            pass
+        except Exception as e:
+            debug(f"{self.name}: session error {e}")
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _serve_ssh(self, conn: socket.socket) -> None:
+        t = paramiko.Transport(conn)
+        t.add_server_key(_host_key())
+        server = _SSHServer(self.cfg)
+        t.start_server(server=server)
+        chan = t.accept(30)
+        if chan is None:
+            t.close()
+            return
+        server.shell.wait(10)
+        try:
+            if self._login_refused():
+                chan.send(b"% Authorization failed.\r\n")
+                return
+            self._cli(chan)
+        finally:
+            chan.close()
+            t.close()
+
+    def _serve_telnet(self, conn: socket.socket) -> None:
+        chan = _TelnetChan(conn)
+        reader = _LineReader(chan)
+        chan.send(b"\r\nUser Access Verification\r\n\r\nUsername: ")
+        user = reader.line()
+        chan.send(user.encode() + b"\r\nPassword: ")
+        pw = reader.line()
+        if user != self.cfg.username or pw != self.cfg.password or self._login_refused():
+            chan.send(b"\r\n% Authentication failed\r\n")
+            return
+        chan.send(b"\r\n")
+        self._cli(chan, reader)
+
+    def _login_refused(self) -> bool:
+        if self.cfg.chance(self.cfg.refuse_rate):
+            self._bump("refused")
+            return True
+        if self.cfg.login_s:
+            time.sleep(self.cfg.login_s)
+        self._bump("logins")
+        return False
+
+    # ---- CLI ----
+    def _prompt(self, mode: str) -> str:
+        base = f"{XR_PREFIX}{self.name}" if self.platform == "cisco_xr" else self.name
+        return f"{base}(config)#" if mode == "config" else f"{base}#"
+
+    def _cli(self, chan, reader: Optional["_LineReader"] = None) -> None:
+        reader = reader or _LineReader(chan)
+        page_len = 24
+        mode = "exec"
+        candidate: List[str] = []
+        out = _Writer(chan, self.cfg.bytes_per_s, self._bump)
+        out.write(self._prompt(mode))
+        while True:
+            raw = reader.line()
+            cmd = " ".join(raw.split())
+            out.write(raw + "\r\n")              # PTY echo (netmiko waits for it)
+            if not cmd:
+                out.write(self._prompt(mode))
+                continue
+            self._bump("commands")
+            if self.cfg.chance(self.cfg.drop_rate):
+                self._bump("drops")
+                raise _Dropped()
+            low = cmd.lower()
+
+            if mode == "exec":
+                if low in ("exit", "logout", "quit"):
+                    return
+                if low.startswith("terminal length"):
+                    try:
+                        page_len = int(low.split()[-1])
+                    except ValueError:
+                        pass
+                elif low.startswith("terminal "):
+                    pass
+                elif low in ("configure terminal", "conf t", "configure", "config t"):
+                    mode, candidate = "config", []
+                    if self.platform == "cisco_ios":
+                        out.write("Enter configuration commands, one per line.  End with CNTL/Z.\r\n")
+                else:
+                    time.sleep(self.cfg.delay())
+                    text = self._show(cmd)
+                    self._page(out, reader, text, page_len)
+                out.write(self._prompt(mode))
+                continue
+
+            # config mode
+            if low in ("end", "exit") or raw == "\x1a":
+                if self.platform == "cisco_xr" and candidate:
+                    out.write("Uncommitted changes found, commit them before exiting(yes/no/cancel)? [cancel]:")
+                    ans = reader.line().strip().lower()
+                    out.write(ans + "\r\n")
+                    if ans.startswith("y"):
+                        self._commit(candidate)
+                    elif not ans.startswith("n"):
+                        out.write(self._prompt(mode))
+                        continue
+                    candidate = []
+                elif self.platform == "cisco_ios":
+                    self._commit(candidate)
+                    candidate = []
+                mode = "exec"
+            elif low == "commit" or low.startswith("commit "):
+                time.sleep(self.cfg.delay())
+                if self.platform == "cisco_xr":
+                    self._commit(candidate)
+                    candidate = []
+            elif low in ("abort",):
+                candidate, mode = [], "exec"
+            elif (self.cfg.reject_re and self.cfg.reject_re.search(cmd)) or self.cfg.chance(self.cfg.error_rate):
+                self._bump("errors")
+                out.write(self._invalid(cmd, mode))
+            else:
+                self._bump("config_lines")
+                candidate.append(cmd)
+            out.write(self._prompt(mode))
+
+    def _commit(self, lines: List[str]) -> None:
+        if lines:
+            with self._lock:
+                self.running_config.extend(lines)
+            self._bump("commits")
+
+    def _invalid(self, cmd: str, mode: str) -> str:
+        return (" " * (len(self._prompt(mode)) + len(cmd.split()[0]) + 1) + "^\r\n"
+                "% Invalid input detected at '^' marker.\r\n")
+
+    def _show(self, cmd: str) -> str:
+        if self.cfg.chance(self.cfg.error_rate):
+            self._bump("errors")
+            return self._invalid(cmd, "exec")
+        text = self.library.lookup(self.name, self.platform, cmd)
+        if text is None:
+            low = cmd.lower()
+            if low in ("show run", "show running-config"):
+                with self._lock:
+                    text = "\n".join(["Building configuration...", f"hostname {self.name}"]
+                                     + self.running_config + ["end"])
+            elif low.startswith("show"):
+                text = ""       # recognised command, nothing recorded
+            else:
+                self._bump("errors")
+                return self._invalid(cmd, "exec")
+        if self.platform == "cisco_xr":
+            text = time.strftime("%a %b %d %H:%M:%S.000 UTC") + "\n" + text \
+                if not text.startswith(("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")) else text
+        return text.replace("\r\n", "\n").replace("\n", "\r\n") + "\r\n"
+
+    def _page(self, out: "_Writer", reader: "_LineReader", text: str, page_len: int) -> None:
+        lines = text.split("\r\n")
+        if page_len <= 0 or len(lines) <= page_len:
+            out.write(text)
+            return
+        i = 0
+        while i < len(lines):
+            chunk = lines[i:i + page_len]
+            i += page_len
+            out.write("\r\n".join(chunk) + ("\r\n" if i < len(lines) else ""))
+            if i >= len(lines):
+                break
+            out.write(" --More-- ")
+            key = reader.key()
+            out.write("\r" + " " * 10 + "\r")
+            if key in ("q", "Q"):
+                out.write("\r\n")
+                return
+
+    def to_inventory(self) -> Dict[str, Any]:
+        return {"name": self.name, "hostname": self.host, "port": self.port,
+                "username": self.cfg.username, "password": self.cfg.password,
+                "device_type": self.platform}
+
+
+class _LineReader:
+    def __init__(self, chan):
+        self.chan = chan
+        self.buf = b""
+
+    def _fill(self) -> None:
+        data = self.chan.recv(4096)
+        if not data:
+            raise EOFError()
+        self.buf += data
+
+    def line(self) -> str:
+        while True:
+            hits = [i for i in (self.buf.find(b"\r"), self.buf.find(b"\n")) if i >= 0]
+            if hits:
+                i = min(hits)
+                if self.buf[i:i + 1] == b"\r" and i == len(self.buf) - 1 and self._more(0.05):
+                    self._fill()          # a lone \r may be the first half of \r\n
+                    continue
+                end = i + 2 if self.buf[i:i + 2] in (b"\r\n", b"\r\x00") else i + 1
+                line, self.buf = self.buf[:i], self.buf[end:]
+                return line.decode("utf-8", "replace")
+            self._fill()
+
+    def _more(self, timeout: float) -> bool:
+        sock = getattr(self.chan, "sock", None)
+        if sock is not None:
+            return bool(select.select([sock], [], [], timeout)[0])
+        return bool(self.chan.recv_ready()) if hasattr(self.chan, "recv_ready") else False
+
+    def key(self) -> str:
+        if not self.buf:
+            self._fill()
+        k, self.buf = self.buf[:1], self.buf[1:]
+        if k == b"\r" and self.buf[:1] == b"\n":
+            self.buf = self.buf[1:]
+        return k.decode("utf-8", "replace")
+
+
+class _Writer:
+    """Writes to the channel, optionally throttled to bytes_per_s (slow VTY / WAN)."""
+
+    def __init__(self, chan, bytes_per_s: float, bump):
+        self.chan = chan
+        self.bytes_per_s = bytes_per_s
+        self.bump = bump
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8", "replace")
+        if self.bytes_per_s > 0:
+            step = max(256, int(self.bytes_per_s / 20))
+            for i in range(0, len(data), step):
+                self.chan.send(data[i:i + step])
+                time.sleep(len(data[i:i + step]) / self.bytes_per_s)
+        else:
+            self.chan.send(data)
+        self.bump("bytes_out", len(data))
+
+
+# ---------------------------
+# Fleet
+# ---------------------------
+class FakeFleet:
+    """
+    A set of FakeDevices on consecutive ports.
+        fleet = FakeFleet.from_library(lib, count=50, cfg=SimConfig(latency_ms=20)).start()
+        ...  # point devices.yaml at fleet.inventory()
+        fleet.stop()
+    """
+
+    def __init__(self, devices: List[FakeDevice]):
+        self.devices = devices
+
+    @classmethod
+    def from_library(cls, library: ReplayLibrary, count: int, cfg: SimConfig,
+                     base_port: int = 0, platform: str = "mix",
+                     names: Optional[List[Tuple[str, str]]] = None) -> "FakeFleet":
+        """
+        names: [(name, platform)] to simulate a real inventory; otherwise the recorded
+        devices first, then synthetic SIM-XR-nnn / SIM-IOS-nnn up to count.
+        """
+        plan: List[Tuple[str, str]] = list(names or [])
+        if not plan:
+            plan = [(n, library.platform[n]) for n in sorted(library.by_device)]
+            plan = [p for p in plan if platform == "mix" or p[1] == platform]
+            i = 0
+            while len(plan) < count:
+                i += 1
+                plat = platform if platform != "mix" else ("cisco_xr" if i % 3 else "cisco_ios")
+                tag = "XR" if plat == "cisco_xr" else "IOS"
+                plan.append((f"SIM-{tag}-{i:03d}", plat))
+        plan = plan[:count] if count else plan
+        devs = [FakeDevice(name, plat, (base_port + i) if base_port else 0, library, cfg)
+                for i, (name, plat) in enumerate(plan)]
+        return cls(devs)
+
+    def start(self) -> "FakeFleet":
+        for d in self.devices:
+            d.start()
+        ports = sorted(d.port for d in self.devices)
+        debug(f"{len(self.devices)} device(s) listening on 127.0.0.1 ports {ports[0]}..{ports[-1]}"
+              if ports else "no devices")
+        return self
+
+    def stop(self) -> None:
+        for d in self.devices:
+            d.stop()
+
+    def inventory(self) -> List[Dict[str, Any]]:
+        return [d.to_inventory() for d in self.devices]
+
+    def stats(self) -> Dict[str, Any]:
+        per = {d.name: dict(d.stats) for d in self.devices}
+        total: Dict[str, int] = {}
+        for s in per.values():
+            for k, v in s.items():
+                total[k] = total.get(k, 0) + v
+        return {"total": total, "devices": per}
+
+    def write_config_dir(self, out_dir: str, replay_root: Optional[str] = None) -> str:
+        """
+        A config dir the capture/push scripts run against as-is: devices.yaml for this
+        fleet, copies of the scripts, and the task folders of replay_root (configs,
+        show_cmds.ini) with a <device>.txt for every simulated device.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, "devices.yaml"), "w") as f:
+            yaml.safe_dump({"devices": self.inventory()}, f, sort_keys=False)
+        src_root = replay_root or os.path.join(os.path.dirname(_THIS_DIR), "doo", "configs.5")
+        for script in ("run_show_commands.py", "push_cli_configs.py"):
+            src = os.path.join(src_root, script)
+            if os.path.isfile(src):
+                shutil.copy2(src, os.path.join(out_dir, script))
+        for ini in glob.glob(os.path.join(src_root, "*", "show_cmds.ini")):
+            task = os.path.basename(os.path.dirname(ini))
+            dst = os.path.join(out_dir, task)
+            os.makedirs(dst, exist_ok=True)
+            shutil.copy2(ini, os.path.join(dst, "show_cmds.ini"))
+            cfgs = sorted(glob.glob(os.path.join(os.path.dirname(ini), "*.txt")))
+            for i, d in enumerate(self.devices):
+                mine = os.path.join(os.path.dirname(ini), f"{d.name}.txt")
+                src = mine if os.path.isfile(mine) else (cfgs[i % len(cfgs)] if cfgs else None)
+                if src:
+                    shutil.copyfile(src, os.path.join(dst, f"{d.name}.txt"))
+                else:
+                    with open(os.path.join(dst, f"{d.name}.txt"), "w") as f:
+                        f.write("!\n")
+        return out_dir
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Fake IOS / IOS-XR device fleet replaying show_logs")
+    ap.add_argument("--replay", default=os.path.join(os.path.dirname(_THIS_DIR), "doo", "configs.5"),
+                    help="Directory searched for **/show_logs/*.md recordings")
+    ap.add_argument("--count", type=int, default=0,
+                    help="Number of devices (default: one per recorded device)")
+    ap.add_argument("--inventory", help="devices.yaml whose names/platforms to simulate")
+    ap.add_argument("--platform", choices=("mix", "cisco_xr", "cisco_ios"), default="mix")
+    ap.add_argument("--base-port", type=int, default=0, help="First port (default: ephemeral)")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Per-command latency")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--login-ms", type=float, default=0.0, help="Extra login delay")
+    ap.add_argument("--bytes-per-s", type=float, default=0.0, help="Output bandwidth cap (0 = unlimited)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of commands rejected")
+    ap.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of commands that drop the session")
+    ap.add_argument("--refuse-rate", type=float, default=0.0, help="Fraction of logins refused")
+    ap.add_argument("--reject-pattern", help="Regex: config lines matching it are rejected")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--write-config-dir", help="Write a runnable config dir for this fleet here")
+    args = ap.parse_args(argv)
+
+    lib = ReplayLibrary().load(args.replay)
+    cfg = SimConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, login_ms=args.login_ms,
+                    bytes_per_s=args.bytes_per_s, error_rate=args.error_rate,
+                    drop_rate=args.drop_rate, refuse_rate=args.refuse_rate,
+                    reject_pattern=args.reject_pattern, seed=args.seed)
+    names = None
+    if args.inventory:
+        with open(args.inventory) as f:
+            names = [(d["name"], d["device_type"].lower()) for d in yaml.safe_load(f)["devices"]]
+    fleet = FakeFleet.from_library(lib, args.count, cfg, base_port=args.base_port,
+                                   platform=args.platform, names=names).start()
+    if paramiko is None:
+        debug("paramiko not installed: Telnet only (IOS devices fall back; XR needs SSH)")
+    if args.write_config_dir:
+        debug(f"config dir: {fleet.write_config_dir(args.write_config_dir, args.replay)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(fleet.stats()["total"]), flush=True)
+        fleet.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# bench/fake_llm.py
+# Deterministic LLM stand-in for pipeline benchmarks.
+#
+# Installs a shared/llm_local.LocalLLM (LLM_BACKEND=local) whose responder
+# recognises the agent-7 prompts by their system message and returns a small,
+# schema-shaped JSON answer derived from a hash of the request, so runs are
+# repeatable and downstream parsing takes its normal path. Latency comes from
+# the LocalLLM knobs (base latency, prefill / decode cost per 1k tokens) and
+# prefix caching is simulated exactly as in llm_local.
+
+import os
+import re
+import json
+import hashlib
+from typing import Dict, List
+
+try:  # same module object shared.llm_api resolves, so set_local_llm() takes effect
+    from shared.llm_local import LocalLLM, set_local_llm
+except ImportError:
+    from llm_local import LocalLLM, set_local_llm
+
+_HOST_RE = re.compile(r'"hostname"\s*:\s*"([^"]+)"')
+
+
+def _digest(messages: List[Dict[str, str]]) -> int:
+    h = hashlib.sha256()
+    for m in messages:
+        h.update((m.get("content") or "").encode("utf-8", "ignore"))
+    return int(h.hexdigest()[:8], 16)
+
+
+def respond(messages: List[Dict[str, str]], model: str) -> str:
+    system = (messages[0].get("content") or "") if messages else ""
+    user = (messages[-1].get("content") or "") if messages else ""
+    d = _digest(messages)
+    status = ("healthy", "healthy", "healthy", "degraded")[d % 4]
+
+    if system.startswith("You extract *structured facts*"):
+        return json.dumps({
+            "summary": "synthetic facts",
+            "status": {"name": "generic", "value": "up" if d % 5 else "down", "confidence": "medium"},
+            "counters": {"total": d % 50, "up": d % 40},
+            "anomalies": [] if d % 5 else [{"what": "peer down", "evidence": "synthetic"}],
+        })
+    if system.startswith("You are a senior Cisco SP NOC engineer"):
+        m = _HOST_RE.search(user)
+        host = m.group(1) if m else "unknown"
+        return json.dumps({
+            "hostname": host, "platform": "ios-xr", "signals_seen": ["bgp", "isis", "intf"],
+            "status": status, "status_reason": "synthetic",
+            "ok": [{"summary": "adjacencies up", "evidence": []}],
+            "issues": [] if status == "healthy" else
+            [{"summary": "peer down", "severity": "warn", "evidence": []}],
+        })
+    if system.startswith("You are a senior NOC service lead"):
+        return json.dumps({"summary": "synthetic cross-device summary", "working": [], "incidents": []})
+    if system.startswith("You are a NOC Slack summarizer"):
+        return json.dumps({"network_summary": "synthetic overview", "devices": []})
+    return "{}"
+
+
+def install(latency_s: float = 0.0, prefill_ms_per_1k: float = 0.0,
+            decode_ms_per_1k: float = 0.0) -> LocalLLM:
+    """Route shared.llm_api to the fake for this process."""
+    os.environ["LLM_BACKEND"] = "local"
+    llm = LocalLLM(latency_s=latency_s, prefill_ms_per_1k=prefill_ms_per_1k,
+                   decode_ms_per_1k=decode_ms_per_1k, responder=respond)
+    set_local_llm(llm)
+    return llm
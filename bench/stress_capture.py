@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# bench/stress_capture.py
+# Concurrency stress for agents/agent-7/capture_wrapper.run_capture.
+#
+# Runs many captures on ONE task at the same time, each with its own plan INI
+# (a marker command "show stress run-<n>") and host list, against a fake Agent-4
+# python entrypoint (defined below) that writes what it was asked for, slowly.
+# Then checks that nothing leaked between captures:
+#   - every run dir holds only its own INI's commands, for exactly its hosts
+#   - every harvested agent7/2-capture/show_logs/<host>.md comes from one run only
+#   - <task_root>/show_cmds.ini is untouched and no legacy show_logs/ appeared
+#
+# Usage:
+#   python bench/stress_capture.py --runs 16 --hosts 8 [--processes] [--keep /tmp/stress]
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AGENT7_DIR = os.path.join(os.path.dirname(HERE), "agents", "agent-7")
+CONFIG_DIR, TASK_DIR = "stress", "task-1"
+MARKER = re.compile(r"show stress run-(\d+)")
+BASELINE_INI = "show version\nshow ip interface brief\n"
+
+
+def fake_agent4(config_dir, task_dir, ini_path, hosts_csv, out_subdir):
+    """AGENT4_PY_FUNC: echo the INI's commands into <task>/<out_subdir>/show_logs/<host>.md."""
+    task_root = os.path.join(os.environ["REPO_ROOT"], config_dir, task_dir)
+    cmds = [l.strip() for l in open(ini_path, encoding="utf-8") if l.strip() and not l.startswith("#")]
+    show_dir = os.path.join(task_root, out_subdir, "show_logs")
+    os.makedirs(show_dir, exist_ok=True)
+    for host in hosts_csv.split(","):
+        time.sleep(random.uniform(0.001, 0.02))
+        with open(os.path.join(show_dir, f"{host}.md"), "w", encoding="utf-8") as fh:
+            for c in cmds:
+                fh.write(f"### {c}\n```\n{host}# {c}\n```\n\n")
+                time.sleep(random.uniform(0, 0.002))
+    return 0
+
+
+def _setup(repo_root: str, runs: int, hosts: int, seed: int) -> list:
+    rnd = random.Random(seed)
+    task_root = os.path.join(repo_root, CONFIG_DIR, TASK_DIR)
+    plan_dir = os.path.join(task_root, "agent7", "1-plan")
+    os.makedirs(plan_dir, exist_ok=True)
+    with open(os.path.join(task_root, "show_cmds.ini"), "w", encoding="utf-8") as fh:
+        fh.write(BASELINE_INI)
+    names = [f"R{i:02d}" for i in range(1, hosts + 1)]
+    jobs = []
+    for n in range(runs):
+        sel = sorted(rnd.sample(names, rnd.randint(1, hosts)))
+        ini = os.path.join(plan_dir, f"stress_{n}.ini")
+        with open(ini, "w", encoding="utf-8") as fh:
+            fh.write(f"# run {n}\nshow version\nshow stress run-{n}\n")
+        plan = os.path.join(plan_dir, f"stress_{n}.json")
+        with open(plan, "w", encoding="utf-8") as fh:
+            json.dump({"selected_hosts": sel, "ini_path": ini}, fh)
+        jobs.append((n, plan, sel))
+    return jobs
+
+
+def _capture(job):
+    n, plan, sel = job
+    if AGENT7_DIR not in sys.path:
+        sys.path.insert(0, AGENT7_DIR)
+    import capture_wrapper
+    summary = capture_wrapper.run_capture(CONFIG_DIR, TASK_DIR, plan_path=plan)
+    return n, sel, summary
+
+
+def _check(repo_root: str, results: list) -> list:
+    task_root = os.path.join(repo_root, CONFIG_DIR, TASK_DIR)
+    problems = []
+    for n, sel, summary in results:
+        run_logs = os.path.join(summary["run_dir"], "show_logs")
+        got = sorted(f[:-3] for f in os.listdir(run_logs) if f.endswith(".md"))
+        if got != sel:
+            problems.append(f"run {n}: hosts {got} != {sel}")
+        for h in got:
+            seen = set(MARKER.findall(open(os.path.join(run_logs, f"{h}.md"), encoding="utf-8").read()))
+            if seen != {str(n)}:
+                problems.append(f"run {n}: {h} has markers {sorted(seen)}")
+        if summary["harvest"]["missing"]:
+            problems.append(f"run {n}: missing {summary['harvest']['missing']}")
+    harvested = os.path.join(task_root, "agent7", "2-capture", "show_logs")
+    for f in sorted(os.listdir(harvested)):
+        text = open(os.path.join(harvested, f), encoding="utf-8").read()
+        seen = set(MARKER.findall(text))
+        if len(seen) != 1 or text.count("### ") != 2:
+            problems.append(f"harvested {f}: mixed/partial ({sorted(seen)})")
+    if open(os.path.join(task_root, "show_cmds.ini"), encoding="utf-8").read() != BASELINE_INI:
+        problems.append("task show_cmds.ini was modified")
+    if os.path.exists(os.path.join(task_root, "show_logs")):
+        problems.append("legacy <task_root>/show_logs was written")
+    return problems
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--runs", type=int, default=16)
+    ap.add_argument("--hosts", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--processes", action="store_true", help="One process per capture instead of threads")
+    ap.add_argument("--keep", help="Use/keep this REPO_ROOT instead of a temp dir")
+    args = ap.parse_args(argv)
+
+    repo_root = args.keep or tempfile.mkdtemp(prefix="stress_capture_")
+    shutil.rmtree(os.path.join(repo_root, CONFIG_DIR), ignore_errors=True)
+    os.environ.update({
+        "REPO_ROOT": repo_root,
+        "AGENT4_MODE": "python",
+        "AGENT4_PY_PATH": os.path.abspath(__file__),
+        "AGENT4_PY_FUNC": "fake_agent4",
+    })
+    jobs = _setup(repo_root, args.runs, args.hosts, args.seed)
+
+    t0 = time.perf_counter()
+    pool = ProcessPoolExecutor if args.processes else ThreadPoolExecutor
+    with pool(max_workers=args.runs) as ex:
+        results = list(ex.map(_capture, jobs))
+    wall = time.perf_counter() - t0
+
+    problems = _check(repo_root, results)
+    print(json.dumps({"runs": args.runs, "hosts": args.hosts, "processes": args.processes,
+                      "wall_s": round(wall, 3), "problems": problems}, indent=2))
+    if not args.keep:
+        shutil.rmtree(repo_root, ignore_errors=True)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# bench/synth_fleet.py
+# Synthetic task generator for pipeline benchmarks.
+#
+# Writes <repo_root>/<config_dir>/<task_dir>/ the way a real capture leaves it:
+#   devices.yaml (config dir), <host>.txt, show_cmds.ini and
+#   agent7/2-capture/show_logs/<host>.md with N hosts × M commands of
+#   IOS / IOS-XR looking output. "show bgp" / "show ip bgp" carry a table of
+#   --bgp-prefixes routes, so full-table sized inputs can be produced.
+# Output is deterministic for a given seed.
+
+import os
+import sys
+import random
+import argparse
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import yaml
+
+XR_PREFIX = "RP/0/RP0/CPU0:"
+
+
+# ---------------------------
+# Output generators: (rng, host, ctx) -> text
+# ---------------------------
+def _ts() -> str:
+    return "Mon Jan  6 10:00:00.000 UTC"
+
+
+def _bgp_summary(rng: random.Random, host: str, ctx: Dict) -> str:
+    rows = []
+    for i, peer in enumerate(ctx["peers"]):
+        up = rng.random() > ctx["fault_rate"]
+        state = str(rng.randint(1, 800)) if up else rng.choice(["Idle", "Active", "Connect"])
+        rows.append(f"{peer:<15} 0 {ctx['asn'] + (i % 3):>6} {rng.randint(100, 90000):>8} "
+                    f"{rng.randint(100, 90000):>8} {rng.randint(1, 99999):>8}    0    0 "
+                    f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} {state}")
+    return (f"BGP router identifier {ctx['loopback']}, local AS number {ctx['asn']}\n"
+            f"BGP generic scan interval 60 secs\nBGP table state: Active\n"
+            f"BGP main routing table version {rng.randint(1000, 999999)}\n\n"
+            "Neighbor        Spk    AS MsgRcvd MsgSent   TblVer  InQ OutQ  Up/Down  St/PfxRcd\n"
+            + "\n".join(rows))
+
+
+def _bgp_table(rng: random.Random, host: str, ctx: Dict) -> str:
+    lines = [f"BGP router identifier {ctx['loopback']}, local AS number {ctx['asn']}",
+             "Status codes: s suppressed, d damped, h history, * valid, > best, i - internal",
+             "Origin codes: i - IGP, e - EGP, ? - incomplete", "",
+             "   Network            Next Hop            Metric LocPrf Weight Path"]
+    n = ctx["bgp_prefixes"]
+    for i in range(n):
+        a, b, c = (i >> 16) & 0xFF, (i >> 8) & 0xFF, i & 0xFF
+        nh = ctx["peers"][i % len(ctx["peers"])]
+        path = " ".join(str(rng.randint(64512, 65534)) for _ in range(rng.randint(1, 4)))
+        lines.append(f"*> {1 + a}.{b}.{c}.0/24{'':<6}{nh:<20}{0:>6}{100:>7}{0:>7} {path} i")
+    lines.append("")
+    lines.append(f"Processed {n} prefixes, {n} paths")
+    return "\n".join(lines)
+
+
+def _intf_brief(rng: random.Random, host: str, ctx: Dict) -> str:
+    rows = []
+    for i, (ifname, ip) in enumerate(ctx["interfaces"]):
+        up = rng.random() > ctx["fault_rate"]
+        st = "Up" if up else "Down"
+        rows.append(f"{ifname:<32}{ip:<16}{st:<15}{st:<15}default")
+    return ("Interface                      IP-Address      Status          Protocol Vrf-Name\n"
+            + "\n".join(rows))
+
+
+def _isis_neighbors(rng: random.Random, host: str, ctx: Dict) -> str:
+    rows = []
+    for i, (ifname, _) in enumerate(ctx["interfaces"][1:]):
+        st = "Up" if rng.random() > ctx["fault_rate"] else "Init"
+        rows.append(f"{ctx['neighbors'][i % len(ctx['neighbors'])]:<16}{ifname:<20}*PtoP*  "
+                    f"{st:<6}{rng.randint(20, 30):<8}L2   Capable")
+    return ("IS-IS CORE neighbors:\n"
+            "System Id      Interface        SNPA           State Holdtime Type IETF-NSF\n"
+            + "\n".join(rows) + f"\n\nTotal neighbor count: {len(rows)}")
+
+
+def _bfd(rng: random.Random, host: str, ctx: Dict) -> str:
+    rows = []
+    for i, (ifname, _) in enumerate(ctx["interfaces"][1:]):
+        st = "UP" if rng.random() > ctx["fault_rate"] else "DOWN"
+        rows.append(f"{ifname:<18}{ctx['peers'][i % len(ctx['peers'])]:<16}"
+                    f"0s(0s*0)         450ms(150ms*3)   {st:<10}No n/a")
+    return ("Interface           Dest Addr           Local det time(int*mult)      State\n"
+            "                                    Echo             Async   H/W   NPU\n"
+            + "\n".join(rows))
+
+
+def _ldp(rng: random.Random, host: str, ctx: Dict) -> str:
+    rows = [f"{p}:0{'':<8}Y   {rng.randint(0, 3)}   {rng.randint(1, 4)}   {rng.randint(10, 900)}   "
+            f"{rng.randint(1, 5)}   {rng.randint(1, 5)}" for p in ctx["peers"]]
+    return ("Peer               GR  NSR  Up Time     Discovery   Addresses     Labels\n"
+            + "\n".join(rows))
+
+
+def _route_summary(rng: random.Random, host: str, ctx: Dict) -> str:
+    return ("Route Source                     Routes     Backup     Deleted     Memory(bytes)\n"
+            f"connected                        {len(ctx['interfaces']):<10} 0          0           {rng.randint(1000, 9000)}\n"
+            f"local                            {len(ctx['interfaces']):<10} 0          0           {rng.randint(1000, 9000)}\n"
+            f"isis CORE                        {rng.randint(20, 400):<10} 0          0           {rng.randint(10000, 99000)}\n"
+            f"bgp {ctx['asn']:<28} {ctx['bgp_prefixes']:<10} 0          0           {ctx['bgp_prefixes'] * 240}\n")
+
+
+def _run_bgp(rng: random.Random, host: str, ctx: Dict) -> str:
+    lines = [f"router bgp {ctx['asn']}", f" bgp router-id {ctx['loopback']}",
+             " address-family ipv4 unicast", " !", " address-family vpnv4 unicast", " !"]
+    for p in ctx["peers"]:
+        lines += [f" neighbor {p}", f"  remote-as {ctx['asn']}", "  update-source Loopback0",
+                  "  address-family vpnv4 unicast", "  !", " !"]
+    return "\n".join(lines + ["!"])
+
+
+def _generic(rng: random.Random, host: str, ctx: Dict) -> str:
+    return "\n".join(f"{host} counter-{i:03d} {rng.randint(0, 1 << 20)}" for i in range(rng.randint(20, 60)))
+
+
+# (xr command, ios command, generator)
+CATALOG: List[Tuple[str, str, Callable]] = [
+    ("show bgp summary", "show ip bgp summary", _bgp_summary),
+    ("show ipv4 interface brief", "show ip interface brief", _intf_brief),
+    ("show isis neighbors", "show isis neighbors", _isis_neighbors),
+    ("show bfd session", "show bfd neighbors", _bfd),
+    ("show mpls ldp neighbor brief", "show mpls ldp neighbor", _ldp),
+    ("show route summary", "show ip route summary", _route_summary),
+    ("show run router bgp", "show run | section router bgp", _run_bgp),
+    ("show bgp", "show ip bgp", _bgp_table),
+]
+
+
+def commands_for(platform: str, count: int) -> List[Tuple[str, Callable]]:
+    out = []
+    for i in range(count):
+        xr, ios, gen = CATALOG[i % len(CATALOG)]
+        cmd = xr if platform == "cisco_xr" else ios
+        if i >= len(CATALOG):
+            cmd = f"{cmd} | include .{i // len(CATALOG)}"
+            gen = _generic
+        out.append((cmd, gen))
+    return out
+
+
+def _host_ctx(rng: random.Random, idx: int, n_hosts: int, bgp_prefixes: int, fault_rate: float) -> Dict:
+    n_if = rng.randint(4, 12)
+    return {
+        "asn": 65000 + (idx % 4),
+        "loopback": f"10.255.{idx // 250}.{idx % 250 + 1}",
+        "peers": [f"10.255.{j // 250}.{j % 250 + 1}" for j in rng.sample(range(max(n_hosts, 4)), k=min(4, max(n_hosts, 4)))],
+        "neighbors": [f"SIM-{j:04d}" for j in rng.sample(range(max(n_hosts, 4)), k=min(4, max(n_hosts, 4)))],
+        "interfaces": [("Loopback0", f"10.255.{idx // 250}.{idx % 250 + 1}")]
+                      + [(f"GigabitEthernet0/0/0/{k}", f"10.{idx % 250}.{k}.1") for k in range(n_if)],
+        "bgp_prefixes": bgp_prefixes,
+        "fault_rate": fault_rate,
+    }
+
+
+def generate(repo_root: str, config_dir: str = "bench", task_dir: str = "synthetic",
+             hosts: int = 10, commands: int = 8, bgp_prefixes: int = 1000,
+             platform: str = "mix", fault_rate: float = 0.05, seed: int = 7) -> Dict[str, object]:
+    """Write the task; returns {task_root, hosts, commands, bytes}."""
+    cfg_root = os.path.join(repo_root, config_dir)
+    task_root = os.path.join(cfg_root, task_dir)
+    show_dir = os.path.join(task_root, "agent7", "2-capture", "show_logs")
+    os.makedirs(show_dir, exist_ok=True)
+
+    devices, ini = [], {"common_IOSXR": [], "common_IOS": []}
+    total = 0
+    for idx in range(hosts):
+        rng = random.Random(seed * 100003 + idx)
+        plat = platform if platform != "mix" else ("cisco_xr" if idx % 3 else "cisco_ios")
+        name = f"SIM-{idx:04d}"
+        ctx = _host_ctx(rng, idx, hosts, bgp_prefixes, fault_rate)
+        devices.append({"name": name, "hostname": f"192.0.2.{idx % 250 + 1}", "username": "cisco",
+                        "password": "cisco", "device_type": plat})
+        cmds = commands_for(plat, commands)
+        ini["common_IOSXR" if plat == "cisco_xr" else "common_IOS"] = [c for c, _ in cmds]
+        prompt = f"{XR_PREFIX}{name}#" if plat == "cisco_xr" else f"{name}#"
+
+        parts = [f"# Full Output for Task {task_dir}\n",
+                 f"**Device:** {name} ({devices[-1]['hostname']})\n",
+                 f"_Generated: {datetime(2025, 1, 6, 10, 0, 0)}_\n\n"]
+        for cmd, gen in cmds:
+            body = gen(rng, name, ctx)
+            if plat == "cisco_xr":
+                body = f"{_ts()}\n{body}"
+            parts.append(f"## {cmd}\n\n```\n{cmd}\n\n{body}\n{prompt}\n```\n\n")
+        text = "".join(parts)
+        total += len(text)
+        with open(os.path.join(show_dir, f"{name}.md"), "w", encoding="utf-8") as f:
+            f.write(text)
+        with open(os.path.join(task_root, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(_run_bgp(rng, name, ctx) + "\n")
+
+    with open(os.path.join(cfg_root, "devices.yaml"), "w") as f:
+        yaml.safe_dump({"devices": devices}, f, sort_keys=False)
+    with open(os.path.join(task_root, "show_cmds.ini"), "w") as f:
+        for section, cmds in ini.items():
+            f.write(f"[{section}]\n" + "".join(f"{c}\n" for c in cmds) + "\n")
+    return {"task_root": task_root, "hosts": hosts, "commands": commands, "bytes": total}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Generate a synthetic task under a REPO_ROOT")
+    ap.add_argument("--repo-root", required=True)
+    ap.add_argument("--config-dir", default="bench")
+    ap.add_argument("--task", default="synthetic")
+    ap.add_argument("--hosts", type=int, default=10)
+    ap.add_argument("--commands", type=int, default=8)
+    ap.add_argument("--bgp-prefixes", type=int, default=1000, help="Routes in 'show bgp' (full table ≈ 950000)")
+    ap.add_argument("--platform", choices=("mix", "cisco_xr", "cisco_ios"), default="mix")
+    ap.add_argument("--fault-rate", type=float, default=0.05, help="Share of peers/adjacencies shown down")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+    info = generate(args.repo_root, args.config_dir, args.task, args.hosts, args.commands,
+                    args.bgp_prefixes, args.platform, args.fault_rate, args.seed)
+    print(f"[synth] {info['hosts']} host(s) × {info['commands']} command(s), "
+          f"{info['bytes'] / 1e6:.1f} MB → {info['task_root']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,11 @@
 import yaml
 import os
+import json
+import time
 import argparse
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from netmiko import ConnectHandler
 from datetime import datetime
 
@@ -18,6 +23,31 @@ parser.add_argument(
     action="store_true",
     help="Disable automatic 'commit' for IOS-XR devices",
 )
+parser.add_argument(
+    "--parallel",
+    type=int,
+    default=int(os.getenv("PUSH_PARALLEL", "1")),
+    help="Devices pushed at the same time within a stage (default: $PUSH_PARALLEL or 1)",
+)
+parser.add_argument(
+    "--stage",
+    action="append",
+    default=None,
+    help="Ordered stage of device-name patterns, comma-separated (e.g. --stage 'A-P-*' --stage 'A-PE-*'). "
+         "Repeat for each stage; devices matching no stage go last. Default: $PUSH_STAGES, stages separated by ';'.",
+)
+parser.add_argument(
+    "--halt-on-failure",
+    action="store_true",
+    default=os.getenv("PUSH_HALT_ON_FAILURE", "0") == "1",
+    help="Do not start the next stage if any device in the current stage failed",
+)
+parser.add_argument(
+    "--progress-json",
+    action="store_true",
+    default=os.getenv("PUSH_PROGRESS", "") == "jsonl",
+    help="Also print one JSON line per device event (start/ok/error/skip) and a final 'done' line",
+)
 args = parser.parse_args()
 
 # ---------------------------
@@ -36,23 +66,59 @@ with open(DEVICES_FILE) as f:
     devices_data = yaml.safe_load(f)["devices"]
 
 # ---------------------------
-# Loop through devices
+# Stages: ordered groups of devices (e.g. core first, then edge)
 # ---------------------------
-for device in devices_data:
+def build_stages(devices, stage_args):
+    specs = stage_args
+    if specs is None:
+        env = os.getenv("PUSH_STAGES", "")
+        specs = [s for s in env.split(";") if s.strip()]
+    stages = [[] for _ in specs] + [[]]
+    for device in devices:
+        idx = len(specs)
+        for i, spec in enumerate(specs):
+            if any(fnmatch.fnmatch(device["name"], pat.strip()) for pat in spec.split(",") if pat.strip()):
+                idx = i
+                break
+        stages[idx].append(device)
+    return [s for s in stages if s]
+
+# ---------------------------
+# Output (thread-safe; JSON lines are parsed by shared/push_core.run_push_script)
+# ---------------------------
+_out_lock = threading.Lock()
+
+def say(msg):
+    with _out_lock:
+        print(msg, flush=True)
+
+def emit(event, **fields):
+    if not args.progress_json:
+        return
+    with _out_lock:
+        print(json.dumps({"event": event, "task": args.task, "ts": round(time.time(), 3), **fields}), flush=True)
+
+# ---------------------------
+# Push one device
+# ---------------------------
+def push_device(device, stage):
     name = device["name"]
     config_file = os.path.join(TASK_FOLDER, f"{name}.txt")
     log_file = os.path.join(LOGS_DIR, f"{name}.log")
 
     if not os.path.isfile(config_file):
-        print(f"[SKIP] No config found for {name} under {TASK_FOLDER}.")
-        continue
+        say(f"[SKIP] No config found for {name} under {TASK_FOLDER}.")
+        emit("device", device=name, stage=stage, status="skip", reason="no config")
+        return "skip"
 
-    print(f"[INFO] Pushing config to {name} ({device['hostname']}) for task: {args.task}...")
+    say(f"[INFO] Pushing config to {name} ({device['hostname']}) for task: {args.task}...")
+    emit("device", device=name, stage=stage, status="start")
+    t0 = time.time()
 
     try:
         # Strip out unsupported Netmiko parameters
         netmiko_device = {
-            k: v for k, v in device.items() if k in ["host", "hostname", "username", "password", "device_type"]
+            k: v for k, v in device.items() if k in ["host", "hostname", "port", "username", "password", "device_type"]
         }
 
         if "hostname" in netmiko_device:
@@ -62,7 +128,7 @@ for device in devices_data:
             conn = ConnectHandler(**netmiko_device)
         except Exception as ssh_error:
             if device["device_type"] == "cisco_ios":
-                print(f"[WARN] SSH failed on {name}. Trying Telnet fallback...")
+                say(f"[WARN] SSH failed on {name}. Trying Telnet fallback...")
                 netmiko_device["device_type"] = "cisco_ios_telnet"
                 try:
                     conn = ConnectHandler(**netmiko_device)
@@ -88,13 +154,58 @@ for device in devices_data:
             log.write(f"Timestamp: {datetime.now()}\n\n")
             log.write(output)
 
-        print(f"[SUCCESS] Config pushed to {name}. Log saved to {log_file}")
+        say(f"[SUCCESS] Config pushed to {name}. Log saved to {log_file}")
         conn.disconnect()
+        emit("device", device=name, stage=stage, status="ok", log=log_file,
+             elapsed_s=round(time.time() - t0, 2))
+        return "ok"
 
     except Exception as e:
         error_msg = f"[ERROR] Config push failed for {name}: {e}"
-        print(error_msg)
+        say(error_msg)
         with open(log_file, "w") as log:
             log.write(f"--- ERROR Log for {name} ---\n")
             log.write(f"Timestamp: {datetime.now()}\n\n")
             log.write(error_msg)
+        emit("device", device=name, stage=stage, status="error", log=log_file,
+             elapsed_s=round(time.time() - t0, 2), error=str(e))
+        return "error"
+
+# ---------------------------
+# Push stage by stage; devices within a stage run concurrently
+# ---------------------------
+stages = build_stages(devices_data, args.stage)
+workers = max(1, args.parallel)
+counts = {"ok": 0, "error": 0, "skip": 0, "halted": 0}
+halted = False
+
+for idx, stage_devices in enumerate(stages):
+    names = [d["name"] for d in stage_devices]
+    if halted:
+        for name in names:
+            # Devices without a config are not part of the task: report them as such, not as halted
+            if not os.path.isfile(os.path.join(TASK_FOLDER, f"{name}.txt")):
+                say(f"[SKIP] No config found for {name} under {TASK_FOLDER}.")
+                emit("device", device=name, stage=idx, status="skip", reason="no config")
+                counts["skip"] += 1
+                continue
+            say(f"[SKIP] {name}: an earlier stage failed (--halt-on-failure).")
+            emit("device", device=name, stage=idx, status="skip", reason="halted")
+            counts["halted"] += 1
+        continue
+    if len(stages) > 1:
+        say(f"[INFO] Stage {idx + 1}/{len(stages)}: {', '.join(names)}")
+    emit("stage", stage=idx, devices=names)
+
+    if workers == 1:
+        statuses = [push_device(d, idx) for d in stage_devices]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(stage_devices))) as pool:
+            statuses = list(pool.map(lambda d: push_device(d, idx), stage_devices))
+
+    for st in statuses:
+        counts[st] += 1
+    if args.halt_on_failure and "error" in statuses:
+        halted = True
+
+emit("done", **counts)
@@ -116,7 +116,7 @@ for dev in devices:
     print(f"Connecting to {name} ({dev.get('hostname')})…")
     try:
         params = {k: v for k, v in dev.items()
-                  if k in ("host", "hostname", "username", "password", "device_type")}
+                  if k in ("host", "hostname", "port", "username", "password", "device_type")}
         if "hostname" in params:
             params["host"] = params.pop("hostname")
 
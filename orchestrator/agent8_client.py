@@ -1,8 +1,9 @@
 # orchestrator/agent8_client.py
 from __future__ import annotations
 import os
+import json
 import httpx
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 AGENT_8_URL = os.getenv("AGENT_8_URL", "http://agent-8:8008")
 
@@ -31,11 +32,12 @@ def ingest(session_id: str, user_text: str) -> Dict[str, Any]:
         "user_text": user_text,
     })
 
-def run_shows(session_id: str, host: str, commands: List[str]) -> Dict[str, Any]:
+def run_shows(session_id: str, host: str, commands: List[str], refresh: bool = False) -> Dict[str, Any]:
     return _post("/triage/run_shows", {
         "session_id": session_id,
         "host": host,
         "commands": commands,
+        "refresh": refresh,
     })
 
 def reanalyze(session_id: str, host: str) -> Dict[str, Any]:
@@ -54,6 +56,21 @@ def analyze_command(session_id: str, host: str, command: str) -> Dict[str, Any]:
         # "output": output,
     })
 
+def analyze_command_stream(session_id: str, host: str, command: str,
+                           timeout: float = 120.0) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming /triage/analyze_command: yields the NDJSON events as Agent-8 emits them
+    ("output", "delta", "pass_done", then "result" or "error").
+    """
+    url = f"{AGENT_8_URL}/triage/analyze_command/stream"
+    payload = {"session_id": session_id, "host": host, "command": command}
+    with httpx.Client(timeout=httpx.Timeout(timeout, connect=10.0)) as cli:
+        with cli.stream("POST", url, json=payload) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
 # --- NEW: save triage session to memory (Close Issue) --- #
 def save_memory(session_id: str,
                 root_cause_text: str = "",
@@ -1,8 +1,8 @@
 # orchestrator/orch_api.py
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import List, Optional
-import os, json
+from typing import Dict, List, Optional, Tuple
+import os, json, threading, time
 
 # We’ll reuse Slack client that slack_bolt already uses via the App
 from slack_bolt import App
@@ -32,20 +32,75 @@ class Agent8AnalysisPayload(BaseModel):
     unvalidated_commands: Optional[List[str]] = None
     promoted: Optional[List[str]] = None   # <<< ADDED for trusted commands
 
+class Agent8ProgressPayload(BaseModel):
+    # Partial analysis while Agent-8 is still streaming from the LLM
+    channel: str
+    thread_ts: str
+    session_id: str
+    host: str
+    command: str
+    preview: Optional[str] = None
+    analysis_pass1: Optional[str] = None
+    analysis_pass2: Optional[str] = None
+    pending: Optional[List[int]] = None    # passes (1|2) still being written
+
+# (session_id, host, command) → (channel, ts, last progress time) of the message being
+# updated in place. /agent8/callback pops the entry; entries whose final callback never
+# came (agent-8 died) are evicted after PROGRESS_MSG_TTL_S without progress.
+_PROGRESS_MSG: Dict[Tuple[str, str, str], Tuple[str, str, float]] = {}
+_PROGRESS_LOCK = threading.Lock()
+PROGRESS_MSG_TTL_S = float(os.getenv("PROGRESS_MSG_TTL_S", "1800"))
+
+def _evict_stale_progress(now: float) -> None:
+    """Drop abandoned progress messages (_PROGRESS_LOCK held)."""
+    for key in [k for k, v in _PROGRESS_MSG.items() if now - v[2] > PROGRESS_MSG_TTL_S]:
+        del _PROGRESS_MSG[key]
+
+def _analysis_parts(body, pending: Optional[List[int]] = None) -> List[str]:
+    pending = pending or []
+    parts = []
+    if body.preview:
+        parts.append(f"*📄 Output for `{body.command}` on `{body.host}`:*\n```{body.preview}```")
+    if body.analysis_pass1 or 1 in pending:
+        parts.append(f"*🔍 Analysis-1 (single-command):*\n{body.analysis_pass1 or ''}"
+                     + (" ⏳" if 1 in pending else "")) # Pass-1
+    if body.analysis_pass2 or 2 in pending:
+        parts.append(f"*🔍 Analysis-2 (with history):*\n{body.analysis_pass2 or ''}"
+                     + (" ⏳" if 2 in pending else "")) # Pass-2
+    return parts
+
 @app.get("/health")
 def health():
     return {"ok": True}
 
+@app.post("/agent8/progress")
+def agent8_progress(body: Agent8ProgressPayload):
+    """
+    First call posts a placeholder in the thread; later calls chat_update that same
+    message. /agent8/callback replaces it with the final analysis + buttons.
+    """
+    key = (body.session_id, body.host, body.command)
+    text = "\n\n".join(_analysis_parts(body, body.pending)) or \
+        f"Analyzing `{body.command}` on `{body.host}` ⏳"
+    try:
+        with _PROGRESS_LOCK:
+            now = time.monotonic()
+            msg = _PROGRESS_MSG.get(key)
+            if msg is None:
+                _evict_stale_progress(now)
+                r = slack_client.chat_postMessage(channel=body.channel, thread_ts=body.thread_ts, text=text)
+                _PROGRESS_MSG[key] = (r.get("channel") or body.channel, r.get("ts"), now)
+            else:
+                slack_client.chat_update(channel=msg[0], ts=msg[1], text=text)
+                _PROGRESS_MSG[key] = (msg[0], msg[1], now)
+        return {"ok": True}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Slack update failed: {e}")
+
 @app.post("/agent8/callback")
 def agent8_callback(body: Agent8AnalysisPayload):
     # composing the same message format that was already used in slack_bot.py
-    parts = []
-    if body.preview:
-        parts.append(f"*📄 Output for `{body.command}` on `{body.host}`:*\n```{body.preview}```")
-    if body.analysis_pass1:
-        parts.append(f"*🔍 Analysis-1 (single-command):*\n{body.analysis_pass1}") # Pass-1
-    if body.analysis_pass2:
-        parts.append(f"*🔍 Analysis-2 (with history):*\n{body.analysis_pass2}") # Pass-2
+    parts = _analysis_parts(body)
     if body.direction:
         parts.append(f"*Direction:* {body.direction}")
     # if body.trusted_commands:
@@ -109,12 +164,18 @@ def agent8_callback(body: Agent8AnalysisPayload):
             ],
         })
 
-        slack_client.chat_postMessage(
-            channel=body.channel,
-            thread_ts=body.thread_ts,
-            text=text,
-            blocks=blocks,
-        )
+        # Replace the streamed placeholder if there is one, else post fresh
+        with _PROGRESS_LOCK:
+            msg = _PROGRESS_MSG.pop((body.session_id, body.host, body.command), None)
+        if msg is not None:
+            slack_client.chat_update(channel=msg[0], ts=msg[1], text=text, blocks=blocks)
+        else:
+            slack_client.chat_postMessage(
+                channel=body.channel,
+                thread_ts=body.thread_ts,
+                text=text,
+                blocks=blocks,
+            )
         return {"ok": True}
 
     # try:
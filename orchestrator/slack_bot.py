@@ -22,10 +22,10 @@ import yaml  # for loading device.yaml to get vendor & platform (e.g., cisco & i
 import re
 
 # --- agent-8 triage (analyze 1 command)
-from agent8_client import analyze_command
+from agent8_client import analyze_command, analyze_command_stream
 
 # shared/helpers.py
-from shared.helpers import extract_cmd_output   
+from shared.helpers import read_cmd_output
 # for email / Escalate
 from urllib.parse import quote
 
@@ -92,6 +92,147 @@ def _lookup_vendor_platform(config_dir: str, host: str) -> tuple[Optional[str],
             return _map_device_type(dev.get("device_type") or "")
     return None, None
 
+# --- Agent-8 analysis → one Slack message per command ---
+# Stream analysis into the message as the LLM writes it (chat_update), else post once at the end
+A8_STREAM_ANALYSIS = os.getenv("A8_STREAM_ANALYSIS", "1") == "1"
+A8_STREAM_UPDATE_S = float(os.getenv("A8_STREAM_UPDATE_S", "1.0"))  # min gap between chat_update calls
+A8_ANALYZE_CONCURRENCY = int(os.getenv("A8_ANALYZE_CONCURRENCY", "4"))  # commands analyzed at once
+
+def _format_a8_analysis(cmd: str, hst: str, preview: str, res: dict,
+                        pending: Optional[List[int]] = None) -> str:
+    """
+    Slack text for one analyzed command. pending lists the passes (1|2) still streaming.
+    """
+    pending = pending or []
+    analysis1 = res.get("analysis_pass1") or ("" if 1 in pending else "(no analysis)")
+    analysis2 = res.get("analysis_pass2") or None   # Optional
+
+    direction = res.get("direction") or ""
+    trusted = res.get("trusted_commands") or []
+    unvalidated = res.get("unvalidated_commands") or []
+    promoted = res.get("promoted") or []   # <<< ADDED for trusted/unvalidated commands
+
+    out = []
+    out.append(f"*📄 Output for `{cmd}` on `{hst}`:*\n```{preview}```")
+    out.append(f"*🟢 Analysis-1 (single-step):*\n{analysis1}" + (" ⏳" if 1 in pending else "")) # Pass-1
+    # comment this block to disable Pass-2 entirely
+    if 2 in pending:
+        out.append(f"*🔵 Analysis-2 (with history):*\n{analysis2 or ''} ⏳")
+    elif analysis2:
+        out.append(f"*🔵 Analysis-2 (with history):*\n{analysis2}") # Pass-2
+    if direction:
+        out.append(f"*Direction:* {direction}")
+    if trusted:
+        out.append(f"*Trusted commands:* " + ", ".join(f"`{c}`" for c in trusted))
+    if unvalidated:
+        out.append(f"*Unvalidated commands:* " + ", ".join(f"`{c}`" for c in unvalidated))
+    if promoted:   # <<< ADDED for trusted/unvalidated commands
+        out.append("*Promoted to trusted (just ran ok):* " + ", ".join(f"`{c}`" for c in promoted))
+    return "\n\n".join(out)
+
+def _a8_preview(md_path: str, cmd: str) -> str:
+    # Raw fenced output (always first)
+    preview = read_cmd_output(md_path, cmd)
+    return preview or f"(no captured output for `{cmd}` in log)"
+
+def _stream_a8_into_message(say, pchan: str, pthr: str, session_id: str,
+                            hst: str, cmd: str, preview: str, posted) -> None:
+    """
+    Fill an already-posted placeholder: chat_update it as analysis text arrives
+    (throttled to A8_STREAM_UPDATE_S). Falls back to the blocking endpoint only if
+    the stream fails before any LLM pass started. After that a re-run would repeat
+    both passes and could record history/promotion twice (agent-8 may have finished),
+    so the partial text is kept with an error note instead.
+    """
+    import time
+
+    ts = posted.get("ts") if posted else None
+    chan = (posted.get("channel") if posted else None) or pchan
+
+    def _show(text: str) -> None:
+        if ts:
+            app.client.chat_update(channel=chan, ts=ts, text=text)
+        else:
+            say(channel=pchan, thread_ts=pthr, text=text)
+
+    partial = {"analysis_pass1": "", "analysis_pass2": ""}
+    pending = {1, 2}
+    res = None
+    started = False
+    failure = "stream ended without a result"
+    last_update = time.monotonic()
+    try:
+        for ev in analyze_command_stream(session_id=session_id, host=hst, command=cmd):
+            kind = ev.get("event")
+            if kind in ("delta", "pass_done"):
+                started = True
+            if kind == "delta":
+                partial[f"analysis_pass{ev.get('pass', 1)}"] += ev.get("text") or ""
+            elif kind == "pass_done":
+                partial[f"analysis_pass{ev.get('pass', 1)}"] = ev.get("analysis_text") or ""
+                pending.discard(ev.get("pass", 1))
+            elif kind == "result":
+                res = ev
+                break
+            elif kind == "error":
+                raise RuntimeError(ev.get("detail") or "agent-8 stream error")
+            else:
+                continue
+            if ts and time.monotonic() - last_update >= A8_STREAM_UPDATE_S:
+                _show(_format_a8_analysis(cmd, hst, preview, partial, pending=sorted(pending)))
+                last_update = time.monotonic()
+    except Exception as e:
+        failure = str(e)
+        print(f"[slack_bot][a8-stream] {hst} `{cmd}` stream failed ({e})"
+              + ("" if started else "; using blocking analyze"), flush=True)
+
+    if res is None and started:
+        _show(_format_a8_analysis(cmd, hst, preview, partial)
+              + f"\n\n⚠️ Analysis stream interrupted (`{failure}`); text above may be incomplete.")
+        return
+    if res is None:
+        try:
+            res = analyze_command(session_id=session_id, host=hst, command=cmd)
+        except Exception as e:
+            _show(f"⚠️ Analysis failed for `{cmd}`: `{e}`")
+            return
+    _show(_format_a8_analysis(cmd, hst, preview, res))
+
+def _analyze_commands_and_post(say, pchan: str, pthr: str, session_id: str,
+                               hst: str, commands: List[str], md_path: str) -> None:
+    """
+    Analyze all commands concurrently (A8_ANALYZE_CONCURRENCY; Agent-8 caps the LLM
+    calls themselves) while keeping Slack messages in command order:
+    streaming posts one placeholder per command up front, otherwise results are
+    posted in order as they complete.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not commands:
+        return
+    previews = [_a8_preview(md_path, cmd) for cmd in commands]
+    with ThreadPoolExecutor(max_workers=max(1, min(len(commands), A8_ANALYZE_CONCURRENCY)),
+                            thread_name_prefix="a8-analyze") as pool:
+        if A8_STREAM_ANALYSIS:
+            futures = []
+            for cmd, preview in zip(commands, previews):
+                posted = say(channel=pchan, thread_ts=pthr,
+                             text=_format_a8_analysis(cmd, hst, preview, {}, pending=[1, 2]))
+                futures.append((cmd, pool.submit(_stream_a8_into_message, say, pchan, pthr,
+                                                 session_id, hst, cmd, preview, posted)))
+        else:
+            futures = [(cmd, pool.submit(analyze_command, session_id=session_id, host=hst, command=cmd))
+                       for cmd in commands]
+
+        for (cmd, fut), preview in zip(futures, previews):
+            try:
+                res = fut.result()
+                if not A8_STREAM_ANALYSIS:
+                    say(channel=pchan, thread_ts=pthr, text=_format_a8_analysis(cmd, hst, preview, res))
+            except Exception as e:
+                say(channel=pchan, thread_ts=pthr,
+                    text=f"⚠️ Analysis failed for `{cmd}`: `{e}`")
+
 # --- Core watch-and-analyze flow ---
 def _watch_and_analyze(say, pchan: str, pthr: str,
                        session_id: str, hst: str,
@@ -141,60 +282,8 @@ def _watch_and_analyze(say, pchan: str, pthr: str,
                 text=f"⚠️ No show_log found for `{hst}` at:\n`{md_path}`")
             return
 
-        # 4) Ask Agent-8 to analyze each command (Agent-8 reads the file locally)
-        for cmd in commands:
-            try:
-                res = analyze_command(session_id=session_id, host=hst, command=cmd)
-
-                # Raw fenced output (always first)
-                # Use the same snippet extraction as _post_show_snippets but inline
-                import re
-                body = _read_text(md_path)
-                preview = extract_cmd_output(body, cmd)
-                # preview = ""
-                # if body:
-                #     pat = rf"(?mis)^##\s*{re.escape(cmd)}\s*\n+```(.*?)```"
-                #     m = re.search(pat, body)
-                #     if m:
-                #         preview = m.group(1).strip()
-                #     else:
-                #         blocks = re.findall(r"(?s)```(.*?)```", body)
-                #         if blocks:
-                #             preview = blocks[-1].strip()
-                if not preview:
-                    preview = f"(no captured output for `{cmd}` in log)"
-
-                # Analyses
-                analysis1 = res.get("analysis_pass1") or "(no analysis)"
-                analysis2 = res.get("analysis_pass2") or None   # Optional
-
-                direction = res.get("direction") or ""
-                trusted = res.get("trusted_commands") or []
-                unvalidated = res.get("unvalidated_commands") or []
-                promoted = res.get("promoted") or []   # <<< ADDED for trusted/unvalidated commands
-
-                # Build Slack text
-                out = []
-                out.append(f"*📄 Output for `{cmd}` on `{hst}`:*\n```{preview}```")
-                out.append(f"*🟢 Analysis-1 (single-step):*\n{analysis1}") # Pass-1
-                # comment this block to disable Pass-2 entirely
-                if analysis2:   
-                    out.append(f"*🔵 Analysis-2 (with history):*\n{analysis2}") # Pass-2
-                    # # comment above block to disable Pass-2 entirely
-                if direction:
-                    out.append(f"*Direction:* {direction}")
-                if trusted:
-                    out.append(f"*Trusted commands:* " + ", ".join(f"`{c}`" for c in trusted))
-                if unvalidated:
-                    out.append(f"*Unvalidated commands:* " + ", ".join(f"`{c}`" for c in unvalidated))
-                if promoted:   # <<< ADDED for trusted/unvalidated commands
-                    out.append("*Promoted to trusted (just ran ok):* " + ", ".join(f"`{c}`" for c in promoted))
-
-                say(channel=pchan, thread_ts=pthr, text="\n\n".join(out))
-
-            except Exception as e:
-                say(channel=pchan, thread_ts=pthr,
-                    text=f"⚠️ Analysis failed for `{cmd}`: `{e}`")
+        # 4) Ask Agent-8 to analyze the commands (Agent-8 reads the file locally)
+        _analyze_commands_and_post(say, pchan, pthr, session_id, hst, commands, md_path)
 
     except Exception as e:
         say(channel=pchan, thread_ts=pthr, text=f"⚠️ Analysis failed: `{e}`")
@@ -457,7 +546,7 @@ def build_triage_suggestion_blocks(guidance: str, cmds: list, bot_name: str):
     def _make_button_block(cmd_list, title, style="primary"):
         if not cmd_list:
             return None
-        btns = []
+        btns, refresh_btns = [], []
         for c in cmd_list[:6]:
             cmd_txt = c.get("command")
             if not cmd_txt:
@@ -468,9 +557,18 @@ def build_triage_suggestion_blocks(guidance: str, cmds: list, bot_name: str):
                 "value": json.dumps({"command": cmd_txt}),
                 "action_id": f"agent8_quick_run_{abs(hash(cmd_txt)) % 100000}"
             })
+            # Opt-in live run: skips Agent-4's output cache
+            refresh_btns.append({
+                "type": "button",
+                "text": {"type": "plain_text", "text": f"↻ {cmd_txt}"},
+                "value": json.dumps({"command": cmd_txt, "refresh": True}),
+                "action_id": f"agent8_quick_run_refresh_{abs(hash(cmd_txt)) % 100000}"
+            })
         return [
             {"type": "section", "text": {"type": "mrkdwn", "text": f"*{title}*"}},
-            {"type": "actions", "elements": btns}
+            {"type": "actions", "elements": btns},
+            {"type": "context", "elements": [{"type": "mrkdwn", "text": "_↻ refresh: re-run on the device, skipping recently cached output_"}]},
+            {"type": "actions", "elements": refresh_btns}
         ]
 
     trusted_block = _make_button_block(trusted_cmds, "Trusted commands (safe to run):")
@@ -1252,9 +1350,11 @@ def handle_quick_run(ack, body, say, logger):
                 text="⚠️ No active triage session or host. Start triage first.")
             return
 
-        # Dispatch single-command run
+        # Dispatch single-command run; Agent-4 may answer from its output cache
+        # unless the "↻ refresh" variant of the button was clicked
+        refresh = bool(payload.get("refresh", False))
         run_url = f"{AGENT_8_URL}/triage/run_shows"
-        payload = {"session_id": sess, "host": host, "commands": [cmd]}
+        payload = {"session_id": sess, "host": host, "commands": [cmd], "refresh": refresh}
         resp = _post_json(run_url, payload, timeout=90)
         say(channel=channel, thread_ts=thread_ts,
             text=f"▶️ Running `{cmd}` on `{host}` — analyzing shortly…")
@@ -0,0 +1,111 @@
+# shared/cassette.py
+"""
+Record / replay of external interactions (LLM calls, device commands) for
+offline, deterministic perf investigations and regression runs.
+
+- CASSETTE_MODE=record: every interaction is stored as one JSON file
+  <cassette dir>/<kind>/<sha256 of the request>.json (request, response, latency)
+- CASSETTE_MODE=replay: interactions are served from the cassette; nothing is
+  sent to OpenAI or to a router. CASSETTE_LATENCY=original sleeps for the
+  recorded latency, zero (default) returns immediately. A request that is not
+  on the cassette raises CassetteMiss, or goes live with CASSETTE_MISS=live.
+- The cassette dir is per task: entry points wrap their work in
+  use_cassette("<task root>/cassettes"); CASSETTE_DIR is the fallback for code
+  running outside such a scope. No dir → nothing is recorded / replayed.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+_SCOPE: contextvars.ContextVar = contextvars.ContextVar("cassette_dir", default=None)
+_WRITE_LOCK = threading.Lock()
+
+
+class CassetteMiss(RuntimeError):
+    pass
+
+
+def mode() -> str:
+    m = os.getenv("CASSETTE_MODE", "off").strip().lower()
+    return m if m in ("record", "replay") else "off"
+
+
+def current_dir() -> Optional[str]:
+    return _SCOPE.get() or (os.getenv("CASSETTE_DIR", "").strip() or None)
+
+
+@contextmanager
+def use_cassette(path: Optional[str]) -> Iterator[Optional[str]]:
+    """Record/replay everything in this context (thread/async task) under path."""
+    token = _SCOPE.set(path)
+    try:
+        yield path
+    finally:
+        _SCOPE.reset(token)
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    blob = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _path(kind: str, key: str) -> Optional[str]:
+    root = current_dir()
+    return os.path.join(root, kind, f"{key}.json") if root else None
+
+
+def lookup(kind: str, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Recorded entry for request (replay mode only), honouring CASSETTE_LATENCY."""
+    path = _path(kind, request_key(request))
+    if mode() != "replay" or path is None:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            entry = json.load(fh)
+    except FileNotFoundError:
+        if os.getenv("CASSETTE_MISS", "error").strip().lower() == "live":
+            return None
+        raise CassetteMiss(f"no recorded {kind} interaction {os.path.basename(path)} in {current_dir()}")
+    if os.getenv("CASSETTE_LATENCY", "zero").strip().lower() == "original":
+        time.sleep(float(entry.get("latency_s") or 0.0))
+    return entry
+
+
+def store(kind: str, request: Dict[str, Any], response: Any, latency_s: float,
+          **extra: Any) -> None:
+    """Write one interaction (record mode only)."""
+    if mode() != "record":
+        return
+    path = _path(kind, request_key(request))
+    if path is None:
+        return
+    entry = dict(extra, request=request, response=response, latency_s=round(latency_s, 4),
+                 recorded_at=time.time())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with _WRITE_LOCK:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(entry, fh, indent=1, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def through(kind: str, request: Dict[str, Any], live: Callable[[], Any]) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Replay request if recorded, else run live() (and record it in record mode).
+    Returns (response, entry) — entry carries any extra fields stored with it.
+    """
+    if mode() == "off":
+        return live(), {}
+    entry = lookup(kind, request)
+    if entry is not None:
+        return entry.get("response"), entry
+    t0 = time.time()
+    response = live()
+    store(kind, request, response, time.time() - t0)
+    return response, {}
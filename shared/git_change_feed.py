@@ -0,0 +1,154 @@
+# shared/git_change_feed.py
+"""
+Git change feed for Agent-1 (task-folder change detection).
+
+Replaces "GET /commits?per_page=1 every POLL_INTERVAL → full pull → git show <newest sha>",
+which skipped commits pushed between polls and spent an API call per poll:
+
+- head(): cheap remote check first. Either `git ls-remote <remote> refs/heads/<branch>`, or
+  (etag_url set) a conditional GitHub API request with If-None-Match, where a 304 does not
+  count against the rate limit. Nothing is fetched while the head equals the last processed SHA.
+- poll(): when the head moved, one `git fetch` of the branch, the working tree moved to the
+  fetched head, and ONE `git diff --name-only <last_sha> <new_sha>` over the whole range.
+- The last processed SHA only advances on ack(batch), after the caller handled the batch,
+  so a failed run is retried on the next poll instead of being lost.
+
+Plain `git` via subprocess; works against any remote, including a local bare repo (offline).
+"""
+
+import os
+import subprocess
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+GIT_TIMEOUT_S = int(os.getenv("GIT_CHANGE_FEED_TIMEOUT_S", "120"))
+
+
+@dataclass
+class ChangeBatch:
+    old_sha: Optional[str]              # None on the first run (nothing to diff against)
+    new_sha: str
+    files: List[str] = field(default_factory=list)
+    full_range: bool = True             # False: old_sha unknown to the clone, files are new_sha's only
+
+
+class GitChangeFeed:
+    def __init__(self, clone_dir: str, remote_url: str, branch: str = "main",
+                 state_file: str = ".last_sha", etag_url: Optional[str] = None,
+                 etag_headers: Optional[Dict[str, str]] = None, secret: str = "",
+                 log: Optional[Callable[[str], None]] = None) -> None:
+        self.clone_dir = clone_dir
+        self.remote_url = remote_url
+        self.branch = branch
+        self.state_file = state_file
+        self.etag_url = etag_url
+        self.etag_headers = dict(etag_headers or {})
+        self.secret = secret                # masked in error messages (token in the remote URL)
+        self.log = log or (lambda msg: None)
+        self._etag: Optional[str] = None
+        self._etag_sha: Optional[str] = None
+        self.stats = {"polls": 0, "unchanged": 0, "not_modified": 0, "fetches": 0, "batches": 0}
+
+    # ---- git ----
+    def _mask(self, text: str) -> str:
+        return text.replace(self.secret, "****") if self.secret else text
+
+    def _git(self, *args: str, in_clone: bool = True) -> str:
+        r = subprocess.run(["git", *args], cwd=self.clone_dir if in_clone else None,
+                           capture_output=True, text=True, timeout=GIT_TIMEOUT_S)
+        if r.returncode != 0:
+            raise RuntimeError(f"git {args[0]} failed: {self._mask(r.stderr.strip())}")
+        return r.stdout
+
+    def _has_commit(self, sha: str) -> bool:
+        try:
+            self._git("cat-file", "-e", f"{sha}^{{commit}}")
+            return True
+        except RuntimeError:
+            return False
+
+    # ---- state ----
+    def last_sha(self) -> Optional[str]:
+        try:
+            with open(self.state_file) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def ack(self, batch: ChangeBatch) -> None:
+        """Mark batch.new_sha as processed."""
+        tmp = f"{self.state_file}.tmp"
+        with open(tmp, "w") as f:
+            f.write(batch.new_sha)
+        os.replace(tmp, self.state_file)
+        self.log(f"last SHA updated to: {batch.new_sha}")
+
+    # ---- remote head ----
+    def head(self) -> Optional[str]:
+        """Current SHA of the branch on the remote, without fetching objects."""
+        if self.etag_url:
+            return self._etag_head()
+        out = self._git("ls-remote", self.remote_url, f"refs/heads/{self.branch}", in_clone=False)
+        return out.split()[0] if out.strip() else None
+
+    def _etag_head(self) -> Optional[str]:
+        headers = dict(self.etag_headers, Accept="application/vnd.github.sha")
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        req = urllib.request.Request(self.etag_url, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=30) as r:
+                self._etag = r.headers.get("ETag")
+                self._etag_sha = r.read().decode().strip() or None
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise
+            self.stats["not_modified"] += 1
+        return self._etag_sha
+
+    # ---- sync + diff ----
+    def _sync(self) -> str:
+        """Fetch the branch into the clone and check out its head; returns that SHA."""
+        if not os.path.isdir(os.path.join(self.clone_dir, ".git")):
+            self.log(f"cloning repo into {self.clone_dir}")
+            self._git("clone", "--quiet", "--branch", self.branch, self.remote_url, self.clone_dir,
+                      in_clone=False)
+        else:
+            self._git("remote", "set-url", "origin", self.remote_url)
+            self._git("fetch", "--quiet", "origin",
+                      f"+refs/heads/{self.branch}:refs/remotes/origin/{self.branch}")
+        self.stats["fetches"] += 1
+        sha = self._git("rev-parse", f"refs/remotes/origin/{self.branch}").strip()
+        # The clone is Agent-1's private mirror: follow the remote even after a force push
+        self._git("checkout", "--quiet", "--force", "-B", self.branch, sha)
+        return sha
+
+    def poll(self) -> Optional[ChangeBatch]:
+        """
+        None if nothing changed since the last ack(); else the batch of files changed over
+        last_sha..new_sha (first run: empty batch, so the caller can just ack it).
+        """
+        self.stats["polls"] += 1
+        last = self.last_sha()
+        head = self.head()
+        if not head:
+            raise RuntimeError(f"branch {self.branch!r} not found on remote")
+        if head == last:
+            self.stats["unchanged"] += 1
+            return None
+
+        new = self._sync()
+        if new == last:
+            self.stats["unchanged"] += 1
+            return None
+        self.stats["batches"] += 1
+        if last is None:
+            return ChangeBatch(None, new)
+        if self._has_commit(last):
+            files = self._git("diff", "--name-only", last, new).splitlines()
+            return ChangeBatch(last, new, [f for f in files if f])
+        self.log(f"last SHA {last} not in clone (history rewritten?); using {new} only")
+        files = self._git("show", "--name-only", "--pretty=", new).splitlines()
+        return ChangeBatch(last, new, [f for f in files if f], full_range=False)
@@ -1,5 +1,75 @@
 # shared/helpers.py
+import os
 import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Set SHOW_LOG_DEBUG=1 to trace header/section lookups
+_DEBUG = os.getenv("SHOW_LOG_DEBUG", "0") == "1"
+
+# Show-log files whose section index is kept in memory
+_INDEX_CACHE_MAX = int(os.getenv("SHOW_LOG_INDEX_CACHE", "64"))
+
+_HEADER_RE = re.compile(r"(?m)^##\s*(.+?)\s*$")
+_FENCE = "```"
+
+
+def _dbg(msg: str) -> None:
+    if _DEBUG:
+        print(f"[DEBUG extract_cmd_output] {msg}", flush=True)
+
+
+def normalize_cmd(command: str) -> str:
+    """Key used for section lookups: surrounding/repeated whitespace collapsed."""
+    return " ".join((command or "").split())
+
+
+def index_sections(body: str) -> Dict[str, Tuple[int, int]]:
+    """
+    One linear pass over a markdown show log:
+      normalized command → (offset, length) of the stripped text inside the first
+      ``` block of its '## <command>' section (section ends at the next header).
+    The first header wins when a command appears more than once; sections without
+    a fenced block map to (offset, 0).
+    """
+    index: Dict[str, Tuple[int, int]] = {}
+    if not body:
+        return index
+    headers = list(_HEADER_RE.finditer(body))
+    for i, m in enumerate(headers):
+        key = normalize_cmd(m.group(1))
+        if key in index:
+            continue
+        start = m.end()
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(body)
+        open_at = body.find(_FENCE, start, end)
+        close_at = body.find(_FENCE, open_at + len(_FENCE), end) if open_at >= 0 else -1
+        if close_at < 0:
+            index[key] = (start, 0)
+            continue
+        a, b = open_at + len(_FENCE), close_at
+        while a < b and body[a].isspace():
+            a += 1
+        while b > a and body[b - 1].isspace():
+            b -= 1
+        index[key] = (a, b - a)
+    _dbg(f"indexed {len(headers)} headers → {len(index)} sections")
+    return index
+
+
+def _lookup(body: str, index: Dict[str, Tuple[int, int]], command: str) -> str:
+    hit = index.get(normalize_cmd(command))
+    if hit is None:
+        _dbg(f"No exact header match for {command!r}")
+        return ""
+    off, length = hit
+    if not length:
+        _dbg(f"Matched header {command!r}, but no fenced block found")
+        return ""
+    _dbg(f"Matched header {command!r}, block length={length}")
+    return body[off:off + length]
+
 
 def extract_cmd_output(body: str, command: str) -> str:
     """
@@ -8,43 +78,62 @@ def extract_cmd_output(body: str, command: str) -> str:
       - Find '## <command>' header
       - Take text until the next header
       - Grab the first ``` block in that section
+    For files on disk prefer read_cmd_output(), which indexes each file once.
     """
     if not body:
-        print(f"[DEBUG extract_cmd_output] Empty body for command={command}")
+        _dbg(f"Empty body for command={command}")
         return ""
+    return _lookup(body, index_sections(body), command)
 
-    print(f"[DEBUG extract_cmd_output] Looking for command: {command!r}")
 
-    # Find all headers like "## show ip bgp ..."
-    headers = list(re.finditer(r"(?m)^##\s*(.+?)\s*$", body))
-    print(f"[DEBUG extract_cmd_output] Found {len(headers)} headers in file")
+# ---------------------------
+# Cached per-file section index
+# ---------------------------
+class _ShowLogCache:
+    """path → (mtime_ns, size, text, index); LRU-bounded, thread-safe."""
 
-    for i, m in enumerate(headers):
-        line_no = body.count("\n", 0, m.start()) + 1
-        print(f"  Header[{i}] at line {line_no}: {m.group(1)!r}")
+    def __init__(self, max_files: int):
+        self.max_files = max(1, max_files)
+        self._items: "OrderedDict[str, Tuple[int, int, str, Dict[str, Tuple[int, int]]]]" = OrderedDict()
+        self._lock = threading.Lock()
 
-    # Find the header that exactly matches
-    match_idx = None
-    for i, m in enumerate(headers):
-        if m.group(1).strip() == command.strip():
-            match_idx = i
-            break
+    def get(self, path: str) -> Optional[Tuple[str, Dict[str, Tuple[int, int]]]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = os.path.abspath(path)
+        with self._lock:
+            hit = self._items.get(key)
+            if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+                self._items.move_to_end(key)
+                return hit[2], hit[3]
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                text = fh.read()
+        except Exception:
+            return None
+        index = index_sections(text)
+        with self._lock:
+            self._items[key] = (st.st_mtime_ns, st.st_size, text, index)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_files:
+                self._items.popitem(last=False)
+        return text, index
+
+
+_SHOW_LOGS = _ShowLogCache(_INDEX_CACHE_MAX)
 
-    if match_idx is None:
-        print(f"[DEBUG extract_cmd_output] No exact header match for {command!r}")
-        return ""
 
-    # Slice section from this header to next header or EOF
-    start = headers[match_idx].end()
-    end = headers[match_idx + 1].start() if match_idx + 1 < len(headers) else len(body)
-    section = body[start:end]
-
-    # Look for fenced block inside that section
-    m_block = re.search(r"(?s)```(.*?)```", section)
-    if m_block:
-        snippet = m_block.group(1).strip()
-        print(f"[DEBUG extract_cmd_output] Matched header {headers[match_idx].group(1)!r}, block length={len(snippet)}")
-        return snippet
-    else:
-        print(f"[DEBUG extract_cmd_output] Matched header {headers[match_idx].group(1)!r}, but no fenced block found")
-        return ""
\ No newline at end of file
+def read_cmd_output(md_path: str, command: str) -> str:
+    """
+    extract_cmd_output() for a show-log file: the file is read and indexed once
+    per (path, mtime, size); each lookup afterwards is a dict hit plus a slice.
+    Returns "" if the file is missing or has no section for the command.
+    """
+    got = _SHOW_LOGS.get(md_path)
+    if got is None:
+        _dbg(f"Cannot read {md_path}")
+        return ""
+    text, index = got
+    return _lookup(text, index, command)
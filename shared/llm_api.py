@@ -6,34 +6,390 @@ LLM API Wrapper:
 - Includes retry logic with exponential backoff for rate limits
 - Accepts messages and optional model/temperature arguments
 - Returns structured content from first choice
+- Prompt-prefix caching: cacheable_messages() puts the stable part of a prompt
+  (system prompt + fixed rules/schema) first so it is byte-identical across calls
+  and the provider can serve it from its prompt cache
+- Token accounting: every call records prompt / cached prompt / completion tokens,
+  process-wide (usage_snapshot) and per run (with usage_run(...) as meter)
+- Streaming: stream_llm() yields content deltas as the model produces them
+- Concurrency: at most LLM_MAX_CONCURRENCY calls in flight per process (llm_slot),
+  admitted by priority class (interactive > batch > background, llm_priority) and
+  per-model token buckets (LLM_RATE_LIMITS); see shared/llm_scheduler.py
+- Routing: call_llm(..., task="extract"|"classify"|"summarize"|"reason") picks the
+  model / max tokens / timeout per task class and, with validate=, retries a
+  schema-failing answer on a larger model; see shared/llm_routing.py
+- LLM_BACKEND=local routes calls to the offline stand-in in shared/llm_local.py
+- CASSETTE_MODE=record|replay stores / serves calls via shared/cassette.py
 """
 
 import os
 import time
-import openai
-from openai.error import RateLimitError
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
 
-# load API key once
-openai.api_key = os.getenv("OPENAI_API_KEY", "").strip()
+try:
+    import openai
+    from openai.error import RateLimitError
+    # load API key once
+    openai.api_key = os.getenv("OPENAI_API_KEY", "").strip()
+except ImportError:  # local backend only
+    openai = None
 
+    class RateLimitError(Exception):
+        pass
 
-def call_llm(messages, model=None, temperature=0.0, max_retries=3):
+try:
+    from shared import cassette
+    from shared.llm_routing import route, json_object, parse_json_object, STATS as _ROUTING_STATS  # noqa: F401
+    from shared.llm_scheduler import (LLMScheduler, Ticket, llm_priority, current_priority,  # noqa: F401
+                                      INTERACTIVE, BATCH, BACKGROUND)
+except ImportError:
+    import cassette
+    from llm_routing import route, json_object, parse_json_object, STATS as _ROUTING_STATS  # noqa: F401
+    from llm_scheduler import (LLMScheduler, Ticket, llm_priority, current_priority,  # noqa: F401
+                               INTERACTIVE, BATCH, BACKGROUND)
+
+
+def _backend() -> str:
+    return os.getenv("LLM_BACKEND", "openai").strip().lower()
+
+
+# ---------------------------
+# Prompt layout for prefix caching
+# ---------------------------
+def cacheable_messages(system_prompt: str, variable: str, stable_prefix: str = "") -> List[Dict[str, str]]:
+    """
+    Build chat messages ordered stable → variable:
+      [system: system_prompt] [user: stable_prefix (optional)] [user: variable]
+    system_prompt must be a module constant and stable_prefix identical for every call
+    of a run (no host names, timestamps or other per-call values), so all calls share
+    the same leading bytes.
+    """
+    msgs = [{"role": "system", "content": system_prompt}]
+    if stable_prefix:
+        msgs.append({"role": "user", "content": stable_prefix})
+    msgs.append({"role": "user", "content": variable})
+    return msgs
+
+
+# ---------------------------
+# Token accounting
+# ---------------------------
+_USAGE_KEYS = ("calls", "prompt_tokens", "cached_prompt_tokens", "completion_tokens")
+_TOTALS = {k: 0 for k in _USAGE_KEYS}
+_TOTALS_LOCK = threading.Lock()
+_RUN_METER: contextvars.ContextVar = contextvars.ContextVar("llm_usage_run", default=None)
+
+
+class UsageMeter:
+    """Token counters for one logical run (an /analyze, a triage step, ...)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.counts = {k: 0 for k in _USAGE_KEYS}
+        self.queue_wait_s = 0.0   # time this run's calls spent waiting for admission
+
+    def add(self, usage: Dict[str, int]) -> None:
+        with self._lock:
+            for k in _USAGE_KEYS:
+                self.counts[k] += int(usage.get(k, 0) or 0)
+
+    def add_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.queue_wait_s += seconds
+
+    def as_dict(self) -> Dict[str, object]:
+        with self._lock:
+            out: Dict[str, object] = dict(self.counts)
+            out["queue_wait_s"] = round(self.queue_wait_s, 3)
+        pt = out["prompt_tokens"] or 0
+        out["cache_hit_ratio"] = round(out["cached_prompt_tokens"] / pt, 3) if pt else 0.0
+        out["run"] = self.name
+        out["elapsed_s"] = round(time.time() - self.started, 3)
+        return out
+
+
+def _record_usage(usage: Dict[str, int]) -> None:
+    usage = dict(usage, calls=1)
+    with _TOTALS_LOCK:
+        for k in _USAGE_KEYS:
+            _TOTALS[k] += int(usage.get(k, 0) or 0)
+    meter = _RUN_METER.get()
+    if meter is not None:
+        meter.add(usage)
+
+
+def _usage_from_openai(resp) -> Dict[str, int]:
+    try:
+        u = resp.get("usage") or {}
+        details = u.get("prompt_tokens_details") or {}
+        return {
+            "prompt_tokens": int(u.get("prompt_tokens", 0) or 0),
+            "completion_tokens": int(u.get("completion_tokens", 0) or 0),
+            "cached_prompt_tokens": int(details.get("cached_tokens", 0) or 0),
+        }
+    except Exception:
+        return {}
+
+
+def usage_snapshot() -> Dict[str, int]:
+    """Process-wide totals since start."""
+    with _TOTALS_LOCK:
+        return dict(_TOTALS)
+
+
+def current_usage_meter() -> Optional[UsageMeter]:
+    return _RUN_METER.get()
+
+
+@contextmanager
+def usage_run(name: str) -> Iterator[UsageMeter]:
+    """
+    Account all LLM calls made in this context (thread/async task) to one run:
+        with usage_run("agent7:/analyze task-18") as meter:
+            ...
+        meter.as_dict()  # calls, prompt_tokens, cached_prompt_tokens, cache_hit_ratio, ...
+    Worker threads inherit the meter when started via contextvars.copy_context().run.
+    """
+    meter = UsageMeter(name)
+    token = _RUN_METER.set(meter)
+    try:
+        yield meter
+    finally:
+        _RUN_METER.reset(token)
+        print(f"[llm_api][usage] {meter.as_dict()}", flush=True)
+
+
+# ---------------------------
+# Shared concurrency limit
+# ---------------------------
+LLM_MAX_CONCURRENCY = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "8") or "8"))
+_SCHEDULER = LLMScheduler(LLM_MAX_CONCURRENCY)
+
+
+@contextmanager
+def llm_slot(model: Optional[str] = None, est_tokens: int = 0) -> Iterator[Ticket]:
+    """
+    Hold one of the process-wide LLM_MAX_CONCURRENCY slots, admitted in priority order
+    (llm_priority of the caller's context) and within the model's rate limit.
+    call_llm/stream_llm take a slot themselves, so callers can fan out freely (threads)
+    without overrunning the provider's rate limits. ticket.settle(usage) corrects the
+    token estimate.
+    """
+    ticket = _SCHEDULER.acquire(model or os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip(), est_tokens)
+    meter = _RUN_METER.get()
+    if meter is not None:
+        meter.add_wait(ticket.waited_s)
+    try:
+        yield ticket
+    finally:
+        _SCHEDULER.release(ticket)
+
+
+def scheduler_stats() -> Dict[str, object]:
+    """Queue wait per priority class, in-flight calls and bucket levels (this process)."""
+    return _SCHEDULER.stats()
+
+
+def routing_stats() -> Dict[str, object]:
+    """Calls, schema failures / fallbacks, latency, tokens and cost per task class."""
+    return _ROUTING_STATS.snapshot()
+
+
+def _estimate_tokens(messages) -> int:
+    return sum(len(m.get("content") or "") for m in messages or []) // 4
+
+
+# ---------------------------
+# Calls
+# ---------------------------
+def _local_llm():
+    try:
+        from shared.llm_local import get_local_llm
+    except ImportError:
+        from llm_local import get_local_llm
+    return get_local_llm()
+
+
+def call_llm(messages, model=None, temperature=0.0, max_retries=3, task=None, validate=None,
+             max_tokens=None):
     """
     Wrapper for ChatCompletion.create with exponential backoff on rate limits.
     messages: list of dict(role, content)
-    model: override model name (else env-var OPENAI_MODEL)
+    model: override model name (else the task class's model, else env-var OPENAI_MODEL)
     GPT-4o Mini vs "gpt-3.5-turbo"
+    task: task class for routing (extract / classify / summarize / reason)
+    validate: schema check on the answer (e.g. json_object("status")); a failing
+              answer is retried once on the task class's fallback model
+    max_tokens: override the task class's completion cap (e.g. batched answers)
     """
+    r = route(task)
+    if max_tokens:
+        r["max_tokens"] = max_tokens
     if model is None:
-        model = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
+        model = r["model"]
+    text = _complete(messages, model, temperature, max_retries, r)
+    if validate is not None and not _valid(validate, text):
+        fallback = r["fallback_model"]
+        retry = bool(fallback) and fallback != model
+        _ROUTING_STATS.schema_failure(r["task"], retry)
+        if retry:
+            print(f"[llm_api][route] {r['task']}: {model} answer failed schema check; retrying on {fallback}",
+                  flush=True)
+            text = _complete(messages, fallback, temperature, max_retries, r)
+    return text
+
+
+def _valid(validate, text) -> bool:
+    try:
+        return bool(validate(text))
+    except Exception:
+        return False
+
+
+def _limits(r) -> Dict[str, object]:
+    """OpenAI kwargs for the route's completion cap / timeout."""
+    out: Dict[str, object] = {}
+    if r.get("max_tokens"):
+        out["max_tokens"] = r["max_tokens"]
+    if r.get("timeout_s"):
+        out["request_timeout"] = r["timeout_s"]
+    return out
+
+
+def _cassette_request(model, temperature, messages, r) -> Dict[str, object]:
+    request = {"model": model, "temperature": temperature, "messages": messages}
+    if r.get("max_tokens"):
+        request["max_tokens"] = r["max_tokens"]
+    return request
+
+
+def _complete(messages, model, temperature, max_retries, r):
+    request = None
+    if cassette.mode() != "off":
+        request = _cassette_request(model, temperature, messages, r)
+        entry = cassette.lookup("llm", request)
+        if entry is not None:
+            _record_usage(entry.get("usage") or {})
+            return entry.get("response")
+    usage: Dict[str, int] = {}
+    with llm_slot(model, _estimate_tokens(messages)) as ticket:
+        t0 = time.time()
+        text = _call_llm(messages, model, temperature, max_retries, usage_out=usage, **_limits(r))
+        latency = time.time() - t0
+        ticket.settle(usage)
+    _ROUTING_STATS.record(r["task"], model, latency, usage)
+    if request is not None:
+        cassette.store("llm", request, text, latency, usage=usage)
+    return text
+
+
+def _call_llm(messages, model, temperature, max_retries, usage_out=None, **limits):
+    if _backend() == "local":
+        text, usage = _local_llm().complete(messages, model=model, temperature=temperature)
+        _record_usage(usage)
+        if usage_out is not None:
+            usage_out.update(usage)
+        return text
+
+    if openai is None:
+        raise RuntimeError("openai package not installed (set LLM_BACKEND=local for offline use)")
     for attempt in range(max_retries):
         try:
             resp = openai.ChatCompletion.create(
                 model=model,
                 messages=messages,
-                temperature=temperature
+                temperature=temperature,
+                **limits
             )
+            usage = _usage_from_openai(resp)
+            _record_usage(usage)
+            if usage_out is not None:
+                usage_out.update(usage)
             return resp.choices[0].message.content
         except RateLimitError:
             time.sleep(2 ** attempt)
     raise RuntimeError("LLM rate-limit or network failures after retries")
+
+
+def stream_llm(messages, model=None, temperature=0.0, max_retries=3, task=None) -> Iterator[str]:
+    """
+    Streaming variant of call_llm: yields content deltas (str) as they arrive.
+    Retries on rate limits only before the first delta; the joined deltas equal
+    what call_llm would have returned. Usage is recorded once the stream ends.
+    The concurrency slot is held until the stream is exhausted or closed.
+    task routes the model like call_llm (no schema fallback once text is out).
+    """
+    r = route(task)
+    if model is None:
+        model = r["model"]
+
+    # Recorded as a plain completion, so call_llm and stream_llm share cassette entries
+    request = None
+    if cassette.mode() != "off":
+        request = _cassette_request(model, temperature, messages, r)
+        entry = cassette.lookup("llm", request)
+        if entry is not None:
+            text = entry.get("response") or ""
+            for i in range(0, len(text), 16):
+                yield text[i:i + 16]
+            _record_usage(entry.get("usage") or {})
+            return
+    usage: Dict[str, int] = {}
+    parts: List[str] = []
+    with llm_slot(model, _estimate_tokens(messages)) as ticket:
+        t0 = time.time()
+        for delta in _stream_llm(messages, model, temperature, max_retries, usage_out=usage, **_limits(r)):
+            if request is not None:
+                parts.append(delta)
+            yield delta
+        latency = time.time() - t0
+        ticket.settle(usage)
+    _ROUTING_STATS.record(r["task"], model, latency, usage)
+    if request is not None:
+        cassette.store("llm", request, "".join(parts), latency, usage=usage)
+
+
+def _stream_llm(messages, model, temperature, max_retries, usage_out=None, **limits) -> Iterator[str]:
+    if _backend() == "local":
+        usage: Dict[str, int] = {}
+        for delta in _local_llm().stream(messages, model=model, temperature=temperature, usage_out=usage):
+            yield delta
+        _record_usage(usage)
+        if usage_out is not None:
+            usage_out.update(usage)
+        return
+
+    if openai is None:
+        raise RuntimeError("openai package not installed (set LLM_BACKEND=local for offline use)")
+    for attempt in range(max_retries):
+        try:
+            resp = openai.ChatCompletion.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+                **limits
+            )
+            break
+        except RateLimitError:
+            time.sleep(2 ** attempt)
+    else:
+        raise RuntimeError("LLM rate-limit or network failures after retries")
+
+    usage = {}
+    for chunk in resp:
+        if chunk.get("usage"):
+            usage = _usage_from_openai(chunk)
+        for choice in chunk.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                yield delta
+    _record_usage(usage)
+    if usage_out is not None:
+        usage_out.update(usage)
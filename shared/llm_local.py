@@ -0,0 +1,184 @@
+"""
+Local LLM stand-in (LLM_BACKEND=local):
+- Deterministic, offline replacement for OpenAI ChatCompletion used in dev/benchmarks
+- Simulates provider-side prompt-prefix caching: the prompt is hashed in fixed-size
+  token blocks; blocks already seen are "served from cache" and reported as
+  cached_tokens, exactly like the provider's usage.prompt_tokens_details
+- Simulated latency = base latency + prefill cost of the uncached part only
+- Reply text comes from a pluggable responder (default: "{}"); stream() hands it
+  out in small deltas paced by the decode cost
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# ~4 chars per token is close enough for accounting purposes
+CHARS_PER_TOKEN = 4
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def serialize_messages(messages: List[Dict[str, str]]) -> str:
+    """
+    Flatten chat messages the way a provider sees them: role header + content, in order.
+    Two requests share a cacheable prefix only if this string shares a prefix.
+    """
+    parts = []
+    for m in messages or []:
+        parts.append(f"<|{m.get('role', 'user')}|>\n{m.get('content', '')}\n")
+    return "".join(parts)
+
+
+def _default_responder(messages: List[Dict[str, str]], model: str) -> str:
+    return "{}"
+
+
+class LocalLLM:
+    """
+    block_tokens:      cache granularity (provider caches in 128-token increments)
+    min_cached_tokens: prefixes shorter than this are never cached (provider minimum is 1024)
+    max_blocks:        LRU capacity, in blocks
+    """
+
+    def __init__(self,
+                 latency_s: float = 0.0,
+                 prefill_ms_per_1k: float = 0.0,
+                 decode_ms_per_1k: float = 0.0,
+                 block_tokens: int = 128,
+                 min_cached_tokens: int = 1024,
+                 max_blocks: int = 65536,
+                 responder: Optional[Callable[[List[Dict[str, str]], str], str]] = None):
+        self.latency_s = latency_s
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.decode_ms_per_1k = decode_ms_per_1k
+        self.block_tokens = max(1, block_tokens)
+        self.min_cached_tokens = max(0, min_cached_tokens)
+        self.max_blocks = max(1, max_blocks)
+        self.responder = responder or _default_responder
+        self._blocks: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---- prefix cache ----
+    def _block_hashes(self, text: str) -> List[str]:
+        """Chained hashes of every *complete* block; hash i covers text[0 : (i+1)*block]."""
+        step = self.block_tokens * CHARS_PER_TOKEN
+        h = hashlib.sha1()
+        out = []
+        for end in range(step, len(text) + 1, step):
+            h.update(text[end - step:end].encode("utf-8", errors="ignore"))
+            out.append(h.copy().hexdigest())
+        return out
+
+    def _lookup_and_insert(self, text: str) -> int:
+        hashes = self._block_hashes(text)
+        hit_blocks = 0
+        with self._lock:
+            for hx in hashes:
+                if hx in self._blocks:
+                    self._blocks.move_to_end(hx)
+                    hit_blocks += 1
+                else:
+                    break
+            for hx in hashes[hit_blocks:]:
+                self._blocks[hx] = None
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        cached = hit_blocks * self.block_tokens
+        return cached if cached >= self.min_cached_tokens else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+
+    # ---- completion ----
+    def _prefill(self, messages: List[Dict[str, str]], model: str) -> Tuple[str, Dict[str, int], float]:
+        """Returns (reply text, usage, prefill delay in seconds)."""
+        prompt = serialize_messages(messages)
+        prompt_tokens = estimate_tokens(prompt)
+        cached = min(self._lookup_and_insert(prompt), prompt_tokens)
+
+        text = self.responder(messages, model)
+        if not isinstance(text, str):
+            text = str(text)
+
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(text),
+            "cached_prompt_tokens": cached,
+        }
+        delay = self.latency_s + (prompt_tokens - cached) / 1000.0 * self.prefill_ms_per_1k / 1000.0
+        return text, usage, delay
+
+    def _decode_delay(self, text: str) -> float:
+        return estimate_tokens(text) / 1000.0 * self.decode_ms_per_1k / 1000.0
+
+    def complete(self, messages: List[Dict[str, str]], model: str = "local",
+                 temperature: float = 0.0) -> Tuple[str, Dict[str, int]]:
+        text, usage, delay = self._prefill(messages, model)
+        delay += self._decode_delay(text)
+        if delay > 0:
+            time.sleep(delay)
+        return text, usage
+
+    def stream(self, messages: List[Dict[str, str]], model: str = "local",
+               temperature: float = 0.0, chunk_chars: int = 16,
+               usage_out: Optional[Dict[str, int]] = None) -> Iterator[str]:
+        """Yield the reply in chunk_chars pieces; usage is copied into usage_out up front."""
+        text, usage, delay = self._prefill(messages, model)
+        if usage_out is not None:
+            usage_out.update(usage)
+        if delay > 0:
+            time.sleep(delay)
+        step = max(1, chunk_chars)
+        for i in range(0, len(text), step):
+            piece = text[i:i + step]
+            d = self._decode_delay(piece)
+            if d > 0:
+                time.sleep(d)
+            yield piece
+
+
+_DEFAULT: Optional[LocalLLM] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_local_llm() -> LocalLLM:
+    """Process-wide stand-in configured from LLM_LOCAL_* env vars."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = LocalLLM(
+                latency_s=_env_float("LLM_LOCAL_LATENCY_S", 0.0),
+                prefill_ms_per_1k=_env_float("LLM_LOCAL_PREFILL_MS_PER_1K", 0.0),
+                decode_ms_per_1k=_env_float("LLM_LOCAL_DECODE_MS_PER_1K", 0.0),
+                block_tokens=_env_int("LLM_LOCAL_CACHE_BLOCK_TOKENS", 128),
+                min_cached_tokens=_env_int("LLM_LOCAL_CACHE_MIN_TOKENS", 1024),
+            )
+        return _DEFAULT
+
+
+def set_local_llm(llm: Optional[LocalLLM]) -> None:
+    """Install a custom stand-in (e.g. with a scripted responder); None resets to env defaults."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        _DEFAULT = llm
@@ -0,0 +1,172 @@
+# shared/llm_routing.py
+"""
+Task-class model routing for call_llm(..., task=...).
+
+Call sites declare what kind of work a call is, and config picks the model:
+- extract    mechanical CLI → JSON extraction (facts_builder, signal_harvester,
+             adk_client command suggestions)
+- classify   short yes/no style judgments (adk_client canonical-command judge)
+- summarize  Slack / human summaries (slack_summarizer)
+- reason     multi-device diagnosis (per_device_llm, cross_device_llm)
+
+Per class (CLASS upper-cased), all optional:
+  LLM_MODEL_<CLASS>           model (default OPENAI_MODEL)
+  LLM_MAX_TOKENS_<CLASS>      completion cap (default: classify 300, others none)
+  LLM_TIMEOUT_<CLASS>_S       request timeout (default none)
+  LLM_FALLBACK_MODEL_<CLASS>  larger model for a retry when the answer fails the
+                              caller's schema check (default LLM_FALLBACK_MODEL)
+e.g. LLM_MODEL_EXTRACT=gpt-4o-mini LLM_MODEL_CLASSIFY=gpt-4o-mini
+     LLM_MODEL_REASON=gpt-4o LLM_FALLBACK_MODEL=gpt-4o
+
+stats() reports per class: calls, schema failures, fallbacks, latency (mean / p95),
+tokens and estimated cost (LLM_PRICES="model=in/out,..." USD per 1M tokens; cached
+prompt tokens at half the input price).
+"""
+
+import os
+import json
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+TASK_CLASSES = ("extract", "classify", "summarize", "reason")
+_DEFAULT_MAX_TOKENS = {"classify": 300}
+
+# USD per 1M tokens (input, output)
+_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+def _env(name: str) -> Optional[str]:
+    v = os.getenv(name, "").strip()
+    return v or None
+
+
+def _env_num(name: str, cast: Callable[[str], Any]) -> Optional[Any]:
+    v = _env(name)
+    try:
+        return cast(v) if v is not None else None
+    except ValueError:
+        return None
+
+
+def route(task: Optional[str]) -> Dict[str, Any]:
+    """{"task", "model", "max_tokens", "timeout_s", "fallback_model"} for a task class."""
+    default_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
+    if task not in TASK_CLASSES:
+        return {"task": task or "default", "model": default_model, "max_tokens": None,
+                "timeout_s": None, "fallback_model": None}
+    up = task.upper()
+    max_tokens = _env_num(f"LLM_MAX_TOKENS_{up}", int)
+    return {
+        "task": task,
+        "model": _env(f"LLM_MODEL_{up}") or default_model,
+        "max_tokens": max_tokens if max_tokens is not None else _DEFAULT_MAX_TOKENS.get(task),
+        "timeout_s": _env_num(f"LLM_TIMEOUT_{up}_S", float),
+        "fallback_model": _env(f"LLM_FALLBACK_MODEL_{up}") or _env("LLM_FALLBACK_MODEL"),
+    }
+
+
+# ---------------------------
+# Schema checks
+# ---------------------------
+def parse_json_object(raw: Any) -> Optional[Dict[str, Any]]:
+    """Dict from a JSON answer (``` fences allowed), else None."""
+    if isinstance(raw, dict):
+        return raw
+    t = (raw or "").strip() if isinstance(raw, str) else ""
+    if t.startswith("```"):
+        lines = t.splitlines()[1:]
+        if lines and lines[-1].strip().startswith("```"):
+            lines = lines[:-1]
+        t = "\n".join(lines).strip()
+    try:
+        obj = json.loads(t)
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def json_object(*required: str) -> Callable[[Any], bool]:
+    """Schema check for call_llm(validate=...): a JSON object with these keys."""
+    def _check(raw: Any) -> bool:
+        obj = parse_json_object(raw)
+        return obj is not None and all(k in obj for k in required)
+    return _check
+
+
+# ---------------------------
+# Per-class stats
+# ---------------------------
+def _prices() -> Dict[str, tuple]:
+    prices = dict(_PRICES)
+    for item in (os.getenv("LLM_PRICES", "") or "").split(","):
+        model, _, rate = item.strip().partition("=")
+        pin, _, pout = rate.partition("/")
+        try:
+            prices[model.strip()] = (float(pin), float(pout or 0))
+        except ValueError:
+            continue
+    return prices
+
+
+def cost_usd(model: str, usage: Dict[str, int]) -> float:
+    pin, pout = _prices().get(model, (0.0, 0.0))
+    prompt = int(usage.get("prompt_tokens", 0) or 0)
+    cached = min(prompt, int(usage.get("cached_prompt_tokens", 0) or 0))
+    completion = int(usage.get("completion_tokens", 0) or 0)
+    return ((prompt - cached) * pin + cached * pin * 0.5 + completion * pout) / 1e6
+
+
+class RoutingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_task: Dict[str, Dict[str, Any]] = {}
+
+    def _row(self, task: str) -> Dict[str, Any]:
+        row = self._by_task.get(task)
+        if row is None:
+            row = self._by_task[task] = {
+                "calls": 0, "schema_failures": 0, "fallbacks": 0, "latency_s": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+                "models": {}, "_lat": deque(maxlen=512),
+            }
+        return row
+
+    def record(self, task: str, model: str, latency_s: float, usage: Dict[str, int]) -> None:
+        with self._lock:
+            row = self._row(task)
+            row["calls"] += 1
+            row["latency_s"] += latency_s
+            row["_lat"].append(latency_s)
+            row["prompt_tokens"] += int(usage.get("prompt_tokens", 0) or 0)
+            row["completion_tokens"] += int(usage.get("completion_tokens", 0) or 0)
+            row["cost_usd"] += cost_usd(model, usage)
+            row["models"][model] = row["models"].get(model, 0) + 1
+
+    def schema_failure(self, task: str, fell_back: bool) -> None:
+        with self._lock:
+            row = self._row(task)
+            row["schema_failures"] += 1
+            row["fallbacks"] += 1 if fell_back else 0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for task, row in self._by_task.items():
+                lat = sorted(row["_lat"])
+                r = {k: v for k, v in row.items() if not k.startswith("_")}
+                r["models"] = dict(row["models"])
+                r["mean_latency_s"] = round(row["latency_s"] / row["calls"], 3) if row["calls"] else 0.0
+                r["p95_latency_s"] = round(lat[int(0.95 * (len(lat) - 1))], 3) if lat else 0.0
+                r["latency_s"] = round(row["latency_s"], 3)
+                r["cost_usd"] = round(row["cost_usd"], 6)
+                out[task] = r
+            return out
+
+
+STATS = RoutingStats()
@@ -0,0 +1,325 @@
+# shared/llm_scheduler.py
+"""
+Priority-aware admission for LLM calls (behind llm_api.llm_slot).
+
+- Classes: interactive (agent-8 triage, Slack round-trips) > batch (/analyze,
+  /operational-analyze; the default) > background (agent-1 summaries, signal /
+  lexicon harvesting). Set per context with llm_priority("interactive");
+  LLM_PRIORITY sets the process default.
+- Slots: LLM_MAX_CONCURRENCY calls in flight per process, LLM_INTERACTIVE_SLOTS of
+  them (default 1) only for interactive calls. Waiters are served by class, then
+  arrival; a waiter moves up one class per LLM_PRIORITY_AGING_S spent queued, so
+  background work is delayed, never starved.
+- Rate: a token bucket per model from
+  LLM_RATE_LIMITS="gpt-4o-mini=500/200000,gpt-4o=60/30000"  (requests/min / tokens/min,
+  "*" = any other model, 0 = no limit on that dimension). Prompt tokens are estimated
+  up front and settled with the reported usage afterwards. Batch and background calls
+  stop at LLM_INTERACTIVE_RESERVE (fraction, default 0.2) of each bucket; the rest is
+  left for interactive calls.
+- LLM_RATE_STATE_DIR on the volume all agents mount (e.g. /app/shared/_llm_rate) keeps
+  the buckets in flock'ed JSON files, so agent-7 batch work and agent-8 triage draw
+  from one quota. Unset → buckets are per process, and classes only compete inside
+  one process: the cross-agent case (interactive triage vs another agent's batch
+  calls) needs both LLM_RATE_LIMITS and LLM_RATE_STATE_DIR in every agent
+  (docker-compose.yml sets them for all LLM-calling agents via x-llm-rate).
+- stats(): queue wait per class (calls, queued, mean / p95 / max seconds).
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # no cross-process buckets without flock
+    fcntl = None
+
+INTERACTIVE, BATCH, BACKGROUND = "interactive", "batch", "background"
+_RANK = {INTERACTIVE: 0, BATCH: 1, BACKGROUND: 2}
+
+_PRIORITY: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=None)
+
+
+def debug(msg):
+    print(f"[llm_api][sched] {msg}", flush=True)
+
+
+def current_priority() -> str:
+    p = (_PRIORITY.get() or os.getenv("LLM_PRIORITY", BATCH)).strip().lower()
+    return p if p in _RANK else BATCH
+
+
+@contextmanager
+def llm_priority(cls: str) -> Iterator[str]:
+    """
+    Run the LLM calls made in this context (thread/async task) in class cls:
+        with llm_priority(INTERACTIVE):
+            call_llm(...)
+    Worker threads inherit it when started via contextvars.copy_context().run.
+    """
+    if cls not in _RANK:
+        raise ValueError(f"unknown LLM priority class {cls!r} (expected one of {list(_RANK)})")
+    token = _PRIORITY.set(cls)
+    try:
+        yield cls
+    finally:
+        _PRIORITY.reset(token)
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """'gpt-4o-mini=500/200000,*=100/0' → {model: (requests/min, tokens/min)}"""
+    out: Dict[str, Tuple[float, float]] = {}
+    for item in (spec or "").split(","):
+        model, _, rate = item.strip().partition("=")
+        if not model or not rate:
+            continue
+        rpm, _, tpm = rate.partition("/")
+        try:
+            out[model.strip()] = (float(rpm or 0), float(tpm or 0))
+        except ValueError:
+            debug(f"ignoring bad LLM_RATE_LIMITS entry {item!r}")
+    return out
+
+
+# ---------------------------
+# Token bucket (one per model)
+# ---------------------------
+class _Bucket:
+    """Requests/min + tokens/min; each holds at most one minute's worth."""
+
+    def __init__(self, model: str, rpm: float, tpm: float, state_dir: Optional[str] = None):
+        self.model = model
+        self.rpm, self.tpm = rpm, tpm
+        self.path = None
+        if state_dir and fcntl is not None:
+            self.path = os.path.join(state_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model) + ".json")
+        self._state = self._full()
+        self._lock = threading.Lock()
+
+    def _full(self) -> Dict[str, float]:
+        return {"req": self.rpm, "tok": self.tpm, "ts": time.time()}
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, float]]:
+        with self._lock:
+            if self.path is None:
+                yield self._state
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a+", encoding="utf-8") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    fh.seek(0)
+                    try:
+                        st = json.loads(fh.read() or "null") or self._full()
+                    except ValueError:
+                        st = self._full()
+                    yield st
+                    fh.seek(0)
+                    fh.truncate()
+                    json.dump(st, fh)
+                    fh.flush()
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _refill(self, st: Dict[str, float]) -> None:
+        now = time.time()
+        dt = max(0.0, now - float(st.get("ts") or now))
+        st["req"] = min(self.rpm, float(st.get("req", self.rpm)) + dt * self.rpm / 60.0)
+        st["tok"] = min(self.tpm, float(st.get("tok", self.tpm)) + dt * self.tpm / 60.0)
+        st["ts"] = now
+
+    def _wait_s(self, st: Dict[str, float], tokens: int, floor: float) -> float:
+        """Seconds until one request + tokens fit above floor (fraction kept back)."""
+        wait = 0.0
+        if self.rpm:
+            short = 1 + floor * self.rpm - st["req"]
+            if short > 0:
+                wait = max(wait, short * 60.0 / self.rpm)
+        if self.tpm:
+            # a prompt bigger than the usable bucket goes once the bucket is full
+            need = min(tokens, self.tpm * (1.0 - floor))
+            short = need + floor * self.tpm - st["tok"]
+            if short > 0:
+                wait = max(wait, short * 60.0 / self.tpm)
+        return wait
+
+    def peek(self, tokens: int, floor: float) -> float:
+        with self._locked() as st:
+            self._refill(st)
+            return self._wait_s(st, tokens, floor)
+
+    def take(self, tokens: int, floor: float) -> float:
+        """Debit and return 0.0, or return the seconds to wait (nothing debited)."""
+        with self._locked() as st:
+            self._refill(st)
+            wait = self._wait_s(st, tokens, floor)
+            if wait <= 0:
+                st["req"] -= 1 if self.rpm else 0
+                st["tok"] -= tokens if self.tpm else 0
+            return wait
+
+    def settle(self, delta_tokens: int) -> None:
+        """Correct the up-front estimate; may go negative (next callers wait it off)."""
+        if not self.tpm or not delta_tokens:
+            return
+        with self._locked() as st:
+            self._refill(st)
+            st["tok"] -= delta_tokens
+
+    def level(self) -> Dict[str, float]:
+        with self._locked() as st:
+            self._refill(st)
+            return {"requests": round(st["req"], 1), "tokens": round(st["tok"])}
+
+
+# ---------------------------
+# Scheduler
+# ---------------------------
+class Ticket:
+    """One admitted (or queued) LLM call."""
+
+    def __init__(self, cls: str, model: str, est_tokens: int, seq: int):
+        self.cls = cls
+        self.model = model
+        self.est_tokens = max(0, int(est_tokens or 0))
+        self.seq = seq
+        self.enq_at = time.time()
+        self.waited_s = 0.0
+        self.granted = False
+        self.actual_tokens: Optional[int] = None
+
+    def settle(self, usage: Dict[str, int]) -> None:
+        """Report the call's real usage (prompt + completion tokens) for the bucket."""
+        if usage:
+            self.actual_tokens = int(usage.get("prompt_tokens", 0) or 0) + \
+                int(usage.get("completion_tokens", 0) or 0)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int,
+                 interactive_slots: Optional[int] = None,
+                 aging_s: Optional[float] = None,
+                 reserve: Optional[float] = None,
+                 limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 state_dir: Optional[str] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        if interactive_slots is None:
+            interactive_slots = int(os.getenv("LLM_INTERACTIVE_SLOTS", "1") or "1")
+        # never reserve every slot: batch keeps at least one
+        self.interactive_slots = min(max(0, interactive_slots), self.max_concurrency - 1)
+        if aging_s is None:
+            aging_s = float(os.getenv("LLM_PRIORITY_AGING_S", "60") or "60")
+        self.aging_s = max(1.0, aging_s)
+        if reserve is None:
+            reserve = float(os.getenv("LLM_INTERACTIVE_RESERVE", "0.2") or "0.2")
+        self.reserve = min(max(0.0, reserve), 0.9)
+        self.limits = limits if limits is not None else parse_rate_limits(os.getenv("LLM_RATE_LIMITS", ""))
+        self.state_dir = state_dir if state_dir is not None else (os.getenv("LLM_RATE_STATE_DIR", "").strip() or None)
+
+        self._cv = threading.Condition()
+        self._inflight = 0
+        self._waiting: List[Ticket] = []
+        self._seq = 0
+        self._buckets: Dict[str, Optional[_Bucket]] = {}
+        self._waits = {c: deque(maxlen=512) for c in _RANK}
+        self._counts = {c: {"calls": 0, "wait_s": 0.0, "max_wait_s": 0.0} for c in _RANK}
+
+    def _bucket(self, model: str) -> Optional[_Bucket]:
+        if model not in self._buckets:
+            rpm, tpm = self.limits.get(model) or self.limits.get("*") or (0.0, 0.0)
+            self._buckets[model] = _Bucket(model, rpm, tpm, self.state_dir) if (rpm or tpm) else None
+        return self._buckets[model]
+
+    def _slot_cap(self, cls: str) -> int:
+        return self.max_concurrency if cls == INTERACTIVE else self.max_concurrency - self.interactive_slots
+
+    def _floor(self, cls: str) -> float:
+        return 0.0 if cls == INTERACTIVE else self.reserve
+
+    def _try_grant(self, me: Ticket) -> Optional[float]:
+        """
+        Grant me if I am the first admissible waiter (class, then age). Otherwise return
+        how long to sleep: a bucket wait, or None (until a release notifies).
+        """
+        now = time.time()
+        order = sorted(self._waiting, key=lambda w: (_RANK[w.cls] - (now - w.enq_at) / self.aging_s, w.seq))
+        for w in order:
+            if self._inflight >= self._slot_cap(w.cls):
+                if w is me:
+                    return None
+                continue
+            bucket = self._bucket(w.model)
+            if w is me:
+                wait = bucket.take(me.est_tokens, self._floor(me.cls)) if bucket else 0.0
+                if wait > 0:
+                    return wait
+                self._waiting.remove(me)
+                self._inflight += 1
+                me.granted = True
+                return 0.0
+            if bucket is None or bucket.peek(w.est_tokens, self._floor(w.cls)) <= 0:
+                self._cv.notify_all()   # someone ahead of me can go; make sure it's awake
+                return None
+        return None
+
+    def acquire(self, model: str, est_tokens: int = 0, cls: Optional[str] = None) -> Ticket:
+        with self._cv:
+            self._seq += 1
+            t = Ticket(cls or current_priority(), model, est_tokens, self._seq)
+            self._waiting.append(t)
+            try:
+                while True:
+                    timeout = self._try_grant(t)
+                    if t.granted:
+                        break
+                    # bounded: bucket refills by other processes are only seen by polling
+                    self._cv.wait(min(timeout, 1.0) if timeout else 1.0)
+            except BaseException:
+                if t in self._waiting:
+                    self._waiting.remove(t)
+                self._cv.notify_all()
+                raise
+            t.waited_s = time.time() - t.enq_at
+            c = self._counts[t.cls]
+            c["calls"] += 1
+            c["wait_s"] += t.waited_s
+            c["max_wait_s"] = max(c["max_wait_s"], t.waited_s)
+            self._waits[t.cls].append(t.waited_s)
+        if t.waited_s > 1.0:
+            debug(f"{t.cls} call ({model}) waited {t.waited_s:.1f}s")
+        return t
+
+    def release(self, t: Ticket) -> None:
+        with self._cv:
+            self._inflight -= 1
+            self._cv.notify_all()
+        if t.actual_tokens is not None:
+            bucket = self._bucket(t.model)
+            if bucket is not None:
+                bucket.settle(t.actual_tokens - t.est_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cv:
+            out: Dict[str, Any] = {"inflight": self._inflight,
+                                   "max_concurrency": self.max_concurrency,
+                                   "interactive_slots": self.interactive_slots}
+            for cls, c in self._counts.items():
+                waits = sorted(self._waits[cls])
+                out[cls] = {
+                    "calls": c["calls"],
+                    "queued": sum(1 for w in self._waiting if w.cls == cls),
+                    "mean_wait_s": round(c["wait_s"] / c["calls"], 3) if c["calls"] else 0.0,
+                    "p95_wait_s": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                    "max_wait_s": round(c["max_wait_s"], 3),
+                }
+            buckets = {m: b for m, b in self._buckets.items() if b is not None}
+        if buckets:
+            out["buckets"] = {m: b.level() for m, b in buckets.items()}
+        return out
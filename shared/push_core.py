@@ -2,16 +2,26 @@
 """
 Core deployment logic for pushing CLI configs (Agent-2 shared module).
 
-- No Slack/Bolt/threads here.
+- No Slack/Bolt here (threads only to stream the push script's output).
 - Orchestrator and Agent-2 both import and call push_configs().
 """
 
 import os
 import re
 import glob
+import json
+import time
+import queue
+import threading
 import subprocess
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple
+from typing import Callable, List, Optional, Dict, Any, Tuple
+
+# Push tuning (passed to push_cli_configs.py through its env)
+PUSH_PARALLEL = int(os.getenv("PUSH_PARALLEL", "1"))      # >1 opts in to concurrent pushes
+PUSH_STAGES = os.getenv("PUSH_STAGES", "")            # e.g. "A-P-*;A-PE-*" (core first, then edge)
+PUSH_IDLE_TIMEOUT_S = int(os.getenv("PUSH_IDLE_TIMEOUT_S", "300"))
+PUSH_MAX_S = float(os.getenv("PUSH_MAX_S", "0"))      # 0 = no cap on the whole run
 
 # Reuse the flexible error patterns (IOS / IOS-XR)
 GENERIC_ERROR_PATTERNS = [
@@ -39,17 +49,43 @@ def _repo_paths(config_dir: str, task_dir: str) -> Tuple[str, str, str]:
     log_dir = os.path.join(repo_dir, task_dir, "logs")
     return repo_dir, script_path, log_dir
 
-def run_push_script(config_dir: str, task_dir: str, timeout: int = 300) -> Tuple[str, str, int]:
+def _parse_progress(line: str) -> Optional[Dict[str, Any]]:
+    """A JSON progress line from push_cli_configs.py (--progress-json), else None."""
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        ev = json.loads(line)
+    except ValueError:
+        return None
+    return ev if isinstance(ev, dict) and "event" in ev else None
+
+def run_push_script(config_dir: str, task_dir: str, timeout: Optional[int] = None,
+                    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    parallel: Optional[int] = None, stages: Optional[str] = None) -> Tuple[str, str, int]:
     """
     Execute push_cli_configs.py for the given task.
 
+    The script is asked (via env, so older scripts simply ignore it) to push up to
+    `parallel` devices at once (default PUSH_PARALLEL=1: one at a time, as before),
+    in `stages` order ("A-P-*;A-PE-*"), and to print one
+    JSON line per device event; each event is passed to on_progress as it arrives.
+    `timeout` is an idle timeout: the script is stopped only after that many seconds
+    without any output (PUSH_MAX_S, if set, caps the whole run). Output up to that
+    point is still returned, so finished devices keep their results.
+
     Returns:
-        stdout, stderr, returncode
+        stdout, stderr, returncode (-1 if the script was stopped)
     """
+    if timeout is None:
+        timeout = PUSH_IDLE_TIMEOUT_S
+    parallel = PUSH_PARALLEL if parallel is None else parallel
+    stages = PUSH_STAGES if stages is None else stages
     repo_dir, script_path, _ = _repo_paths(config_dir, task_dir)
     cmd = ["python3", script_path, "--task", task_dir]
 
-    print(f"[DEBUG] run_push_script: repo_dir={repo_dir} script={script_path} cmd={' '.join(cmd)}", flush=True)
+    print(f"[DEBUG] run_push_script: repo_dir={repo_dir} script={script_path} cmd={' '.join(cmd)} "
+          f"parallel={parallel} stages={stages!r}", flush=True)
 
     try:
         os.listdir(repo_dir)
@@ -63,38 +99,140 @@ def run_push_script(config_dir: str, task_dir: str, timeout: int = 300) -> Tuple
         print(err, flush=True)
         return "", err, -1
 
+    env = dict(os.environ, PUSH_PROGRESS="jsonl", PUSH_PARALLEL=str(max(1, parallel)))
+    if stages:
+        env["PUSH_STAGES"] = stages
+
+    out_lines: List[str] = []
+    err_lines: List[str] = []
     try:
-        result = subprocess.run(
-            cmd, cwd=repo_dir, capture_output=True, text=True, timeout=timeout
+        proc = subprocess.Popen(
+            cmd, cwd=repo_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, bufsize=1,
         )
-        stdout, stderr, rc = result.stdout, result.stderr, result.returncode
-
-        print(f"[DEBUG] Subprocess rc={rc}", flush=True)
-        if stdout:
-            print(f"[DEBUG] STDOUT (first 500 chars):\n{stdout[:500]}", flush=True)
-        if stderr:
-            print(f"[DEBUG] STDERR (first 500 chars):\n{stderr[:500]}", flush=True)
-
-        # If success but no logs, warn
-        if rc == 0:
-            _, _, log_dir = _repo_paths(config_dir, task_dir)
-            if not glob.glob(os.path.join(log_dir, "*.log")):
-                print(f"[WARN] rc=0 but no log files in {log_dir}", flush=True)
-
-        return stdout, stderr, rc
-
-    except subprocess.TimeoutExpired:
-        err = f"[ERROR] Script timed out after {timeout}s"
-        print(err, flush=True)
-        return "", err, -1
     except Exception as e:
         err = f"[ERROR] Exception during subprocess: {e}"
         print(err, flush=True)
         return "", err, -1
 
-def basic_log_analysis(config_dir: str, task_dir: str) -> Tuple[List[Tuple[str, str]], List[str], str]:
+    lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def _pump_stdout() -> None:
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def _pump_stderr() -> None:
+        for line in proc.stderr:
+            err_lines.append(line)
+
+    readers = [threading.Thread(target=_pump_stdout, daemon=True),
+               threading.Thread(target=_pump_stderr, daemon=True)]
+    for t in readers:
+        t.start()
+
+    start = last = time.monotonic()
+    stopped = ""
+    while True:
+        now = time.monotonic()
+        wait = timeout - (now - last)
+        if PUSH_MAX_S > 0:
+            wait = min(wait, PUSH_MAX_S - (now - start))
+        if wait <= 0:
+            why = f"no output for {timeout}s" if now - last >= timeout else f"PUSH_MAX_S={PUSH_MAX_S:g} reached"
+            stopped = f"[ERROR] Script stopped after {now - start:.0f}s ({why})"
+            break
+        try:
+            line = lines.get(timeout=wait)
+        except queue.Empty:
+            continue
+        if line is None:
+            break
+        last = time.monotonic()
+        out_lines.append(line)
+        ev = _parse_progress(line)
+        if ev is not None and on_progress is not None:
+            try:
+                on_progress(ev)
+            except Exception as e:
+                print(f"[WARN] on_progress failed: {e}", flush=True)
+
+    if stopped:
+        proc.kill()
+        print(stopped, flush=True)
+    rc = proc.wait()
+    for t in readers:
+        t.join(timeout=5)
+    if stopped:
+        rc = -1
+        err_lines.append(stopped + "\n")
+    stdout, stderr = "".join(out_lines), "".join(err_lines)
+
+    print(f"[DEBUG] Subprocess rc={rc}", flush=True)
+    if stdout:
+        print(f"[DEBUG] STDOUT (first 500 chars):\n{stdout[:500]}", flush=True)
+    if stderr:
+        print(f"[DEBUG] STDERR (first 500 chars):\n{stderr[:500]}", flush=True)
+
+    # If success but no logs, warn
+    if rc == 0:
+        _, _, log_dir = _repo_paths(config_dir, task_dir)
+        if not glob.glob(os.path.join(log_dir, "*.log")):
+            print(f"[WARN] rc=0 but no log files in {log_dir}", flush=True)
+
+    return stdout, stderr, rc
+
+class PushProgress:
+    """Collects push_cli_configs.py progress events: per-device state, in arrival order."""
+    def __init__(self) -> None:
+        self.devices: Dict[str, Dict[str, Any]] = {}
+        self.done: Optional[Dict[str, Any]] = None
+
+    def __call__(self, ev: Dict[str, Any]) -> None:
+        kind = ev.get("event")
+        if kind == "stage":
+            for name in ev.get("devices") or []:
+                self.devices.setdefault(name, {"status": "pending", "stage": ev.get("stage")})
+        elif kind == "device" and ev.get("device"):
+            row = self.devices.setdefault(ev["device"], {})
+            row.update({k: v for k, v in ev.items() if k not in ("event", "device", "task", "ts")})
+            finished = sum(1 for r in self.devices.values() if r.get("status") in ("ok", "error", "skip"))
+            print(f"[push] {ev['device']}: {ev.get('status')} ({finished}/{len(self.devices)})", flush=True)
+        elif kind == "done":
+            self.done = ev
+
+    def pushed(self) -> List[str]:
+        """Devices with an ok/error result in this run: the only ones whose .log is current."""
+        return [n for n, r in self.devices.items() if r.get("status") in ("ok", "error")]
+
+    def not_pushed(self) -> Dict[str, str]:
+        """
+        {device: reason} for devices of this task that got no ok/error result: halted by
+        --halt-on-failure, or announced/started when the script stopped.
+        Devices skipped for having no config file are not part of the task and are left out.
+        """
+        out: Dict[str, str] = {}
+        for n, r in self.devices.items():
+            st = r.get("status")
+            if st in ("ok", "error") or (st == "skip" and r.get("reason") == "no config"):
+                continue
+            if st == "skip" and r.get("reason") == "halted":
+                out[n] = "Not pushed (an earlier stage failed; --halt-on-failure)"
+            else:
+                out[n] = "Not pushed (script stopped before this device reported a result)"
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for r in self.devices.values():
+            counts[r.get("status", "?")] = counts.get(r.get("status", "?"), 0) + 1
+        return {"reported": bool(self.devices), "completed": self.done is not None,
+                "counts": counts, "not_pushed": sorted(self.not_pushed())}
+
+def basic_log_analysis(config_dir: str, task_dir: str,
+                       hosts: Optional[List[str]] = None) -> Tuple[List[Tuple[str, str]], List[str], str]:
     """
-    Analyze logs for generic CLI/commit errors.
+    Analyze logs for generic CLI/commit errors (only <host>.log for `hosts`, if given).
 
     Returns:
         results: list of (hostname, status) where status is "Success" or semicolon-joined issue list
@@ -107,6 +245,9 @@ def basic_log_analysis(config_dir: str, task_dir: str) -> Tuple[List[Tuple[str,
 
     print(f"[DEBUG] basic_log_analysis: log_dir={log_dir}", flush=True)
     found_logs = glob.glob(os.path.join(log_dir, "*.log"))
+    if hosts is not None:
+        wanted = set(hosts)
+        found_logs = [f for f in found_logs if os.path.basename(f)[:-len(".log")] in wanted]
     print(f"[DEBUG] Found log files: {found_logs}", flush=True)
 
     if not found_logs:
@@ -142,15 +283,15 @@ def basic_log_analysis(config_dir: str, task_dir: str) -> Tuple[List[Tuple[str,
 
     return results, error_hosts, log_dir
 
-def generate_summary_md(log_dir: str, output_path: str) -> None:
+def generate_summary_md(log_dir: str, output_path: str, hosts: Optional[List[str]] = None) -> None:
     """
-    Concatenate all per-device .log files into a single markdown file.
+    Concatenate all per-device .log files (only `hosts`, if given) into a single markdown file.
     """
     print(f"[DEBUG] generate_summary_md: {output_path}", flush=True)
     try:
         with open(output_path, "w") as summary:
             for log_file in sorted(os.listdir(log_dir)):
-                if log_file.endswith(".log"):
+                if log_file.endswith(".log") and (hosts is None or log_file[:-len(".log")] in hosts):
                     summary.write(f"## {log_file}\n\n")
                     with open(os.path.join(log_dir, log_file), "r") as lf:
                         content = lf.read()
@@ -182,14 +323,27 @@ def push_configs(config_dir: str, task_dir: str,
         "config_dir": "<str>",
         "task_dir": "<str>",
         "timestamp_utc": "<YYYY-MM-DD HH:MM UTC>",
-        "return_code": <int>
+        "return_code": <int>,
+        "progress": {"reported": <bool>, "completed": <bool>, "counts": {...}, "not_pushed": [...]}
       }
     }
     """
     # TODO: If your push_cli_configs.py supports filtering/dry-run, add flags here.
-    stdout, stderr, rc = run_push_script(config_dir, task_dir)
-
-    results, error_hosts, log_dir = basic_log_analysis(config_dir, task_dir)
+    progress = PushProgress()
+    stdout, stderr, rc = run_push_script(config_dir, task_dir, on_progress=progress)
+
+    # With progress events, only devices pushed in THIS run have a current .log; any other
+    # log is from an earlier run. Older scripts report nothing: read every log as before.
+    pushed = progress.pushed() if progress.devices else None
+    results, error_hosts, log_dir = basic_log_analysis(config_dir, task_dir, hosts=pushed)
+    if pushed is not None:
+        results = [(h, st) for h, st in results if h != "logs"]
+        # A failed connect/push writes a log none of the CLI error patterns match
+        failed = {h: r.get("error") or "push failed" for h, r in progress.devices.items()
+                  if r.get("status") == "error"}
+        results = [(h, f"Push failed: {failed[h]}" if h in failed and st == "Success" else st)
+                   for h, st in results]
+        results += list(progress.not_pushed().items())
 
     success_hosts: List[str] = []
     per_device: List[Dict[str, Any]] = []
@@ -217,7 +371,7 @@ def push_configs(config_dir: str, task_dir: str,
 
     # Always try to produce the markdown bundle
     if os.path.isdir(log_dir):
-        generate_summary_md(log_dir, summary_md_path)
+        generate_summary_md(log_dir, summary_md_path, hosts=pushed)
     else:
         summary_md_path = None
 
@@ -230,6 +384,7 @@ def push_configs(config_dir: str, task_dir: str,
         "task_dir": task_dir,
         "timestamp_utc": timestamp,
         "return_code": rc,
+        "progress": progress.summary(),
     }
 
     # DEBUG: types/sanity before returning